@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'smtracker.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,6 +79,27 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Concurrent result entry (several judges): WAL lets readers work while one connection writes,
+        # write transactions take the write lock at BEGIN (no deadlock when upgrading a read lock)
+        # and wait up to `timeout` seconds for it instead of failing with "database is locked".
+        # The journal mode is stored in the database file, db.sqlite3 is committed in WAL mode (unchanged by the init_command).
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+    }
+}
+
+# Cache (LRU), used for pages keyed by the tournament version (see smtracker/cache.py)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'smtracker',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
     }
 }
 
@@ -124,3 +146,25 @@ STATIC_URL = '/static/'
 from django.contrib.messages import constants as messages
 
 MESSAGE_LEVEL = messages.DEBUG
+
+# Swiss pairing: 'greedy' (first available opponent from the top of the ranking)
+# or 'matching' (opt-in: approximate minimum-cost matching - greedy pairing, blossom repair and 2-opt
+# improvement, see smtracker/pairing.py; avoids duplicate matches whenever possible)
+SMTRACKER_SWISS_PAIRING = 'greedy'
+
+# Round-Robin rounds: number of robots in a pool (the robots are split into ceil(robots / size) pools)
+SMTRACKER_ROUND_ROBIN_POOL_SIZE = 4
+
+# Ranking of robots with equal total points (and their order in the Swiss pairing): tiebreak chain, used for
+# the rounds without their own Round.tiebreaks. Policies: opponent_points, buchholz, buchholz_cut1,
+# buchholz_median, sonneborn_berger, head_to_head, wins (see smtracker/tiebreaks.py)
+SMTRACKER_TIEBREAKS = ['opponent_points']
+
+# Request instrumentation (query count, SQL time, phases) with Server-Timing header,
+# the last requests are shown on /smtracker/instrumentation/ (staff only)
+SMTRACKER_INSTRUMENTATION = False
+SMTRACKER_INSTRUMENTATION_HISTORY = 50
+
+# Results submitted through the match result API are recalculated on a background thread
+# (False: synchronously in the request)
+SMTRACKER_BACKGROUND_RECALCULATION = True
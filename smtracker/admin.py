@@ -24,6 +24,13 @@ class MatchAdmin(admin.ModelAdmin):
     list_filter = ('status', 'round')
     search_fields = ('ident', 'robot1__robot_name', 'robot2__robot_name', 'round__ident')
     ordering = ['ident']
+    readonly_fields = ('version',)      # optimistic locking of the result entry (see MatchManager.save_match_result)
+
+    def save_model(self, request, obj, form, change):
+        # a changed match invalidates the results based on its previous version
+        if change and form.has_changed():
+            obj.version += 1
+        super().save_model(request, obj, form, change)
 
 from .models import RoundResult
 
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class SumoMatchTrackerConfig(AppConfig):
     name = 'smtracker'
+
+    def ready(self):
+        from . import cache  # connect the cache version signals
+        from . import live  # connect the live scoreboard signals
+        from . import pairs  # connect the played pairs index signals
@@ -0,0 +1,515 @@
+import math
+import random
+import re
+import threading
+import time
+import timeit
+import tracemalloc
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.cache import cache
+from django.db import OperationalError, connection, models, transaction
+from django.db.models import Q
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from . import views
+from .models import Robot, Match, Round, RoundType, MatchStatus, RoundResult
+from .managers import MatchManager, SwissMatchManager
+from .recalculation import recalculation_worker
+from .pairs import rebuild_played_pairs
+from .snapshot import TournamentSnapshot
+from .cache import increment_tournament_version
+
+# possible match results (robot1 points, robot2 points)
+MATCH_RESULTS = [(6, 0), (5, 1), (4, 2), (2, 4), (1, 5), (0, 6)]
+
+def build_synthetic_tournament(robot_count, round_count=5, seed=0, open_round_count=0):
+    """
+    Create a synthetic Swiss tournament: robot_count robots (+ ByeBot), round_count rounds in round group 1
+    and randomly paired matches with random results in every round, followed by open_round_count rounds
+    without matches.
+    """
+    rnd = random.Random(seed)
+
+    robots = [
+        Robot(
+            registration_number=i + 1,
+            robot_name=f"Robot {i + 1}",
+            author_name=f"Author {i + 1}",
+            city=f"City {rnd.randrange(20)}",
+            country=rnd.choice(['SK', 'CZ', 'HU', 'PL', 'AT']),
+            weight=rnd.randrange(900, 1001),
+            byebot_points=rnd.choice([0, 1, 2]),
+            robot_type=rnd.choice([None, 'A', 'B', 'C']),
+            round_group1_qualified=1,
+        )
+        for i in range(robot_count)
+    ]
+    robots.append(Robot(registration_number=robot_count + 1, robot_name='ByeBot', author_name='-', city='-', country='-',
+                        round_group1_qualified=1, is_byebot=1))
+    robots = Robot.objects.bulk_create(robots)
+    byebot = robots.pop()
+
+    start_time = timezone.now().replace(second=0, microsecond=0)
+    rounds = Round.objects.bulk_create([
+        Round(ident=f"R{i + 1}", name=f"Round {i + 1}", order_index=i + 1, round_group_index=1, round_type=RoundType.SWISS,
+              round_start_time=start_time + timedelta(hours=i), number_of_tables=8)
+        for i in range(round_count + open_round_count)
+    ])
+
+    matches = []
+    for round_obj in rounds[:round_count]:
+        field = robots[:]
+        rnd.shuffle(field)
+        if len(field) % 2 == 1:
+            field.append(byebot)
+        for i in range(0, len(field), 2):
+            points1, points2 = rnd.choice(MATCH_RESULTS)
+            matches.append(Match(
+                round=round_obj,
+                ident=f"{round_obj.ident}-M{i // 2 + 1:02d}",
+                robot1=field[i],
+                robot2=field[i + 1],
+                status=MatchStatus.FINISHED,
+                result_robot1_points=points1,
+                result_robot2_points=points2,
+            ))
+    Match.objects.bulk_create(matches)
+    rebuild_played_pairs()
+
+    return robots, rounds
+
+def legacy_calculate_opponent_points():
+    """Previous per-robot implementation of MatchManager.calculate_opponent_points (reference for the benchmark)."""
+    rounds = Round.objects.all().order_by('order_index')
+
+    for round_obj in rounds:
+        previous_rounds = Round.objects.filter(order_index__lte=round_obj.order_index, round_group_index=round_obj.round_group_index)
+
+        results = RoundResult.objects.filter(round=round_obj)
+        for result in results:
+            robot = result.robot
+
+            matches = Match.objects.filter(round__in=previous_rounds).filter(
+                Q(robot1=robot) | Q(robot2=robot)
+            )
+
+            opponent_ids = set()
+            for match in matches:
+                opponent = None
+                if match.robot1 == robot:
+                    opponent = match.robot2
+                elif match.robot2 == robot:
+                    opponent = match.robot1
+
+                if opponent.id != robot.id and opponent.is_byebot != 1:
+                    opponent_ids.add(opponent.id)
+
+            total_opponent_points = RoundResult.objects.filter(
+                round=round_obj,
+                robot__id__in=opponent_ids
+            ).aggregate(total=models.Sum('total_robot_points'))['total'] or 0
+
+            result.total_opponent_points = total_opponent_points
+            result.save()
+
+def opponent_points_snapshot():
+    return list(RoundResult.objects.order_by('id').values_list('id', 'total_opponent_points'))
+
+def benchmark_opponent_points(sizes=(64, 256, 1024), round_count=5, seed=0):
+    """
+    Compare the legacy and the current opponent points calculation on synthetic tournaments.
+
+    Every size runs in its own transaction which is rolled back, so the database is left unchanged.
+    """
+    match_manager = MatchManager.get_instance()
+    stats = []
+
+    for size in sizes:
+        with transaction.atomic():
+            # start from an empty tournament (rolled back at the end)
+            Round.objects.all().delete()
+            Robot.objects.all().delete()
+            build_synthetic_tournament(size, round_count, seed)
+            match_manager.recalculate_round_results()
+
+            RoundResult.objects.update(total_opponent_points=None)
+            start = time.perf_counter()
+            legacy_calculate_opponent_points()
+            legacy_time = time.perf_counter() - start
+            legacy_points = opponent_points_snapshot()
+
+            RoundResult.objects.update(total_opponent_points=None)
+            start = time.perf_counter()
+            match_manager.calculate_opponent_points()
+            current_time = time.perf_counter() - start
+
+            stats.append({
+                'robots': size,
+                'rounds': round_count,
+                'legacy_secs': legacy_time,
+                'current_secs': current_time,
+                'speedup': legacy_time / current_time if current_time else None,
+                'equal': legacy_points == opponent_points_snapshot(),
+            })
+
+            transaction.set_rollback(True)
+
+    return stats
+
+def legacy_calculate_tiebreaker_points(robots, played_pairs, max_depth=6):
+    """Previous (list based, quadratic) implementation of SwissMatchManager.calculate_tiebreaker_points (reference for the benchmark and the tests)."""
+    # Order robots by byebot_points (desc), then weight (desc)
+    sorted_robots = sorted(robots, key=lambda r: (r.byebot_points or 0, r.weight or 0), reverse=True)
+    remaining = sorted_robots[:]
+    scores = {}
+    current_score = len(robots)
+
+    while len(remaining) > 1:
+        first = remaining.pop(0)
+        candidate = None
+
+        # Collect possible candidates up to max_depth from the end
+        candidates = []
+        for i in range(1, min(len(remaining), max_depth) + 1):
+            c = remaining[-i]
+            pair = (min(first.id, c.id), max(first.id, c.id))
+            if pair not in played_pairs:
+                candidates.append(c)
+
+        # Priority 1: Same robot_type (if set)
+        if first.robot_type:
+            for c in candidates:
+                if c.robot_type == first.robot_type:
+                    candidate = c
+                    break
+
+        # Priority 2: Different country
+        if not candidate:
+            for c in candidates:
+                if c.country != first.country:
+                    candidate = c
+                    break
+
+        # Priority 3: Different city
+        if not candidate:
+            for c in candidates:
+                if c.city != first.city:
+                    candidate = c
+                    break
+
+        # Fallback: just pick first available
+        if not candidate and candidates:
+            candidate = candidates[0]
+
+        if candidate:
+            scores[first.id] = current_score
+            scores[candidate.id] = current_score - 1
+            remaining.remove(candidate)
+            current_score -= 2
+        else:
+            # No valid match found
+            scores[first.id] = current_score
+            current_score -= 1
+
+    if remaining:
+        last_robot = remaining[0]
+        scores[last_robot.id] = current_score
+
+    return scores
+
+def synthetic_tied_robots(count, seed=0, played_per_robot=3):
+    """
+    Unsaved robots (with ids) with random tiebreaker attributes and a set of random played pairs,
+    as the input of calculate_tiebreaker_points.
+    """
+    rnd = random.Random(seed)
+    robots = [
+        Robot(
+            id=i + 1,
+            registration_number=i + 1,
+            country=rnd.choice(['SK', 'CZ', 'HU', 'PL', 'AT']),
+            city=f"City {rnd.randrange(20)}",
+            weight=rnd.randrange(990, 1001),
+            byebot_points=rnd.choice([0, 1, 2]),
+            robot_type=rnd.choice([None, 'A', 'B', 'C']),
+        )
+        for i in range(count)
+    ]
+    played_pairs = set()
+    for robot in robots:
+        for _ in range(played_per_robot):
+            opponent_id = rnd.randrange(1, count + 1)
+            if opponent_id != robot.id:
+                played_pairs.add((min(robot.id, opponent_id), max(robot.id, opponent_id)))
+    return robots, played_pairs
+
+def benchmark_tiebreaker_points(sizes=(625, 1250, 2500, 5000), seed=0, repeat=3):
+    """
+    Compare the legacy and the current tiebreaker points calculation on tied groups of the given sizes
+    (no database access). current_us_per_nlogn stays flat for O(n log n) scaling.
+    """
+    swiss_match_manager = SwissMatchManager.get_instance()
+    stats = []
+
+    for size in sizes:
+        robots, played_pairs = synthetic_tied_robots(size, seed)
+        legacy_time = min(timeit.repeat(lambda: legacy_calculate_tiebreaker_points(robots, played_pairs), number=1, repeat=repeat))
+        current_time = min(timeit.repeat(lambda: swiss_match_manager.calculate_tiebreaker_points(robots, played_pairs), number=1, repeat=repeat))
+
+        stats.append({
+            'robots': size,
+            'legacy_secs': legacy_time,
+            'current_secs': current_time,
+            'speedup': legacy_time / current_time if current_time else None,
+            'current_us_per_nlogn': current_time * 1e6 / (size * math.log2(size)),
+            'equal': legacy_calculate_tiebreaker_points(robots, played_pairs) == swiss_match_manager.calculate_tiebreaker_points(robots, played_pairs),
+        })
+
+    return stats
+
+
+def benchmark_request(path='/'):
+    """GET request with message storage, as used by the views and managers."""
+    request = RequestFactory().get(path)
+    request.session = {}
+    request._messages = FallbackStorage(request)
+    return request
+
+def measure(func, setup=None, repeat=3):
+    """
+    Measure func: best wall time of `repeat` runs (timeit timer), query count and peak Python memory
+    (tracemalloc) of one more run. setup is called before every run and is not measured.
+    """
+    wall_times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = timeit.default_timer()
+        func()
+        wall_times.append(timeit.default_timer() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'wall_secs': min(wall_times),
+        'queries': len(queries),
+        'peak_memory_kb': peak_memory // 1024,
+    }
+
+def benchmark_operations(round_count):
+    """Return a list of (name, func, setup) tuples of the benchmarked operations on the synthetic tournament."""
+    match_manager = MatchManager.get_instance()
+    swiss_match_manager = SwissMatchManager.get_instance()
+    rounds = list(Round.objects.order_by('order_index'))
+    last_round, next_round = rounds[round_count - 1], rounds[round_count]
+
+    def delete_next_round_matches():
+        match_manager.delete_for_round(next_round)
+
+    def generate(pairing):
+        return lambda: swiss_match_manager.generate_for_round(next_round, benchmark_request(), pairing=pairing)
+
+    def view(view_func, *args):
+        return lambda: view_func(benchmark_request(), *args)
+
+    return [
+        ('TournamentSnapshot.load', TournamentSnapshot.load, None),
+        ('recalculate_round_results', lambda: match_manager.recalculate_round_results(), None),
+        ('recalculate_round_results (last round)', lambda: match_manager.recalculate_round_results(from_round=last_round), None),
+        ('calculate_opponent_points', lambda: match_manager.calculate_opponent_points(), None),
+        ('calculate_ranks_for_rounds', lambda: match_manager.calculate_ranks_for_rounds(), None),
+        ('generate_for_round (greedy)', generate('greedy'), delete_next_round_matches),
+        ('generate_for_round (matching)', generate('matching'), delete_next_round_matches),
+        ('schedule_matches', lambda: match_manager.schedule_matches(next_round), None),
+        ('views.robot_list', view(views.robot_list), None),
+        ('views.round_list', view(views.round_list), None),
+        # the pages are cached by tournament version: a new version before every run measures the rendering,
+        # the same version the cache hits
+        ('views.round_results', view(views.round_results, last_round.id), increment_tournament_version),
+        ('views.round_results (cached)', view(views.round_results, last_round.id), None),
+        ('views.scheduled_matches', view(views.scheduled_matches, next_round.id), increment_tournament_version),
+        ('views.scheduled_matches (cached)', view(views.scheduled_matches, next_round.id), None),
+    ]
+
+def run_benchmarks(sizes=(64, 256, 1024), round_count=5, seed=0, repeat=3):
+    """
+    Run all benchmarked operations on synthetic tournaments of the given sizes (numbers of robots).
+
+    Every size runs in its own transaction which is rolled back, so the database is left unchanged.
+    Returns a list of dicts (robots, operation, wall_secs, queries, peak_memory_kb).
+    """
+    stats = []
+
+    for size in sizes:
+        with transaction.atomic():
+            # start from an empty tournament (rolled back at the end)
+            Round.objects.all().delete()
+            Robot.objects.all().delete()
+            build_synthetic_tournament(size, round_count, seed, open_round_count=1)
+            MatchManager.get_instance().recalculate_round_results()
+            # the tournament version is not bumped in the never committed transaction
+            cache.clear()
+
+            for name, func, setup in benchmark_operations(round_count):
+                stats.append({'robots': size, 'operation': name, **measure(func, setup, repeat)})
+
+            transaction.set_rollback(True)
+
+    return stats
+
+def load_test_results(submitters=8, submissions=25, robot_count=64, round_count=3, seed=0, max_attempts=20, timeout=60,
+                      formset_submitters=None):
+    """
+    Load test of concurrent result entry: `submitters` threads (judges) submit `submissions` results each
+    on random matches of the last round, `formset_submitters` of them (default: half) through the match
+    results page (formset), the others through the match result API. A judge reads the match, submits the
+    result based on the version it read and on a conflict reads the match again and retries. The standings
+    are recalculated by the background worker meanwhile.
+
+    Lost updates are detected from the match versions: the saved results of a match must have the versions
+    1..n and the match must end with version n and the result saved last. Stale standings are the round
+    results that differ from a full recalculation once the worker reports the standings as fresh.
+
+    Runs on the current database, which must be a throwaway one (see the loadtest_results command).
+    """
+    build_synthetic_tournament(robot_count, round_count, seed)
+    MatchManager.get_instance().recalculate_round_results()
+    last_round = Round.objects.get(order_index=round_count)
+    match_ids = list(Match.objects.filter(round=last_round).values_list('id', flat=True))
+    if formset_submitters is None:
+        formset_submitters = submitters // 2
+
+    lock = threading.Lock()
+    counts = {'saved': 0, 'conflicts': 0, 'lock_errors': 0, 'errors': 0}
+    saved = {}    # match id -> [(version, result)]
+    barrier = threading.Barrier(submitters)
+
+    def count(name):
+        with lock:
+            counts[name] += 1
+
+    def submit_api(client, match_id, points):
+        """Submit the result through the API, returns (status code, saved version, saved result)."""
+        url = reverse('smtracker:match_result_api', args=[match_id])
+        etag = client.get(url)['ETag']
+        response = client.post(url, {'result_robot1_points': points[0], 'result_robot2_points': points[1]},
+                               content_type='application/json', HTTP_IF_MATCH=etag,
+                               HTTP_X_CSRFTOKEN=client.cookies[settings.CSRF_COOKIE_NAME].value)
+        return response.status_code, response.json()['match']['version'] if response.status_code == 200 else None, points
+
+    def submit_formset(client, match_id, points):
+        """Submit the result through the match results page (one form), returns (status code, saved version, saved result)."""
+        url = reverse('smtracker:match_results', args=[last_round.id])
+        page = client.get(url).content.decode()
+        index = re.search(rf'name="form-(\d+)-id" value="{match_id}"', page).group(1)
+        version = int(re.search(rf'name="form-{index}-version" value="(\d+)"', page).group(1))
+        current = tuple(
+            int(value) if value else None
+            for value in re.search(rf'name="form-{index}-result_robot1_points"(?: value="(\d+)")?.*?'
+                                   rf'name="form-{index}-result_robot2_points"(?: value="(\d+)")?', page, re.S).groups()
+        )
+        if points == current:
+            # an unchanged form is not saved
+            points = MATCH_RESULTS[(MATCH_RESULTS.index(points) + 1) % len(MATCH_RESULTS)]
+
+        response = client.post(url, {
+            'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 1,
+            'form-0-id': match_id, 'form-0-version': version, 'form-0-status': MatchStatus.FINISHED,
+            'form-0-result_robot1_points': points[0], 'form-0-result_robot2_points': points[1],
+            'csrfmiddlewaretoken': re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page).group(1),
+        }, follow=True)
+        content = response.content.decode()
+        if response.status_code != 200 or 'Match results have been saved.' not in content:
+            return response.status_code if response.status_code != 200 else 500, None, points
+        if 'was changed in the meantime' in content:
+            return 409, None, points
+        return 200, version + 1, points
+
+    def submit(index):
+        rnd = random.Random(seed + index)
+        client = Client(SERVER_NAME='localhost', enforce_csrf_checks=True)
+        submit_result = submit_formset if index < formset_submitters else submit_api
+        barrier.wait()
+        try:
+            for _ in range(submissions):
+                match_id = rnd.choice(match_ids)
+                points = rnd.choice(MATCH_RESULTS)
+                for _ in range(max_attempts):
+                    try:
+                        status_code, version, result = submit_result(client, match_id, points)
+                    except OperationalError as e:
+                        count('lock_errors' if 'locked' in str(e) else 'errors')
+                        break
+                    if status_code == 409:
+                        count('conflicts')
+                        continue
+                    if status_code == 200:
+                        count('saved')
+                        with lock:
+                            saved.setdefault(match_id, []).append((version, result))
+                    else:
+                        count('errors')
+                    break
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(submitters)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    submit_secs = time.perf_counter() - start
+
+    # wait for the background recalculation of the standings
+    deadline = time.monotonic() + timeout
+    while not recalculation_worker.status()['fresh'] and time.monotonic() < deadline:
+        time.sleep(0.1)
+    status = recalculation_worker.status()
+
+    lost_updates = 0
+    final = {match.id: match for match in Match.objects.filter(id__in=saved)}
+    for match_id, results in saved.items():
+        results.sort()
+        match = final[match_id]
+        if ([version for version, _ in results] != list(range(1, len(results) + 1)) or match.version != len(results)
+                or (match.result_robot1_points, match.result_robot2_points) != results[-1][1]):
+            lost_updates += 1
+
+    # the standings reported as fresh must be those of a full recalculation from the saved results
+    def standings():
+        return set(RoundResult.objects.values_list(
+            'round_id', 'robot_id', 'total_robot_points', 'total_opponent_points', 'total_robot_rank'))
+    fresh_standings = standings()
+    MatchManager.get_instance().recalculate_round_results()
+    stale_standings = len(fresh_standings - standings())
+
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode')
+        journal_mode = cursor.fetchone()[0]
+
+    return {
+        'submitters': submitters,
+        'formset_submitters': formset_submitters,
+        'submissions': submitters * submissions,
+        'matches': len(match_ids),
+        'journal_mode': journal_mode,
+        **counts,
+        'lost_updates': lost_updates,
+        'stale_standings': stale_standings,
+        'submit_secs': round(submit_secs, 3),
+        'standings_fresh': status['fresh'],
+        'recalculation_error': status['error'],
+    }
@@ -0,0 +1,93 @@
+import hashlib
+import time
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Robot, Match, Round, RoundResult
+
+# Tournament-wide version: increased on every write of a Robot, Round, Match or RoundResult.
+# Cached fragments and data are keyed with the version, so they become invalid on every change
+# and old entries are evicted by the cache (LocMemCache is LRU).
+#
+# Note: LocMemCache is per process, deployments with several worker processes need a shared cache
+# (e.g. Memcached or Redis) for the version to be seen by all workers.
+
+VERSION_KEY = 'smtracker:tournament_version'
+MODIFIED_KEY = 'smtracker:tournament_modified'
+
+def get_tournament_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # a new (or evicted) version must never repeat an older one
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+def get_tournament_modified():
+    """Time of the last change of the tournament (or of the first use of the version)."""
+    modified = cache.get(MODIFIED_KEY)
+    if modified is None:
+        cache.add(MODIFIED_KEY, timezone.now().replace(microsecond=0), timeout=None)
+        modified = cache.get(MODIFIED_KEY)
+    return modified
+
+def increment_tournament_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+    cache.set(MODIFIED_KEY, timezone.now().replace(microsecond=0), timeout=None)
+
+def bump_tournament_version():
+    """Increase the tournament version once the current transaction is committed."""
+    transaction.on_commit(increment_tournament_version)
+
+def has_pending_messages(request):
+    """True if messages are waiting to be shown (they are stored in the messages cookie first)."""
+    return CookieStorage.cookie_name in request.COOKIES
+
+def tournament_etag(request, *args, **kwargs):
+    """ETag of read-only pages (for django.views.decorators.http.condition), none if there are messages to show."""
+    if has_pending_messages(request):
+        return None
+    return f"smtracker-{get_tournament_version()}"
+
+def tournament_form_etag(request, *args, **kwargs):
+    """
+    ETag of read-only pages with a form: the page contains the CSRF token, so the ETag also depends on the
+    CSRF secret of the client (a rotated secret, e.g. after login, needs a new page). Used without
+    Last-Modified, which cannot tell the secrets apart.
+    """
+    etag = tournament_etag(request)
+    if etag is None:
+        return None
+    secret = request.META.get('CSRF_COOKIE')
+    if secret:
+        etag += '-' + hashlib.sha256(secret.encode()).hexdigest()[:16]
+    return etag
+
+def tournament_last_modified(request, *args, **kwargs):
+    """Last-Modified of read-only pages (for django.views.decorators.http.condition)."""
+    if has_pending_messages(request):
+        return None
+    return get_tournament_modified()
+
+def cached(key, func, timeout=3600):
+    """Return func() cached under key for the current tournament version."""
+    return cache.get_or_set(f"smtracker:{get_tournament_version()}:{key}", func, timeout)
+
+# Single object writes (admin, formsets) are handled by signals, bulk writes in the managers bump the version
+# explicitly. RoundResult deletes are not connected to keep its bulk deletes fast (they always come with
+# a recalculation which bumps the version).
+@receiver(post_save, sender=Robot)
+@receiver(post_save, sender=Round)
+@receiver(post_save, sender=Match)
+@receiver(post_save, sender=RoundResult)
+@receiver(post_delete, sender=Robot)
+@receiver(post_delete, sender=Round)
+@receiver(post_delete, sender=Match)
+def tournament_changed(sender, **kwargs):
+    bump_tournament_version()
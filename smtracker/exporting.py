@@ -0,0 +1,103 @@
+import csv
+import json
+from .models import Robot, Match, RoundResult
+
+# Streaming export of robots, matches and round results (CSV or JSON).
+# Rows are read with QuerySet.iterator() and written one by one, so memory use does not depend on the tournament size.
+
+CHUNK_SIZE = 2000
+
+ROBOT_FIELDS = [field for field in Robot._meta.concrete_fields if not field.primary_key]
+ROBOT_COLUMNS = [field.name for field in ROBOT_FIELDS]
+
+def robot_row(robot):
+    return [getattr(robot, field.attname) for field in ROBOT_FIELDS]
+
+MATCH_COLUMNS = [
+    'round', 'match', 'status', 'schedule_time', 'schedule_table',
+    'robot1_registration_number', 'robot1_robot_name', 'robot1_country',
+    'robot2_registration_number', 'robot2_robot_name', 'robot2_country',
+    'result_robot1_points', 'result_robot2_points',
+]
+
+def match_row(match):
+    return [
+        match.round.ident, match.ident, match.status,
+        match.schedule_time.isoformat() if match.schedule_time else None, match.schedule_table,
+        match.robot1.registration_number, match.robot1.robot_name, match.robot1.country,
+        match.robot2.registration_number, match.robot2.robot_name, match.robot2.country,
+        match.result_robot1_points, match.result_robot2_points,
+    ]
+
+ROUND_RESULT_COLUMNS = [
+    'round', 'rank', 'registration_number', 'robot_name', 'country',
+    'round_robot_points', 'round_group1_points', 'round_group2_points', 'round_group3_points',
+    'total_robot_points', 'total_opponent_points',
+]
+
+def round_result_row(result):
+    return [
+        result.round.ident, result.total_robot_rank,
+        result.robot.registration_number, result.robot.robot_name, result.robot.country,
+        result.round_robot_points, result.round_group1_points, result.round_group2_points, result.round_group3_points,
+        result.total_robot_points, result.total_opponent_points,
+    ]
+
+def robot_queryset(round_obj=None):
+    robots = Robot.objects.order_by('registration_number')
+    if round_obj is not None:
+        robots = robots.filter(round_results__round=round_obj)
+    return robots
+
+def match_queryset(round_obj=None):
+    matches = Match.objects.select_related('round', 'robot1', 'robot2').order_by('round__order_index', 'ident')
+    if round_obj is not None:
+        matches = matches.filter(round=round_obj)
+    return matches
+
+def round_result_queryset(round_obj=None):
+    results = RoundResult.objects.select_related('round', 'robot').order_by('round__order_index', 'total_robot_rank', 'robot__registration_number')
+    if round_obj is not None:
+        results = results.filter(round=round_obj)
+    return results
+
+# export name -> (columns, queryset function, row function)
+EXPORTS = {
+    'robots': (ROBOT_COLUMNS, robot_queryset, robot_row),
+    'matches': (MATCH_COLUMNS, match_queryset, match_row),
+    'round_results': (ROUND_RESULT_COLUMNS, round_result_queryset, round_result_row),
+}
+
+FORMATS = {'csv': 'text/csv', 'json': 'application/json'}
+
+def export_rows(name, round_obj=None):
+    """Rows (lists of values) of the export, round_obj limits the export to one round."""
+    columns, queryset_func, row_func = EXPORTS[name]
+    for obj in queryset_func(round_obj).iterator(chunk_size=CHUNK_SIZE):
+        yield row_func(obj)
+
+class Echo:
+    """File-like object returning the written value, for csv.writer producing the streamed lines."""
+
+    def write(self, value):
+        return value
+
+def stream_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+def stream_json(columns, rows):
+    """JSON array of objects, one object per line."""
+    yield '['
+    separator = '\n'
+    for row in rows:
+        yield separator + json.dumps(dict(zip(columns, row)))
+        separator = ',\n'
+    yield '\n]\n'
+
+def stream_export(name, file_format, round_obj=None):
+    """Generator of the export file content (str chunks)."""
+    stream = stream_csv if file_format == 'csv' else stream_json
+    return stream(EXPORTS[name][0], export_rows(name, round_obj))
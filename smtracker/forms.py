@@ -1,12 +1,75 @@
 from django import forms
-from .models import Robot, Match
+from django.core.exceptions import ValidationError
+from .models import Robot, Match, MatchStatus, RoundType
 
 class MatchResultForm(forms.ModelForm):
     class Meta:
         model = Match
-        fields = ['status', 'result_robot1_points', 'result_robot2_points']  # Fields for match results
+        fields = ['status', 'result_robot1_points', 'result_robot2_points', 'version']  # Fields for match results
+        widgets = {'version': forms.HiddenInput}    # version the result is based on (optimistic locking)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # the winner of a knockout match advances to the next round, a draw would stop the bracket
+        match = self.instance
+        if (match.round_id is not None and match.round.round_type == RoundType.KNOCKOUT
+                and cleaned_data.get('status') == MatchStatus.FINISHED
+                and cleaned_data.get('result_robot1_points') is not None
+                and cleaned_data.get('result_robot1_points') == cleaned_data.get('result_robot2_points')
+                and not (match.robot1.is_byebot == 1 or match.robot2.is_byebot == 1)):
+            raise ValidationError(f"Knockout match {match.ident} needs a decisive result (no draw).")
+        return cleaned_data
 
 class RobotRegistrationForm(forms.ModelForm):
     class Meta:
         model = Robot
         fields = ['weight', 'byebot_points', 'robot_type', 'robot_kit_type', 'round_group1_qualified']
+
+class LoadedObjectChoiceField(forms.ModelChoiceField):
+    """Formset id field validated against the objects loaded by the formset (no query per form)."""
+
+    def __init__(self, lookup, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookup = lookup
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            obj = self.lookup(self.queryset.model._meta.pk.to_python(value))
+        except ValidationError:
+            obj = None
+        if obj is None:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        return obj
+
+class RobotRegistrationFormSet(forms.BaseModelFormSet):
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        pk_field = form.fields[self._pk_field.name]
+        form.fields[self._pk_field.name] = LoadedObjectChoiceField(
+            self._existing_object, pk_field.queryset, initial=pk_field.initial, required=False, widget=pk_field.widget
+        )
+
+class RobotFilterForm(forms.Form):
+    registration_from = forms.IntegerField(required=False, label='Reg. # from')
+    registration_to = forms.IntegerField(required=False, label='to')
+    qualified = forms.ChoiceField(required=False, label='Qualified G1',
+                                  choices=[('', 'All'), ('1', 'Qualified'), ('0', 'Not qualified')])
+
+    def filter(self, robots):
+        data = self.cleaned_data
+        if data['registration_from'] is not None:
+            robots = robots.filter(registration_number__gte=data['registration_from'])
+        if data['registration_to'] is not None:
+            robots = robots.filter(registration_number__lte=data['registration_to'])
+        if data['qualified'] == '1':
+            robots = robots.filter(round_group1_qualified=1)
+        elif data['qualified'] == '0':
+            robots = robots.exclude(round_group1_qualified=1)
+        return robots
+
+class RobotImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV with a header row of robot field names, or JSON (array of objects)")
+    file_format = forms.ChoiceField(choices=[('csv', 'CSV'), ('json', 'JSON')], label='Format')
+    dry_run = forms.BooleanField(required=False, help_text="validate only, nothing is saved")
@@ -0,0 +1,184 @@
+import csv
+import json
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .models import Robot
+from .cache import bump_tournament_version
+from .bulk import bulk_update_by_pk
+
+# Import of robot registration data (CSV with a header row, or JSON: an array of objects or one object per line).
+# The file is read row by row and written in batches, so memory use does not depend on the file size.
+
+IMPORT_FIELDS = [field for field in Robot._meta.concrete_fields if not field.primary_key]
+IMPORT_FIELD_NAMES = {field.name for field in IMPORT_FIELDS}
+
+MAX_REPORTED_ERRORS = 1000
+
+def read_csv(file):
+    yield from csv.DictReader(file)
+
+def read_json(file, chunk_size=65536):
+    """Read the objects of a JSON array (or of JSON lines) one by one, without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,[]')
+        if not buffer:
+            if eof:
+                return
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except ValueError:
+            if eof:
+                raise ValueError(f"Invalid JSON: {buffer[:50]}")
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        if not isinstance(obj, dict):
+            raise ValueError("Invalid JSON: robots must be objects.")
+        yield obj
+        buffer = buffer[end:]
+
+READERS = {'csv': read_csv, 'json': read_json}
+
+class RobotImporter:
+    """
+    Upsert robots on registration_number.
+
+    Every row is validated against the Robot model fields, invalid rows (and repeated registration numbers)
+    are reported and skipped. Only the columns present in the file are updated on existing robots.
+    Rows are written in batches (one bulk_create and one executemany update per batch, see bulk_update_by_pk)
+    inside one transaction.
+    """
+
+    def __init__(self, batch_size=500, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.error_count = 0
+        self.errors = []    # (row number, registration number, messages), at most MAX_REPORTED_ERRORS
+        self.ignored_columns = set()
+        self.seen = set()
+
+    def report(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'invalid': self.error_count,
+            'errors': [{'row': row, 'registration_number': number, 'errors': errors} for row, number, errors in self.errors],
+            'ignored_columns': sorted(self.ignored_columns),
+            'dry_run': self.dry_run,
+        }
+
+    def add_error(self, row_number, registration_number, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, registration_number, errors))
+
+    def import_file(self, file, file_format='csv'):
+        """Import robots from a text file, returns the report (see report())."""
+        rows = READERS[file_format](file)
+
+        with transaction.atomic():
+            batch = []
+            for row_number, row in enumerate(rows, start=1):
+                batch.append((row_number, row))
+                if len(batch) >= self.batch_size:
+                    self.import_batch(batch)
+                    batch = []
+            if batch:
+                self.import_batch(batch)
+
+            if self.created or self.updated:
+                bump_tournament_version()
+            if self.dry_run:
+                transaction.set_rollback(True)
+
+        return self.report()
+
+    def import_batch(self, batch):
+        numbers = []
+        for row_number, row in batch:
+            try:
+                numbers.append(int(row.get('registration_number')))
+            except (TypeError, ValueError):
+                pass
+        existing = Robot.objects.in_bulk(numbers, field_name='registration_number')
+
+        to_create = []
+        to_update = []
+        update_fields = set()
+        for row_number, row in batch:
+            self.ignored_columns.update(column for column in row if column is not None and column not in IMPORT_FIELD_NAMES)
+            robot = self.build_robot(row_number, row, existing)
+            if robot is None:
+                continue
+
+            if robot.pk is None:
+                to_create.append(robot)
+            else:
+                changed = [
+                    field.attname for field in IMPORT_FIELDS
+                    if getattr(robot, field.attname) != robot._original_values[field.attname]
+                ]
+                if changed:
+                    to_update.append(robot)
+                    update_fields.update(changed)
+                else:
+                    self.unchanged += 1
+
+        Robot.objects.bulk_create(to_create)
+        if to_update:
+            bulk_update_by_pk(to_update, sorted(update_fields))
+        self.created += len(to_create)
+        self.updated += len(to_update)
+
+    def build_robot(self, row_number, row, existing):
+        """Return the created or updated (not saved) robot of the row, None for invalid rows."""
+        values = {}
+        for field in IMPORT_FIELDS:
+            if field.name not in row:
+                continue
+            value = row[field.name]
+            if isinstance(value, str):
+                value = value.strip()
+            if value in ('', None):
+                value = field.get_default() if field.has_default() else (None if field.null else '')
+            values[field.attname] = value
+
+        try:
+            registration_number = Robot._meta.get_field('registration_number').to_python(values.get('registration_number'))
+        except ValidationError as e:
+            self.add_error(row_number, values.get('registration_number'), {'registration_number': e.messages})
+            return None
+        if registration_number is None:
+            self.add_error(row_number, None, {'registration_number': ["This field is required."]})
+            return None
+        if registration_number in self.seen:
+            self.add_error(row_number, registration_number, {'registration_number': ["Repeated in the file."]})
+            return None
+        self.seen.add(registration_number)
+
+        robot = existing.get(registration_number)
+        if robot is None:
+            robot = Robot()
+        else:
+            robot._original_values = {field.attname: getattr(robot, field.attname) for field in IMPORT_FIELDS}
+        for attname, value in values.items():
+            setattr(robot, attname, value)
+
+        try:
+            robot.clean_fields()
+        except ValidationError as e:
+            self.add_error(row_number, registration_number, {field: list(messages) for field, messages in e.message_dict.items()})
+            return None
+        return robot
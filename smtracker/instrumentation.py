@@ -0,0 +1,151 @@
+import contextvars
+import functools
+import heapq
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils import timezone
+
+# Instrumentation of requests and manager methods (opt-in, see SMTRACKER_INSTRUMENTATION setting):
+# query count, total SQL time, slowest statements and time spent in phases (manager methods, template rendering).
+
+_current = contextvars.ContextVar('smtracker_instrumentation', default=None)
+
+_recent_lock = threading.Lock()
+_recent = deque(maxlen=getattr(settings, 'SMTRACKER_INSTRUMENTATION_HISTORY', 50))
+
+SLOWEST_QUERIES = 5
+
+class Stats:
+    """Measurements of one instrumented request (or block of code)."""
+
+    def __init__(self, label):
+        self.label = label
+        self.started = timezone.now()
+        self.total_secs = 0.0
+        self.query_count = 0
+        self.sql_secs = 0.0
+        self.slowest_queries = []    # heap of (secs, sql)
+        self.phases = {}             # phase name -> secs
+        self.active_phases = set()
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            secs = time.perf_counter() - start
+            self.query_count += 1
+            self.sql_secs += secs
+            if len(self.slowest_queries) < SLOWEST_QUERIES:
+                heapq.heappush(self.slowest_queries, (secs, sql))
+            elif secs > self.slowest_queries[0][0]:
+                heapq.heapreplace(self.slowest_queries, (secs, sql))
+
+    @property
+    def python_secs(self):
+        return max(self.total_secs - self.sql_secs, 0.0)
+
+    def slowest(self):
+        return sorted(self.slowest_queries, reverse=True)
+
+    def server_timing(self):
+        """Value of the Server-Timing header."""
+        metrics = [
+            f'total;dur={self.total_secs * 1000:.1f}',
+            f'sql;dur={self.sql_secs * 1000:.1f};desc="{self.query_count} queries"',
+            f'python;dur={self.python_secs * 1000:.1f}',
+        ]
+        for name, secs in self.phases.items():
+            metrics.append(f'{re.sub(r"[^A-Za-z0-9_.-]", "-", name)};dur={secs * 1000:.1f}')
+        return ', '.join(metrics)
+
+def recent_stats():
+    """Stats of the last instrumented requests, newest first."""
+    with _recent_lock:
+        return list(reversed(_recent))
+
+@contextmanager
+def instrument(label):
+    """Instrument a block of code: all queries and phases inside the block are recorded into the yielded Stats."""
+    stats = Stats(label)
+    token = _current.set(stats)
+    start = time.perf_counter()
+    try:
+        with connection.execute_wrapper(stats.execute_wrapper):
+            yield stats
+    finally:
+        stats.total_secs = time.perf_counter() - start
+        _current.reset(token)
+
+@contextmanager
+def phase(name):
+    """Record the time spent in the block as phase `name` (no-op without active instrumentation)."""
+    stats = _current.get()
+    if stats is None or name in stats.active_phases:
+        yield
+        return
+
+    stats.active_phases.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.phases[name] = stats.phases.get(name, 0.0) + time.perf_counter() - start
+        stats.active_phases.discard(name)
+
+def instrumented(func):
+    """Decorator recording every call of func as a phase named after the function."""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current.get() is None:
+            return func(*args, **kwargs)
+        with phase(name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+def instrument_templates():
+    """Record template rendering as the 'render' phase."""
+    from django.template.base import Template
+
+    if getattr(Template, 'smtracker_instrumented', False):
+        return
+    Template.render = instrumented_render(Template.render)
+    Template.smtracker_instrumented = True
+
+def instrumented_render(render):
+    @functools.wraps(render)
+    def wrapper(self, context):
+        with phase('render'):
+            return render(self, context)
+    return wrapper
+
+class InstrumentationMiddleware:
+    """
+    Record query count, SQL time, slowest statements and phase times of every request, add them as
+    a Server-Timing header and keep the last SMTRACKER_INSTRUMENTATION_HISTORY requests for the
+    instrumentation page. Only active with SMTRACKER_INSTRUMENTATION = True.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SMTRACKER_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        instrument_templates()
+
+    def __call__(self, request):
+        with instrument(f"{request.method} {request.get_full_path()}") as stats:
+            response = self.get_response(request)
+
+        with _recent_lock:
+            _recent.append(stats)
+        response['Server-Timing'] = stats.server_timing()
+        return response
@@ -0,0 +1,38 @@
+# Single-elimination bracket in heap order.
+#
+# The matches of a knockout round are numbered by slot (1, 2, ...), slots 2k-1 and 2k of a round feed slot k
+# of the next knockout round of the round group. So the bracket is fully defined by the slots of the matches:
+# nothing is stored besides the matches, and advancing a finished match only touches its sibling and parent.
+
+def bracket_size(robot_count):
+    """Smallest power of two >= robot_count (the missing robots are byes)."""
+    size = 1
+    while size < robot_count:
+        size *= 2
+    return size
+
+def seed_order(size):
+    """
+    Seeds (1 = best) in bracket order: pairs of neighbours are the first round matches (1 vs size, ...)
+    and the best seeds can only meet in the latest rounds, e.g. 8 -> [1, 8, 4, 5, 2, 7, 3, 6].
+    """
+    order = [1]
+    while len(order) < size:
+        count = len(order) * 2
+        order = [s for seed in order for s in (seed, count + 1 - seed)]
+    return order
+
+def parent_slot(slot):
+    """Slot of the next round match fed by the match in slot."""
+    return (slot + 1) // 2
+
+def sibling_slot(slot):
+    """Slot of the other match feeding the same next round match."""
+    return slot + 1 if slot % 2 else slot - 1
+
+def match_ident(round_obj, slot):
+    return f"{round_obj.ident}-M{slot:02d}"
+
+def match_slot(match):
+    """Slot of a knockout match from its ident (see match_ident)."""
+    return int(match.ident.rsplit('-M', 1)[1])
@@ -0,0 +1,97 @@
+import itertools
+import json
+import threading
+from collections import deque
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Match, MatchStatus
+
+# In-process event bus for the live scoreboard (Server-Sent Events).
+# Events are kept in a bounded history, so reconnecting clients (Last-Event-ID) get the missed events.
+#
+# Event types:
+#   ranks     - rank changes after a recalculation of the round results
+#   result    - match result (match saved with status Finished)
+#   schedule  - newly scheduled matches of a round
+
+HISTORY = 1000
+
+class Event:
+    __slots__ = ('id', 'event_type', 'data')
+
+    def __init__(self, event_id, event_type, data):
+        self.id = event_id
+        self.event_type = event_type
+        self.data = data
+
+    def format(self):
+        """Event in the text/event-stream format."""
+        return f"id: {self.id}\nevent: {self.event_type}\ndata: {json.dumps(self.data)}\n\n"
+
+_condition = threading.Condition()
+_events = deque(maxlen=HISTORY)
+_ids = itertools.count(1)
+_listeners = 0
+
+def publish(event_type, data):
+    with _condition:
+        _events.append(Event(next(_ids), event_type, data))
+        _condition.notify_all()
+
+def publish_on_commit(event_type, data):
+    """Publish the event once the current transaction is committed (never for rolled back changes)."""
+    transaction.on_commit(lambda: publish(event_type, data))
+
+def last_event_id():
+    with _condition:
+        return _events[-1].id if _events else 0
+
+def has_listeners():
+    """True if a client is connected; the deltas are only computed for connected clients."""
+    return _listeners > 0
+
+def events_after(last_id):
+    return [event for event in _events if event.id > last_id]
+
+def wait_for_events(last_id, timeout):
+    """Return events newer than last_id, waiting up to timeout seconds for the first one."""
+    with _condition:
+        _condition.wait_for(lambda: _events and _events[-1].id > last_id, timeout)
+        return events_after(last_id)
+
+def stream(last_id, keep_alive_secs=15):
+    """Generator of the text/event-stream response, sends a comment line when there is nothing to send."""
+    global _listeners
+    with _condition:
+        _listeners += 1
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            events = wait_for_events(last_id, keep_alive_secs)
+            if not events:
+                yield ": keep-alive\n\n"
+            for event in events:
+                last_id = event.id
+                yield event.format()
+    finally:
+        with _condition:
+            _listeners -= 1
+
+def match_data(match):
+    return {
+        'round': match.round_id,
+        'ident': match.ident,
+        'robot1': match.robot1.robot_name,
+        'robot2': match.robot2.robot_name,
+        'schedule_table': match.schedule_table,
+        'schedule_time': match.schedule_time.isoformat() if match.schedule_time else None,
+        'result_robot1_points': match.result_robot1_points,
+        'result_robot2_points': match.result_robot2_points,
+    }
+
+# Results are entered one match at a time (formsets, admin), bulk writes of the managers publish their own events.
+@receiver(post_save, sender=Match)
+def match_saved(sender, instance, **kwargs):
+    if instance.status == MatchStatus.FINISHED and has_listeners():
+        publish_on_commit('result', match_data(instance))
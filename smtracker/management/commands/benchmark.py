@@ -0,0 +1,35 @@
+import json
+import platform
+import django
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from smtracker.benchmarks import run_benchmarks
+
+class Command(BaseCommand):
+    help = "Benchmark match generation, scheduling, recalculation and the main views on synthetic tournaments (database is left unchanged)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[64, 256, 1024], help="numbers of robots")
+        parser.add_argument('--rounds', type=int, default=5, help="number of played Swiss rounds")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=3, help="runs per operation (best wall time is reported)")
+        parser.add_argument('--label', default='', help="label of the run, e.g. commit or branch name")
+        parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+
+    def handle(self, *args, **options):
+        report = {
+            'label': options['label'],
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'rounds': options['rounds'],
+            'seed': options['seed'],
+            'results': run_benchmarks(options['sizes'], options['rounds'], options['seed'], options['repeat']),
+        }
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Benchmark report written to {options['output']}.")
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
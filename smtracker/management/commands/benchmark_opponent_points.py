@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from smtracker.benchmarks import benchmark_opponent_points
+
+class Command(BaseCommand):
+    help = "Compare the legacy and the current opponent points calculation on synthetic tournaments (database is left unchanged)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[64, 256, 1024], help="numbers of robots")
+        parser.add_argument('--rounds', type=int, default=5, help="number of Swiss rounds")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        stats = benchmark_opponent_points(options['sizes'], options['rounds'], options['seed'])
+
+        self.stdout.write(f"{'robots':>8} {'legacy [s]':>12} {'current [s]':>12} {'speedup':>9}  equal")
+        for row in stats:
+            self.stdout.write(f"{row['robots']:>8} {row['legacy_secs']:>12.3f} {row['current_secs']:>12.3f} {row['speedup']:>8.1f}x  {row['equal']}")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from smtracker.benchmarks import benchmark_tiebreaker_points
+
+class Command(BaseCommand):
+    help = "Compare the legacy and the current tiebreaker points calculation on synthetic tied groups (no database access)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[625, 1250, 2500, 5000], help="numbers of tied robots")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=3, help="runs per size (best time is reported)")
+
+    def handle(self, *args, **options):
+        stats = benchmark_tiebreaker_points(options['sizes'], options['seed'], options['repeat'])
+
+        self.stdout.write(f"{'robots':>8} {'legacy [s]':>12} {'current [s]':>12} {'speedup':>9} {'us/(n log n)':>13}  equal")
+        for row in stats:
+            self.stdout.write(
+                f"{row['robots']:>8} {row['legacy_secs']:>12.4f} {row['current_secs']:>12.4f} {row['speedup']:>8.1f}x"
+                f" {row['current_us_per_nlogn']:>13.3f}  {row['equal']}"
+            )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from smtracker.exporting import EXPORTS, FORMATS, stream_export
+from smtracker.models import Round
+
+class Command(BaseCommand):
+    help = "Export robots, matches or round results (whole event or one round) as CSV or JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--round', help="ident of the round (e.g. R1), default: whole event")
+        parser.add_argument('--output', help="write to this file instead of stdout")
+
+    def handle(self, *args, **options):
+        round_obj = None
+        if options['round']:
+            round_obj = Round.objects.filter(ident=options['round']).first()
+            if round_obj is None:
+                raise CommandError(f"Round {options['round']} does not exist.")
+
+        chunks = stream_export(options['name'], options['format'], round_obj)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                f.writelines(chunks)
+            self.stdout.write(f"Export written to {options['output']}.")
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
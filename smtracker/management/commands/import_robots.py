@@ -0,0 +1,35 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from smtracker.importing import READERS, RobotImporter
+
+class Command(BaseCommand):
+    help = "Import robot registration data from a CSV or JSON file (upsert on registration_number)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file with a header row of Robot field names, or JSON (array of objects or JSON lines)")
+        parser.add_argument('--format', choices=sorted(READERS), help="file format (default: from the file extension)")
+        parser.add_argument('--encoding', default='utf-8-sig')
+        parser.add_argument('--batch-size', type=int, default=500, help="rows written with one bulk_create/bulk_update")
+        parser.add_argument('--dry-run', action='store_true', help="validate and report only, nothing is saved")
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(f"Unknown file format '{file_format}', use --format.")
+
+        importer = RobotImporter(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        try:
+            with open(options['path'], encoding=options['encoding'], newline='') as f:
+                report = importer.import_file(f, file_format)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Import failed, nothing was saved: {e}")
+
+        for error in report['errors']:
+            messages = '; '.join(f"{field}: {' '.join(field_errors)}" for field, field_errors in error['errors'].items())
+            self.stderr.write(f"Row {error['row']} (registration_number {error['registration_number']}): {messages}")
+        if report['ignored_columns']:
+            self.stdout.write(f"Ignored columns: {', '.join(report['ignored_columns'])}")
+        self.stdout.write(
+            f"{'Dry run: ' if report['dry_run'] else ''}{report['created']} robots created, {report['updated']} updated, "
+            f"{report['unchanged']} unchanged, {report['invalid']} invalid rows."
+        )
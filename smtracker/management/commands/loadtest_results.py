@@ -0,0 +1,36 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+from django.core.management.base import BaseCommand
+from django.db import connection
+from smtracker.benchmarks import load_test_results
+
+class Command(BaseCommand):
+    help = "Load test concurrent result submissions through the match results page and API (on a temporary database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submitters', type=int, default=8, help="number of concurrent submitters (threads)")
+        parser.add_argument('--formset-submitters', type=int, default=None, help="submitters using the match results page instead of the API (default: half)")
+        parser.add_argument('--submissions', type=int, default=25, help="results submitted by every submitter")
+        parser.add_argument('--robots', type=int, default=64, help="number of robots of the synthetic tournament")
+        parser.add_argument('--rounds', type=int, default=3, help="number of Swiss rounds, results are submitted for the last one")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        # conflicts (409) are expected, do not log every one of them
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        # temporary file database with the same settings (journal mode, timeouts) as the configured one
+        directory = tempfile.mkdtemp()
+        connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'loadtest.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            report = load_test_results(options['submitters'], options['submissions'], options['robots'],
+                                       options['rounds'], options['seed'], formset_submitters=options['formset_submitters'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(directory, ignore_errors=True)
+
+        self.stdout.write(json.dumps(report, indent=2))
@@ -1,9 +1,42 @@
-import random
+from collections import deque
 from datetime import timedelta
-from django.db import models
+from django.conf import settings
+from django.db import connection, models, transaction
 from django.contrib import messages
-from django.db.models import Q
-from .models import Robot, Match, Round, RoundType, RoundResult
+from django.db.models import F, prefetch_related_objects
+from .models import Robot, Match, MatchStatus, Round, RoundType, RoundResult
+from .pairing import MatchingPairing
+from .scheduling import TableScheduler
+from .roundrobin import berger_table, snake_pools
+from .knockout import bracket_size, match_ident, match_slot, parent_slot, seed_order, sibling_slot
+from .instrumentation import instrumented
+from .cache import bump_tournament_version
+from .bulk import bulk_update_by_pk
+from . import live
+from .pairs import bulk_update_played_pairs, get_played_pairs, opponent_ids
+from .tiebreaks import TIEBREAKS, get_tiebreaks, get_tiebreak_fields
+from .snapshot import TournamentSnapshot, is_qualified
+
+def seed_robots(robots, round_obj, snapshot):
+    """
+    Order the robots by their rank in the latest round with results before round_obj,
+    robots without a result follow (by registration number).
+    """
+    previous_round = snapshot.latest_result_round(round_obj.order_index)
+    ranks = {robot.id: snapshot.result(previous_round.id, robot.id, 'total_robot_rank') for robot in robots} if previous_round else {}
+    return sorted(robots, key=lambda robot: (ranks.get(robot.id) is None, ranks.get(robot.id) or 0, robot.registration_number))
+
+class SwissStanding:
+    """Standing of a robot before a Swiss round (its position in the pairing order)."""
+    __slots__ = ('robot', 'total_points', 'opponent_points', 'tiebreaks', 'tiebreaker_points', 'played_byebot')
+
+    def __init__(self, robot, total_points, opponent_points, tiebreaks, played_byebot):
+        self.robot = robot
+        self.total_points = total_points
+        self.opponent_points = opponent_points
+        self.tiebreaks = tiebreaks
+        self.tiebreaker_points = 0
+        self.played_byebot = played_byebot
 
 class SwissMatchManager:
     _instance = None
@@ -15,12 +48,7 @@ class SwissMatchManager:
             cls._instance = cls()
         return cls._instance
 
-    def calculate_tiebreaker_points(self, robots, played_pairs):
-        """Custom logic for tiebreaker points."""
-        # Implement your logic here
-        # For now, return 0 for all
-        return {robot.id: 0 for robot in robots}
-
+    @instrumented
     def calculate_tiebreaker_points(self, robots, played_pairs, max_depth=6):
         """
         Calculates tiebreaker points for a list of robots based on pairing preferences.
@@ -38,55 +66,46 @@ class SwissMatchManager:
         
         Each paired robot receives descending tiebreaker points - the first pair gets the 
         highest scores, decreasing with each pair. Unmatched robots get the remaining points.
+
+        The robots are kept in a deque: the next robot is taken from the left and its opponent is chosen in one
+        pass over the last max_depth robots and removed near the right end, so every pair costs O(max_depth)
+        and the whole calculation is O(n log n) (the initial sort).
         """
         
         # Order robots by byebot_points (desc), then weight (desc)
-        sorted_robots = sorted(robots, key=lambda r: (r.byebot_points or 0, r.weight or 0), reverse=True)
-        remaining = sorted_robots[:]
+        remaining = deque(sorted(robots, key=lambda r: (r.byebot_points or 0, r.weight or 0), reverse=True))
         scores = {}
         current_score = len(robots)
     
         while len(remaining) > 1:
-            first = remaining.pop(0)
-            candidate = None
-       
-            # Collect possible candidates up to max_depth from the end
-            candidates = []
+            first = remaining.popleft()
+
+            # Candidates up to max_depth from the end, the first one with the best priority is chosen:
+            # 0 = same robot_type (if set), 1 = different country, 2 = different city, 3 = any robot
+            candidate_index = None
+            best_priority = 4
             for i in range(1, min(len(remaining), max_depth) + 1):
                 c = remaining[-i]
-                pair = (min(first.id, c.id), max(first.id, c.id))
-                if pair not in played_pairs:
-                    candidates.append(c)
-       
-            # Priority 1: Same robot_type (if set)
-            if first.robot_type:
-                for c in candidates:
-                    if c.robot_type == first.robot_type:
-                        candidate = c
-                        break
-       
-            # Priority 2: Different country
-            if not candidate:
-                for c in candidates:
-                    if c.country != first.country:
-                        candidate = c
-                        break
-       
-            # Priority 3: Different city
-            if not candidate:
-                for c in candidates:
-                    if c.city != first.city:
-                        candidate = c
+                if (min(first.id, c.id), max(first.id, c.id)) in played_pairs:
+                    continue
+                if first.robot_type and c.robot_type == first.robot_type:
+                    priority = 0
+                elif c.country != first.country:
+                    priority = 1
+                elif c.city != first.city:
+                    priority = 2
+                else:
+                    priority = 3
+                if priority < best_priority:
+                    candidate_index, best_priority = i, priority
+                    if priority == 0:
                         break
        
-            # Fallback: just pick first available
-            if not candidate and candidates:
-                candidate = candidates[0]
-       
-            if candidate:
+            if candidate_index is not None:
+                candidate = remaining[-candidate_index]
+                del remaining[-candidate_index]
                 scores[first.id] = current_score
                 scores[candidate.id] = current_score - 1
-                remaining.remove(candidate)
                 current_score -= 2
             else:
                 # No valid match found
@@ -100,7 +119,41 @@ class SwissMatchManager:
         return scores
        
 
-    def generate_for_round(self, round_obj, request=None):
+    @instrumented
+    def pair_greedy(self, robots, played_pairs, request=None):
+        """
+        Pair the ranked robots sequentially from the top of the list, each robot with the first available
+        (lower ranked) robot it has not played yet.
+
+        Returns a list of (robot1, robot2) tuples, robot2 is None if no valid opponent was found.
+        """
+        pairs = []
+        remaining = robots[:]
+
+        while remaining:
+            r1 = remaining[0]
+            for i in range(1, len(remaining)):
+                r2 = remaining[i]
+
+                pair = (min(r1.id, r2.id), max(r1.id, r2.id))
+                if pair in played_pairs:
+                    if request is not None:
+                        messages.debug(request, f"SwissMatchManager.generate_for_round: skipping duplicate match: {r1.robot_name} vs {r2.robot_name}...")
+                    continue
+
+                pairs.append((r1, r2))
+                # Remove both from list
+                remaining.pop(i)
+                remaining.pop(0)
+                break
+            else:
+                pairs.append((r1, None))
+                remaining.pop(0)
+
+        return pairs
+
+    @instrumented
+    def generate_for_round(self, round_obj, request=None, pairing=None, dry_run=False, snapshot=None):
         """
         Swiss-style Match Generation Rules:        
 
@@ -118,180 +171,380 @@ class SwissMatchManager:
         - ByeBot Match:
             - If the number of eligible robots is odd, the worst robot who hasn't yet played the ByeBot will be assigned a ByeBot match.
 
-        - Pair Selection:
+        - Pair Selection (pairing = "greedy", default):
             - Robots are paired sequentially from the top of the ranking list.
             - For each robot, the first available opponent (lower in ranking) that satisfies the pairing constraints is chosen.
             - If no valid opponent is found due to prior matches, a fallback ByeBot match is assigned with a warning.        
+
+        - Pair Selection (pairing = "matching"):
+            - Robots are paired as a minimum-cost perfect matching (see MatchingPairing): points difference is the cost,
+              same robot_type / different country / different city are bonuses.
+            - A fallback ByeBot match is only assigned if no pairing without duplicate matches exists.
+
+        The pairing defaults to the SMTRACKER_SWISS_PAIRING setting.
+
+        Robots, rounds and results are read from the tournament snapshot (loaded if not given).
+        All matches are built in memory and saved with one bulk insert in a single transaction.
+        With dry_run the planned (unsaved) matches are returned and nothing is written.
         """
+        pairing = pairing or getattr(settings, 'SMTRACKER_SWISS_PAIRING', 'greedy')
+        if pairing not in ('greedy', 'matching'):
+            raise ValueError(f"Unsupported pairing: {pairing}")
+
+        snapshot = snapshot or TournamentSnapshot.load()
         group_index = round_obj.round_group_index
 
         # Step 1: Determine previous round
-        previous_round = Round.objects.filter(
-            order_index__lt=round_obj.order_index,
-            round_group_index=group_index
-        ).order_by('-order_index').first()
-        previous_results = RoundResult.objects.filter(round=previous_round) if previous_round else RoundResult.objects.none()
+        previous_round = snapshot.previous_round(round_obj)
 
         # Step 2: Determine eligible robots
-        if group_index == 1:
-            robots = Robot.objects.filter(round_group1_qualified=1, is_byebot=0)
-        elif group_index == 2:
-            robots = Robot.objects.filter(round_group2_qualified=1, is_byebot=0)
-        elif group_index == 3:
-            robots = Robot.objects.filter(round_group3_qualified=1, is_byebot=0)
-        else:
-            robots = Robot.objects.filter(is_byebot=0)
+        robots = snapshot.qualified_robots(group_index)
 
         # Step 3: Determine robots who have already played against a byebot
-        byebot = Robot.objects.filter(is_byebot=1).first()
+        byebot = snapshot.byebot
         if byebot:
             byebot_id = byebot.id
-            byebot_matches = (
-                Match.objects.filter(
-                    round__order_index__lt=round_obj.order_index, round__round_group_index=group_index, robot1_id=byebot_id
-                ) |
-                Match.objects.filter(
-                    round__order_index__lt=round_obj.order_index, round__round_group_index=group_index, robot2_id=byebot_id
-                )
-            )
-            robots_vs_byebot_ids = set(byebot_matches.values_list('robot1_id', flat=True)) | set(byebot_matches.values_list('robot2_id', flat=True))
+            robots_vs_byebot_ids = opponent_ids(byebot_id, group_index, round_obj.order_index)
             robots_vs_byebot_ids.discard(byebot_id)
         else:
             byebot_id = None
             robots_vs_byebot_ids = set()
 
-        messages.debug(request, f"SwissMatchManager.generate_for_round(): robots_vs_byebot_ids = {robots_vs_byebot_ids}")
+        if request is not None:
+            messages.debug(request, f"SwissMatchManager.generate_for_round(): robots_vs_byebot_ids = {robots_vs_byebot_ids}")
 
         # Step 4: Combine data with results
         robot_data = []
-        results_map = {res.robot_id: res for res in previous_results}
+        tiebreak_fields = get_tiebreak_fields(round_obj)
 
         for robot in robots:
-            result = results_map.get(robot.id)
-            if result:
-                robot_data.append({
-                    'robot': robot,
-                    'total_points': result.total_robot_points or 0,
-                    'opponent_points': result.total_opponent_points or 0,
-                    'tiebreaker_points': 0,
-                    'played_byebot': robot.id in robots_vs_byebot_ids
-                })
+            if previous_round and snapshot.has_result(previous_round.id, robot.id):
+                total_points, opponent_points, *tiebreaks = [
+                    snapshot.result(previous_round.id, robot.id, field) or 0
+                    for field in ('total_robot_points', 'total_opponent_points', *tiebreak_fields)
+                ]
+                robot_data.append(SwissStanding(robot, total_points, opponent_points, tuple(tiebreaks), robot.id in robots_vs_byebot_ids))
             else:
-                robot_data.append({
-                    'robot': robot,
-                    'total_points': 0,
-                    'opponent_points': 0,
-                    'tiebreaker_points': 0,
-                    'played_byebot': 0
-                })
+                robot_data.append(SwissStanding(robot, 0, 0, (0,) * len(tiebreak_fields), False))
 
-        # Step 5: Sort robots (total_points desc, opponent_points desc)
-        robot_data.sort(key=lambda x: (-x['total_points'], -x['opponent_points']))
+        # Step 5: Sort robots (total_points desc, then the tiebreaks of the round desc, see smtracker.tiebreaks)
+        robot_data.sort(key=lambda x: (-x.total_points, tuple(-value for value in x.tiebreaks)))
 
-        messages.debug(request, f"SwissMatchManager.generate_for_round(): robot_data_len = {len(robot_data)}")
+        if request is not None:
+            messages.debug(request, f"SwissMatchManager.generate_for_round(): robot_data_len = {len(robot_data)}")
 
         # Step 6: Handle odd number by assigning byebot match 
-        match_cnt = 0
+        matches = []
         if len(robot_data) % 2 == 1:
             for robot in reversed(robot_data):  # Iterate from the worst to the best
-                if not robot['played_byebot']:
-                    Match.objects.create(
+                if not robot.played_byebot:
+                    matches.append(Match(
                         round=round_obj,
                         ident=f"{round_obj.ident}-M99",
-                        robot1=robot['robot'],
+                        robot1_id=robot.robot.id,
                         robot2_id=byebot_id,
                         status="Scheduled"
-                    )
-                    match_cnt += 1
+                    ))
                     robot_data.remove(robot)
                     break
 
-        # Build a set of (robot1_id, robot2_id) tuples that already played in this group
-        previous_matches = Match.objects.filter(round__order_index__lt=round_obj.order_index, round__round_group_index=group_index)
-        played_pairs = set()
-        for match in previous_matches:
-            a, b = match.robot1_id, match.robot2_id
-            played_pairs.add((min(a, b), max(a, b)))
+        # Set of (robot1_id, robot2_id) tuples (robot1_id < robot2_id) that already played in this group
+        played_pairs = get_played_pairs(group_index, round_obj.order_index)
 
         # Step 7: Handle tiebreakers
         i = 0
         while i < len(robot_data):
             j = i + 1
             while (j < len(robot_data) and
-                   robot_data[j]['total_points'] == robot_data[i]['total_points'] and
-                   robot_data[j]['opponent_points'] == robot_data[i]['opponent_points']):
+                   robot_data[j].total_points == robot_data[i].total_points and
+                   robot_data[j].tiebreaks == robot_data[i].tiebreaks):
                 j += 1
             # calculate tiebreaker_points only for groups of 3 and more robots
             if j - i > 2:
                 tied_group = robot_data[i:j]
-                tiebreaker_points = self.calculate_tiebreaker_points([r['robot'] for r in tied_group], played_pairs)
+                tiebreaker_points = self.calculate_tiebreaker_points([r.robot for r in tied_group], played_pairs)
                 for data in tied_group:
-                    data['tiebreaker_points'] = tiebreaker_points.get(data['robot'].id, 0)
-                robot_data[i:j] = sorted(tied_group, key=lambda x: -x['tiebreaker_points'])
+                    data.tiebreaker_points = tiebreaker_points.get(data.robot.id, 0)
+                robot_data[i:j] = sorted(tied_group, key=lambda x: -x.tiebreaker_points)
             i = j
 
         # debug: print robot data
         for d in robot_data:
-            messages.debug(request, f"SwissMatchManager.generate_for_round(): robot {d['robot'].robot_name} ({d['robot'].registration_number}): total_points = {d['total_points']}, opponent_points = {d['opponent_points']}, tiebreaker_points = {d['tiebreaker_points']}, {d['robot'].city}, {d['robot'].country}, b: {d['robot'].byebot_points}, w: {d['robot'].weight}, t: {d['robot'].robot_type}")
+            if request is not None:
+                messages.debug(request, f"SwissMatchManager.generate_for_round(): robot {d.robot.robot_name} ({d.robot.registration_number}): total_points = {d.total_points}, opponent_points = {d.opponent_points}, tiebreaker_points = {d.tiebreaker_points}, {d.robot.city}, {d.robot.country}, b: {d.robot.byebot_points}, w: {d.robot.weight}, t: {d.robot.robot_type}")
 
-        # Step 8: Pair and create matches
-        matches = []
+        # Step 8: Pair robots
+        ranked_robots = [r.robot for r in robot_data]
+        if pairing == 'matching':
+            pairs = MatchingPairing().pair(ranked_robots, [r.total_points for r in robot_data], played_pairs)
+        else:
+            pairs = self.pair_greedy(ranked_robots, played_pairs, request)
+
+        # Step 9: Create matches (in memory)
         match_id = 1  # only used for ident generation
+
+        for r1, r2 in pairs:
+            if r2 is None:
+                # No valid opponent found for r1
+                if request is not None:
+                    messages.error(request, f"Error: SwissMatchManager: No valid opponent found for {r1.robot_name}, adding duplicate match with ByeBot!")
+                # Add extra match against ByeBot -> violation of rules(?)
+                r2 = byebot
+
+            matches.append(Match(
+                round=round_obj,
+                ident=f"{round_obj.ident}-M{(match_id):02d}",
+                robot1_id=r1.id,
+                robot2_id=r2.id if r2 else None,
+                status="Scheduled"
+            ))
+            match_id += 1
+
+        if dry_run:
+            if request is not None:
+                messages.info(request, f"SwissMatchManager: {len(matches)} matches for round {round_obj.ident} were planned (dry run, nothing saved).")
+            return matches
+
+        # Step 10: Save all matches at once (nothing is saved if any of them fails)
+        with transaction.atomic():
+            with bulk_update_played_pairs([group_index]):
+                matches = Match.objects.bulk_create(matches)
+            bump_tournament_version()
+
+        if request is not None:
+            messages.success(request, f"SwissMatchManager: {len(matches)} matches for round {round_obj.ident} were created.")
+
+        return matches
+
+class RoundRobinMatchManager:
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        """Ensure only one instance of RoundRobinMatchManager exists."""
+        if not cls._instance:
+            cls._instance = cls()
+        return cls._instance
+
+    @instrumented
+    def generate_for_round(self, round_obj, request=None, pool_size=None, dry_run=False, snapshot=None):
+        """
+        Round-Robin Match Generation Rules:
+
+        - Eligibility:
+            - Only robots marked as qualified for the current round group (ByeBot excluded) take part.
+
+        - Pools:
+            - Robots are seeded by their rank in the latest round with results (robots without a result follow).
+            - The seeded robots are split into ceil(robots / pool_size) pools in snake order, so the pools are
+              balanced and their sizes differ by at most one.
+
+        - Matches:
+            - Every two robots of a pool play each other once (circle method, see berger_table).
+            - Matches are ordered by pool round, so the matches of each robot are spread over the round.
+            - With an odd pool size one robot of the pool sits out every pool round (no ByeBot matches).
+
+        The pool size defaults to the SMTRACKER_ROUND_ROBIN_POOL_SIZE setting.
+        Robots and seeds are read from the tournament snapshot (loaded if not given).
+
+        All matches are saved with one bulk insert and scheduled on the tables of the round (if its start time
+        is set) in a single transaction. With dry_run the planned (unsaved) matches are returned and nothing is written.
+        """
+        pool_size = pool_size or getattr(settings, 'SMTRACKER_ROUND_ROBIN_POOL_SIZE', 4)
+        if pool_size < 2:
+            raise ValueError(f"Unsupported pool size: {pool_size}")
+
+        snapshot = snapshot or TournamentSnapshot.load()
         group_index = round_obj.round_group_index
-                
-        # Create a working list of robot instances
-        remaining = [r['robot'] for r in robot_data]
-        paired_ids = set()
-        
-        while len(remaining) >= 1:
-            r1 = remaining[0]
-            found = False
-            for i in range(1, len(remaining)):
-                r2 = remaining[i]
+        robots = seed_robots(snapshot.qualified_robots(group_index), round_obj, snapshot)
+        if len(robots) < 2:
+            if request is not None:
+                messages.warning(request, f"Warning: RoundRobinMatchManager: not enough robots for round {round_obj.ident}.")
+            return []
 
-                pair = (min(r1.id, r2.id), max(r1.id, r2.id))
-                if pair in played_pairs:
-                    messages.debug(request, f"SwissMatchManager.generate_for_round: skipping duplicate match: {r1.robot_name} vs {r2.robot_name}...")
+        pools = snake_pools(robots, -(-len(robots) // pool_size))
+        tables = [berger_table(len(pool)) for pool in pools]
+
+        matches = []
+        for pool_round in range(max(len(table) for table in tables)):
+            for pool, table in zip(pools, tables):
+                if pool_round >= len(table):
                     continue
+                for i, j in table[pool_round]:
+                    matches.append(Match(
+                        round=round_obj,
+                        ident=f"{round_obj.ident}-M{len(matches) + 1:02d}",
+                        robot1_id=pool[i].id,
+                        robot2_id=pool[j].id,
+                        status=MatchStatus.SCHEDULED
+                    ))
+
+        if dry_run:
+            if request is not None:
+                messages.info(request, f"RoundRobinMatchManager: {len(matches)} matches in {len(pools)} pools for round {round_obj.ident} were planned (dry run, nothing saved).")
+            return matches
+
+        with transaction.atomic():
+            with bulk_update_played_pairs([group_index]):
+                matches = Match.objects.bulk_create(matches)
+            bump_tournament_version()
+            if round_obj.round_start_time and round_obj.number_of_tables:
+                MatchManager.get_instance().schedule_matches(round_obj, request, matches=matches, snapshot=snapshot)
 
-                # Create match
-                match = Match.objects.create(
-                    round=round_obj,
-                    ident=f"{round_obj.ident}-M{(match_id):02d}",
-                    robot1=r1,
-                    robot2=r2,
-                    status="Scheduled"
-                )
-                matches.append(match)
-                match_id += 1
-                match_cnt += 1
-                played_pairs.add(pair)
-                # Remove both from list
-                remaining.pop(i)
-                remaining.pop(0)
-                found = True
-                break
+        if request is not None:
+            messages.success(request, f"RoundRobinMatchManager: {len(matches)} matches in {len(pools)} pools for round {round_obj.ident} were created.")
 
-            if not found:
-                # No valid opponent found for r1
-                messages.error(request, f"Error: SwissMatchManager: No valid opponent found for {r1.robot_name}, adding duplicate match with ByeBot!")
-                # Add extra match against ByeBot -> violation of rules(?)
-                match = Match.objects.create(
-                    round=round_obj,
-                    ident=f"{round_obj.ident}-M{(match_id):02d}",
-                    robot1=r1,
-                    robot2=byebot,
-                    status="Scheduled"
-                )
-                matches.append(match)
-                match_id += 1
-                match_cnt += 1
-                remaining.pop(0)
+        return matches
+
+class KnockoutMatchManager:
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        """Ensure only one instance of KnockoutMatchManager exists."""
+        if not cls._instance:
+            cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def winner_id(match, byebot_ids):
+        """Id of the robot advancing from the match, None if the match is not decided (yet)."""
+        if match.robot2_id in byebot_ids:
+            return match.robot1_id
+        if match.robot1_id in byebot_ids:
+            return match.robot2_id
+        if match.status != MatchStatus.FINISHED or match.result_robot1_points is None or match.result_robot2_points is None:
+            return None
+        if match.result_robot1_points > match.result_robot2_points:
+            return match.robot1_id
+        if match.result_robot2_points > match.result_robot1_points:
+            return match.robot2_id
+        return None
+
+    @instrumented
+    def generate_for_round(self, round_obj, request=None, dry_run=False, snapshot=None):
+        """
+        Knockout Match Generation Rules:
+
+        - First knockout round of the round group (the bracket):
+            - Only robots marked as qualified for the current round group (ByeBot excluded) take part.
+            - Robots are seeded by their rank in the latest round with results (robots without a result follow).
+            - The bracket has the next power of two slots, the missing robots are ByeBot matches of the best seeds.
+            - Seeds are placed so that the best robots can only meet in the latest rounds (1 vs 8, 4 vs 5, ...).
+
+        - Following knockout rounds of the round group:
+            - The match of slot k is created once both feeding matches (slots 2k-1 and 2k of the previous
+              knockout round) are decided: Finished with a winner, or played against the ByeBot.
+            - Results saved with MatchManager.save_match_result advance the winner right away (see advance),
+              generating the round creates the remaining decided matches.
+
+        Robots, seeds and rounds are read from the tournament snapshot (loaded if not given), the matches of the
+        previous knockout round from the database. Matches that already exist in the round are kept. All new matches are saved with one bulk insert in
+        a single transaction. With dry_run the planned (unsaved) matches are returned and nothing is written.
+        """
+        snapshot = snapshot or TournamentSnapshot.load()
+        group_index = round_obj.round_group_index
+        previous_round = snapshot.previous_round(round_obj, round_type=RoundType.KNOCKOUT)
+        byebot = snapshot.byebot
+        existing_slots = {match_slot(match) for match in Match.objects.filter(round=round_obj).only('ident')}
+
+        if previous_round is None:
+            matches = self.build_bracket(round_obj, byebot, snapshot)
+        else:
+            matches = self.build_next_matches(previous_round, round_obj, {byebot.id} if byebot else set())
+        matches = [match for match in matches if match_slot(match) not in existing_slots]
+
+        if dry_run:
+            if request is not None:
+                messages.info(request, f"KnockoutMatchManager: {len(matches)} matches for round {round_obj.ident} were planned (dry run, nothing saved).")
+            return matches
+
+        with transaction.atomic():
+            with bulk_update_played_pairs([group_index]):
+                matches = Match.objects.bulk_create(matches)
+            bump_tournament_version()
+
+        if request is not None:
+            messages.success(request, f"KnockoutMatchManager: {len(matches)} matches for round {round_obj.ident} were created.")
 
-        messages.success(request, f"SwissMatchManager: {match_cnt} matches for round {round_obj.ident} were created.")
+        return matches
+
+    def build_bracket(self, round_obj, byebot, snapshot):
+        """First round matches of the bracket (unsaved), in slot order."""
+        robots = seed_robots(snapshot.qualified_robots(round_obj.round_group_index), round_obj, snapshot)
+        if len(robots) < 2:
+            raise ValueError(f"Not enough robots for the knockout round {round_obj.ident}.")
+        size = bracket_size(len(robots))
+        if size > len(robots) and byebot is None:
+            raise ValueError("A ByeBot is needed for the byes of the bracket.")
+
+        order = seed_order(size)
+        matches = []
+        for slot in range(1, size // 2 + 1):
+            seed1, seed2 = order[2 * slot - 2], order[2 * slot - 1]
+            matches.append(Match(
+                round=round_obj,
+                ident=match_ident(round_obj, slot),
+                robot1_id=robots[seed1 - 1].id,
+                robot2_id=(robots[seed2 - 1] if seed2 <= len(robots) else byebot).id,
+                status=MatchStatus.SCHEDULED
+            ))
+        return matches
 
+    def build_next_matches(self, previous_round, round_obj, byebot_ids):
+        """Matches (unsaved) of round_obj whose both feeding matches of previous_round are decided."""
+        winners = {
+            match_slot(match): self.winner_id(match, byebot_ids)
+            for match in Match.objects.filter(round=previous_round)
+        }
+        matches = []
+        for slot in range(1, max(winners, default=0) // 2 + 1):
+            robot1_id, robot2_id = winners.get(2 * slot - 1), winners.get(2 * slot)
+            if robot1_id is not None and robot2_id is not None:
+                matches.append(Match(
+                    round=round_obj,
+                    ident=match_ident(round_obj, slot),
+                    robot1_id=robot1_id,
+                    robot2_id=robot2_id,
+                    status=MatchStatus.SCHEDULED
+                ))
         return matches
 
+    def advance(self, match):
+        """
+        Advance the winner of a knockout match: once its sibling match is decided too, create the match of the
+        next knockout round fed by both (or update its robots if it exists and is not finished yet).
+        Only the match, its sibling and the next match are read. Returns the next match (or None).
+        """
+        round_obj = match.round
+        next_round = Round.objects.filter(
+            round_group_index=round_obj.round_group_index, round_type=RoundType.KNOCKOUT, order_index__gt=round_obj.order_index
+        ).order_by('order_index').first()
+        if next_round is None:
+            return None
+
+        byebot_ids = set(Robot.objects.filter(is_byebot=1).values_list('id', flat=True))
+        slot = match_slot(match)
+        sibling = Match.objects.filter(ident=match_ident(round_obj, sibling_slot(slot))).first()
+        winners = {
+            slot: self.winner_id(match, byebot_ids),
+            sibling_slot(slot): self.winner_id(sibling, byebot_ids) if sibling else None,
+        }
+        next_slot = parent_slot(slot)
+        robot1_id, robot2_id = winners[2 * next_slot - 1], winners[2 * next_slot]
+        if robot1_id is None or robot2_id is None:
+            return None
+
+        next_match, created = Match.objects.get_or_create(
+            ident=match_ident(next_round, next_slot),
+            defaults={'round': next_round, 'robot1_id': robot1_id, 'robot2_id': robot2_id, 'status': MatchStatus.SCHEDULED},
+        )
+        if not created and next_match.status != MatchStatus.FINISHED and (next_match.robot1_id, next_match.robot2_id) != (robot1_id, robot2_id):
+            # a corrected result changes the advancing robot
+            next_match.robot1_id, next_match.robot2_id = robot1_id, robot2_id
+            next_match.save(update_fields=['robot1', 'robot2'])
+        return next_match
+
 class MatchManager(models.Manager):
     _instance = None
 
@@ -302,27 +555,31 @@ class MatchManager(models.Manager):
             cls._instance = cls()
         return cls._instance
 
-    def generate_for_round(self, round_obj, request=None):
-        """Generate matches based on the round_type from the round_obj."""
+    @instrumented
+    def generate_for_round(self, round_obj, request=None, dry_run=False, snapshot=None):
+        """
+        Generate matches based on the round_type from the round_obj (with dry_run only return the planned matches).
+        snapshot is the tournament snapshot the generators read (loaded if not given).
+        """
         round_type = round_obj.round_type  # Get round type directly from the round object
         
         if round_type == RoundType.SWISS:
             match_manager = SwissMatchManager.get_instance()
         elif round_type == RoundType.ROUND_ROBIN:
-            # Implement round-robin logic here
-            pass
+            match_manager = RoundRobinMatchManager.get_instance()
         elif round_type == RoundType.KNOCKOUT:
-            # Implement knockout logic here
-            pass
+            match_manager = KnockoutMatchManager.get_instance()
         else:
             raise ValueError("Unsupported round type")
 
-        matches = match_manager.generate_for_round(round_obj, request)
+        matches = match_manager.generate_for_round(round_obj, request, dry_run=dry_run, snapshot=snapshot)
         return matches
 
+    @instrumented
     def delete_for_round(self, round_obj, request=None):
         """Delete matches."""
-        match_count = Match.objects.filter(round=round_obj).delete()[0]
+        with transaction.atomic(), bulk_update_played_pairs([round_obj.round_group_index]):
+            match_count = Match.objects.filter(round=round_obj).delete()[0]
 
         if request is not None:
             if match_count > 0:
@@ -332,180 +589,349 @@ class MatchManager(models.Manager):
 
         return match_count
 
-    def schedule_matches(self, round_obj, request=None, match_time_mins=4):
+    def save_match_result(self, match, status, result_robot1_points, result_robot2_points):
+        """
+        Save the result of one match with optimistic locking: the row is updated only if its version is still
+        match.version (the version the result is based on), the version is increased with the update.
+        Returns False if the match was changed in the meantime.
 
+        The update is a single statement, so the write lock is held only for its duration.
+        The winner of a finished knockout match advances to the next knockout round (KnockoutMatchManager.advance).
+        """
+        updated = Match.objects.filter(id=match.id, version=match.version).update(
+            status=status,
+            result_robot1_points=result_robot1_points,
+            result_robot2_points=result_robot2_points,
+            version=F('version') + 1,
+        )
+        if not updated:
+            return False
+
+        match.status = status
+        match.result_robot1_points = result_robot1_points
+        match.result_robot2_points = result_robot2_points
+        match.version += 1
+        bump_tournament_version()
+        if status == MatchStatus.FINISHED and live.has_listeners():
+            live.publish_on_commit('result', live.match_data(match))
+        if status == MatchStatus.FINISHED and match.round.round_type == RoundType.KNOCKOUT:
+            KnockoutMatchManager.get_instance().advance(match)
+        return True
+
+    @instrumented
+    def schedule_matches(self, round_obj, request=None, match_time_mins=4, rest_time_mins=4, table_preferences=None, seed=None, matches=None, snapshot=None):
+        """
+        Schedule the matches of the round on its tables (see TableScheduler).
+
+        - Every match takes match_time_mins, the first matches start at round_start_time.
+        - A robot is never due on two tables at the same time and rests at least rest_time_mins between
+          its matches.
+        - Matches against the ByeBot are not played, they get no table and no time (and take no slot).
+        - table_preferences (robot_id -> table number) are used whenever possible.
+        - Tables are assigned randomly with a seeded RNG (default seed: round id), so the schedule is reproducible.
+
+        matches are the (saved) matches of the round, loaded from the database if not given. The ByeBot is taken
+        from the tournament snapshot if given.
+        All matches are updated with one executemany (bulk_update_by_pk).
+        """
         if not round_obj.round_start_time or not round_obj.number_of_tables:
             if request:
                 messages.error(request, f"Error: Missing start time or number of tables for round {round_obj.ident}!")
             return []
-    
-        matches = Match.objects.filter(round=round_obj).order_by('ident')
-        table_count = round_obj.number_of_tables
-        table_times = [round_obj.round_start_time for _ in range(table_count)]
-    
-        for i in range(0, len(matches), table_count):
-            group = matches[i:i+table_count]
-            available_tables = list(range(1, table_count + 1))
-            random.shuffle(available_tables)
-    
-            for match, table_number in zip(group, available_tables):
-                match.schedule_time = table_times[table_number - 1]
-                match.schedule_table = table_number
-                match.save()
-    
-                # Add 5 minutes after each match for this table
-                table_times[table_number - 1] += timedelta(minutes=match_time_mins)
-    
-        return matches
-    
-    def calculate_opponent_points(self, request=None):
-        """recalculate opponent points for every round and every robot"""
 
-        rounds = Round.objects.all().order_by('order_index')
+        if matches is None:
+            matches = list(Match.objects.filter(round=round_obj).select_related('robot1', 'robot2').order_by('ident'))
+        byebot_ids = snapshot.byebot_ids if snapshot is not None else set(Robot.objects.filter(is_byebot=1).values_list('id', flat=True))
+
+        scheduler = TableScheduler(
+            round_obj.number_of_tables,
+            rest_slots=-(-rest_time_mins // match_time_mins),  # rounded up to whole matches
+            table_preferences=table_preferences,
+            seed=round_obj.id if seed is None else seed,
+        )
+        played_matches = []
+        for match in matches:
+            if match.robot1_id in byebot_ids or match.robot2_id in byebot_ids:
+                match.schedule_time = None
+                match.schedule_table = None
+            else:
+                played_matches.append(match)
 
+        for match, slot, table_number in scheduler.schedule(played_matches):
+            match.schedule_time = round_obj.round_start_time + timedelta(minutes=slot * match_time_mins)
+            match.schedule_table = table_number
 
-        for round_obj in rounds:
-            previous_rounds = Round.objects.filter(order_index__lte=round_obj.order_index, round_group_index=round_obj.round_group_index)
+        with transaction.atomic():
+            bulk_update_by_pk(matches, ['schedule_time', 'schedule_table'])
+            bump_tournament_version()
+
+        if live.has_listeners():
+            # generated matches only have the robot ids
+            prefetch_related_objects(matches, 'robot1', 'robot2')
+            live.publish_on_commit('schedule', {'round': round_obj.id, 'matches': [live.match_data(match) for match in matches]})
+
+        return matches
 
-            # For each robot in this round
-            results = RoundResult.objects.filter(round=round_obj)
+    @staticmethod
+    def get_group_rounds(rounds, snapshot):
+        """Rounds of the round groups of the given rounds up to the last of them (ordered by order_index)."""
+        group_indexes = {round_obj.round_group_index for round_obj in rounds}
+        last_order_index = max(round_obj.order_index for round_obj in rounds)
+        return [
+            round_obj for round_obj in snapshot.rounds
+            if round_obj.round_group_index in group_indexes and round_obj.order_index <= last_order_index
+        ]
+
+    @instrumented
+    def calculate_opponent_points(self, request=None, rounds=None, round_results=None, snapshot=None):
+        """
+        Recalculate opponent points for every robot in the given rounds (default: every round).
+
+        Opponent points of a robot in a round are the total points (in that round) of all different opponents
+        the robot played in the round group up to and including that round, ByeBot excluded.
+        The opponents are accumulated round by round in memory from the matches of the tournament snapshot
+        (loaded if not given), the changed results are written back with one bulk_update. If round_results
+        (unsaved results of the given rounds) are passed, the opponent points are only assigned to them and
+        nothing is written.
+        """
+        if rounds is None:
+            rounds = Round.objects.all().order_by('order_index')
+        rounds = list(rounds)
+        if not rounds:
+            return 0
+
+        snapshot = snapshot or TournamentSnapshot.load()
+        # All rounds of the affected groups up to the last updated round (their matches define the opponents)
+        group_rounds = self.get_group_rounds(rounds, snapshot)
+        byebot_ids = snapshot.byebot_ids
+
+        round_matches = {}
+        for _, round_id, robot1_id, robot2_id, _, _ in snapshot.match_rows(round_obj.id for round_obj in group_rounds):
+            round_matches.setdefault(round_id, []).append((robot1_id, robot2_id))
+
+        save_results = round_results is None
+        if save_results:
+            round_results = RoundResult.objects.filter(round__in=rounds)
+        results_map = {}
+        for result in round_results:
+            results_map.setdefault(result.round_id, []).append(result)
+
+        updated_round_ids = {round_obj.id for round_obj in rounds}
+        group_opponents = {}  # round_group_index -> {robot_id: set of opponent ids}
+        updated_results = []
+
+        for round_obj in group_rounds:
+            opponents = group_opponents.setdefault(round_obj.round_group_index, {})
+            for robot1_id, robot2_id in round_matches.get(round_obj.id, ()):
+                if robot1_id == robot2_id:
+                    continue
+                if robot2_id not in byebot_ids:
+                    opponents.setdefault(robot1_id, set()).add(robot2_id)
+                if robot1_id not in byebot_ids:
+                    opponents.setdefault(robot2_id, set()).add(robot1_id)
+
+            if round_obj.id not in updated_round_ids:
+                continue
+
+            # Sum the points of the opponents in the current round
+            results = results_map.get(round_obj.id, [])
+            points = {result.robot_id: result.total_robot_points or 0 for result in results}
             for result in results:
-                robot = result.robot
+                opponent_points = sum(points.get(opponent_id, 0) for opponent_id in opponents.get(result.robot_id, ()))
+                if result.total_opponent_points != opponent_points:
+                    result.total_opponent_points = opponent_points
+                    updated_results.append(result)
 
-                # Get matches of this robot from previous rounds
-                matches = Match.objects.filter(round__in=previous_rounds).filter(
-                    Q(robot1=robot) | Q(robot2=robot)
-                )
+        if save_results:
+            RoundResult.objects.bulk_update(updated_results, ['total_opponent_points'])
+            bump_tournament_version()
+
+        if request is not None:
+            messages.success(request, f"Opponent points were recalculated.")
 
-                opponent_ids = set()
-                for match in matches:
-                    opponent = None
-                    if match.robot1 == robot:
-                        opponent = match.robot2
-                    elif match.robot2 == robot:
-                        opponent = match.robot1
+        return len(updated_results)
 
-                    if opponent.id != robot.id and opponent.is_byebot != 1:
-                        opponent_ids.add(opponent.id)
+    @instrumented
+    def calculate_tiebreaks(self, request=None, rounds=None, round_results=None, snapshot=None):
+        """
+        Recalculate the tiebreak values (smtracker.tiebreaks) for every robot in the given rounds (default: every round).
+
+        All policies are computed together from the match results of the round group up to and including the
+        round, ByeBot matches excluded. The records of the robots are accumulated round by round in memory from
+        the matches of the tournament snapshot (loaded if not given). Head-to-head is computed among the robots tied on total points and on the tiebreaks
+        preceding it in the chain of the round, so calculate_opponent_points() has to be called first.
+        Like calculate_opponent_points(), passed round_results are only assigned, otherwise the changed results
+        are written back with one bulk_update.
+        """
+        if rounds is None:
+            rounds = Round.objects.all().order_by('order_index')
+        rounds = list(rounds)
+        if not rounds:
+            return 0
+
+        snapshot = snapshot or TournamentSnapshot.load()
+        group_rounds = self.get_group_rounds(rounds, snapshot)
+        byebot_ids = snapshot.byebot_ids
+
+        round_matches = {}
+        for _, round_id, *match in snapshot.match_rows(round_obj.id for round_obj in group_rounds):
+            round_matches.setdefault(round_id, []).append(match)
+
+        save_results = round_results is None
+        if save_results:
+            round_results = RoundResult.objects.filter(round__in=rounds)
+        results_map = {}
+        for result in round_results:
+            results_map.setdefault(result.round_id, []).append(result)
+
+        fields = [field for field, _ in TIEBREAKS.values() if field != 'total_opponent_points']
+        updated_round_ids = {round_obj.id for round_obj in rounds}
+        group_records = {}  # round_group_index -> {robot_id: [(opponent_id, own points, opponent's points), ...]}
+        updated_results = []
+
+        for round_obj in group_rounds:
+            records = group_records.setdefault(round_obj.round_group_index, {})
+            for robot1_id, robot2_id, points1, points2 in round_matches.get(round_obj.id, ()):
+                if robot1_id == robot2_id or robot1_id in byebot_ids or robot2_id in byebot_ids:
+                    continue
+                records.setdefault(robot1_id, []).append((robot2_id, points1 or 0, points2 or 0))
+                records.setdefault(robot2_id, []).append((robot1_id, points2 or 0, points1 or 0))
 
-                #if robot.id == 6 and round.ident == 'R2':
-                #messages.debug(request, f"MatchManager.calculate_opponent_points(): round_ident = {round_obj.ident}, robot_id = {robot.id}, opponent_ids = {opponent_ids}")
+            if round_obj.id not in updated_round_ids:
+                continue
 
-                # Sum the points of those opponents in current round
-                total_opponent_points = RoundResult.objects.filter(
-                    round=round_obj,
-                    robot__id__in=opponent_ids
-                ).aggregate(total=models.Sum('total_robot_points'))['total'] or 0
+            results = results_map.get(round_obj.id, [])
+            points = {result.robot_id: result.total_robot_points or 0 for result in results}
+            previous_values = {result.robot_id: tuple(getattr(result, field) for field in fields) for result in results}
+            for result in results:
+                record = records.get(result.robot_id, ())
+                for field, function in TIEBREAKS.values():
+                    if function is not None:
+                        setattr(result, field, function(record, points))
+
+            # head-to-head within the groups of robots tied on total points and the preceding tiebreaks
+            chain = get_tiebreaks(round_obj)
+            preceding = [TIEBREAKS[name][0] for name in chain[:chain.index('head_to_head')]] if 'head_to_head' in chain else []
+            tie_keys = {
+                result.robot_id: (points[result.robot_id],) + tuple(getattr(result, field) or 0 for field in preceding)
+                for result in results
+            }
+            tied = {}
+            for robot_id, key in tie_keys.items():
+                tied.setdefault(key, set()).add(robot_id)
+            for result in results:
+                tied_ids = tied[tie_keys[result.robot_id]]
+                result.tiebreak_head_to_head = sum(
+                    own_points for opponent_id, own_points, _ in records.get(result.robot_id, ()) if opponent_id in tied_ids
+                ) if len(tied_ids) > 1 else 0
+                if tuple(getattr(result, field) for field in fields) != previous_values[result.robot_id]:
+                    updated_results.append(result)
 
-                # Update the result
-                result.total_opponent_points = total_opponent_points
-                result.save()
+        if save_results:
+            RoundResult.objects.bulk_update(updated_results, fields)
+            bump_tournament_version()
 
-        messages.success(request, f"Opponent points were recalculated.")
+        if request is not None:
+            messages.success(request, f"Tiebreaks were recalculated.")
 
-    def calculate_ranks_for_rounds(self, request=None):
+        return len(updated_results)
 
-        rounds = Round.objects.all().order_by('order_index')
+    @instrumented
+    def calculate_ranks_for_rounds(self, request=None, rounds=None):
+        """
+        Assign ranks to the results of the given rounds (default: every round).
 
+        Results are ranked per round by total_robot_points and then by the tiebreak chain of the round (all
+        descending, see smtracker.tiebreaks) using RANK(): robots tied on all of them get the same rank and
+        the following ranks are skipped (1, 2, 2, 4...). One SELECT is executed per distinct chain, the ranks
+        are written with one executemany of an UPDATE by primary key (UPDATE ... FROM needs SQLite 3.33).
+        """
+        if rounds is None:
+            rounds = Round.objects.all()
+        round_ids_by_fields = {}
         for round_obj in rounds:
-            # Sort the RoundResults by total_robot_points in descending order
-            round_results = RoundResult.objects.filter(round=round_obj).order_by('-total_robot_points', '-total_opponent_points')
-        
-            # Assign ranks to each result based on the sorted order
-            rank = 1
-            for round_result_obj in round_results:
-                round_result_obj.total_robot_rank = rank
-                round_result_obj.save()
-                rank += 1
-
-        messages.success(request, f"Robot ranks were recalculated.")
-        
-        return (rank - 1)
+            round_ids_by_fields.setdefault(tuple(get_tiebreak_fields(round_obj)), []).append(round_obj.id)
+        if not round_ids_by_fields:
+            return 0
+
+        table = RoundResult._meta.db_table
+        rank_cnt = 0
+        with connection.cursor() as cursor:
+            for fields, params in round_ids_by_fields.items():
+                # the fields come from the TIEBREAKS registry, never from user input
+                order_by = ', '.join(f"{connection.ops.quote_name(RoundResult._meta.get_field(field).column)} DESC" for field in ('total_robot_points',) + fields)
+                cursor.execute(f"""
+                    SELECT RANK() OVER (
+                        PARTITION BY round_id ORDER BY {order_by}
+                    ) AS robot_rank, id
+                    FROM {table} WHERE round_id IN ({', '.join(['%s'] * len(params))})
+                """, params)
+                ranks = cursor.fetchall()
+                cursor.executemany(f"UPDATE {table} SET total_robot_rank = %s WHERE id = %s", ranks)
+                rank_cnt += len(ranks)
+        bump_tournament_version()
 
-    def calculate_ranks_for_rounds(self, request=None):
-        rounds = Round.objects.all().order_by('order_index')
-    
-        for round_obj in rounds:
-            # Sort results by total_robot_points and total_opponent_points, both descending
-            round_results = RoundResult.objects.filter(round=round_obj).order_by('-total_robot_points', '-total_opponent_points')
-    
-            rank = 1
-            prev_points = None
-            prev_opponent_points = None
-            tie_rank = rank  # store the rank to assign in case of tie
-    
-            for round_result_obj in round_results:
-                # Check for tie with previous result
-                if prev_points is not None and (
-                    round_result_obj.total_robot_points == prev_points and
-                    round_result_obj.total_opponent_points == prev_opponent_points
-                ):
-                    round_result_obj.total_robot_rank = tie_rank  # assign the same rank
-                else:
-                    tie_rank = rank  # update tie_rank to current rank
-                    round_result_obj.total_robot_rank = rank
-                    prev_points = round_result_obj.total_robot_points
-                    prev_opponent_points = round_result_obj.total_opponent_points
-    
-                round_result_obj.save()
-                rank += 1
-    
-        messages.success(request, f"Robot ranks were recalculated.")
-        return (rank - 1)
+        if request is not None:
+            messages.success(request, f"Robot ranks were recalculated.")
 
-    def recalculate_round_results(self, request=None):
-        """recalculate_round_results."""
+        return rank_cnt
 
-        result_cnt = 0
-        RoundResult.objects.all().delete()
-        
-        robots = Robot.objects.all()
-        rounds = Round.objects.all().order_by('order_index')
+    @staticmethod
+    def is_qualified(robot, group_index):
+        """Return True if the robot takes part in rounds of the given round group (group 0 = all robots)."""
+        return is_qualified(robot, group_index)
 
+    @instrumented
+    def build_round_results(self, robots, rounds, matches, request=None, initial_points=None, byebot_played=None):
+        """
+        Build (unsaved) RoundResult objects for the given robots, rounds and matches (model instances or
+        the records of the tournament snapshot).
+
+        - rounds must be ordered by order_index, matches are grouped by (round, robot) in memory.
+        - Points are accumulated per round group (g1 + 1000*g2 + 1000000*g3), starting from initial_points
+          (robot_id -> (g1, g2, g3) points of the preceding rounds, default 0).
+        - Only the first match against the ByeBot is counted for a robot, points from further ByeBot matches are ignored
+          (robots in byebot_played already had their ByeBot match counted in the preceding rounds).
+        - The ByeBot itself always gets -1 points (to ensure it remains in last place).
+        """
+        initial_points = initial_points or {}
+        byebot_played = byebot_played or set()
+        byebot_ids = {robot.id for robot in robots if robot.is_byebot == 1}
+
+        # Group matches by (round_id, robot_id), ordered by match id
+        robot_matches = {}
+        for match in sorted(matches, key=lambda m: m.id):
+            robot_matches.setdefault((match.round_id, match.robot1_id), []).append(match)
+            if match.robot2_id != match.robot1_id:
+                robot_matches.setdefault((match.round_id, match.robot2_id), []).append(match)
+
+        round_results = []
         for robot in robots:
 
-            group1_points = 0
-            group2_points = 0
-            group3_points = 0
+            group1_points, group2_points, group3_points = initial_points.get(robot.id, (0, 0, 0))
 
-            calc_byebot = 1
+            calc_byebot = 0 if robot.id in byebot_played else 1
             for round_obj in rounds:
 
-                group_index = round_obj.round_group_index
-
                 # Check qualification
-                if group_index == 1 and not robot.round_group1_qualified:
-                    continue
-                if group_index == 2 and not robot.round_group2_qualified:
-                    continue
-                if group_index == 3 and not robot.round_group3_qualified:
+                if not self.is_qualified(robot, round_obj.round_group_index):
                     continue
 
-                # Matches in the specific round
-                matches = (
-                    Match.objects.filter(round=round_obj).filter(robot1=robot) | 
-                    Match.objects.filter(round=round_obj).filter(robot2=robot)
-                )
-        
                 round_points = 0
-                for match in matches:
-                    points = 0
-                    if match.robot1 == robot:
+                for match in robot_matches.get((round_obj.id, robot.id), ()):
+                    if match.robot1_id == robot.id:
                         points = match.result_robot1_points or 0
-                    elif match.robot2 == robot:
+                    else:
                         points = match.result_robot2_points or 0
                     # calculate only points for the first match with ByeBot
-                    if (robot.is_byebot == 0) and (match.robot1.is_byebot == 1 or match.robot2.is_byebot == 1):
+                    if (robot.is_byebot == 0) and (match.robot1_id in byebot_ids or match.robot2_id in byebot_ids):
                         if calc_byebot == 0:
                             points = 0
-                            messages.warning(request, f"Warning: MatchManager.recalculate_round_results: multiple matches with ByeBot found in round {round_obj.ident} for {robot.robot_name}, points ignored!")
+                            if request is not None:
+                                messages.warning(request, f"Warning: MatchManager.recalculate_round_results: multiple matches with ByeBot found in round {round_obj.ident} for {robot.robot_name}, points ignored!")
                         calc_byebot = 0
                     round_points += points
 
-                # The ByeBot must never score any points in the round results (to ensure it remains in last place)
-                if robot.is_byebot == 1:
-                    round_points = -1
-
                 match round_obj.round_group_index:
                     case 1:
                         group1_points += round_points
@@ -514,31 +940,151 @@ class MatchManager(models.Manager):
                     case 3:
                         group3_points += round_points
 
+                total_points = ( group1_points + 1000 * group2_points + 1000000 * group3_points )
+
+                # The ByeBot must never score any points in the round results (to ensure it remains in last place)
                 if robot.is_byebot == 1:
+                    round_points = -1
                     group1_points = -1
                     group2_points = -1
                     group3_points = -1
-
-                total_points = ( group1_points + 1000 * group2_points + 1000000 * group3_points )
-
-                if robot.is_byebot == 1:
                     total_points = -1
-        
-                RoundResult.objects.create(
-                    robot=robot,
+
+                round_results.append(RoundResult(
+                    robot_id=robot.id,
                     round=round_obj,
                     round_robot_points = round_points,
                     round_group1_points = group1_points,
                     round_group2_points = group2_points,
                     round_group3_points = group3_points,
                     total_robot_points = total_points,
-                )
+                ))
 
-                result_cnt += 1
+        return round_results
 
-        messages.success(request, f"Round results were recalculated.")
+    @instrumented
+    def recalculate_round_results(self, request=None, from_round=None, snapshot=None):
+        """
+        Recalculate round results.
+
+        Without from_round all round results are rebuilt. With from_round only the results of that round
+        and of the later rounds (higher order_index) are rebuilt, starting from the cumulative points stored
+        for the preceding rounds. Later rounds of other round groups are included as well, because the
+        group points are carried over into them.
+
+        Robots, rounds, matches and the stored results are read from one tournament snapshot, the results,
+        opponent points and tiebreaks are computed in memory (see build_round_results, calculate_opponent_points,
+        calculate_tiebreaks) and written with a single bulk insert. Everything runs in one transaction: the
+        snapshot is loaded (if not given) after the write lock is taken (IMMEDIATE transactions, see DATABASES),
+        so concurrent recalculations are serialized and the one committed last is computed from the latest data.
+        A given snapshot has to be loaded inside the caller's transaction.
+        """
+        with transaction.atomic():
+            snapshot = snapshot or TournamentSnapshot.load()
+            robots = snapshot.robots
+            rounds = snapshot.rounds
+            initial_points = None
+            byebot_played = None
+
+            if from_round is not None:
+                previous_rounds = [r for r in rounds if r.order_index < from_round.order_index]
+                if previous_rounds and not snapshot.has_results(previous_rounds[-1].id):
+                    # nothing stored for the preceding rounds yet, fall back to a full recalculation
+                    from_round = None
+                else:
+                    rounds = [r for r in rounds if r.order_index >= from_round.order_index]
+
+            if from_round is not None:
+                # Cumulative group points of each robot from its latest result before from_round
+                initial_points = {}
+                for robot in robots:
+                    for round_obj in reversed(previous_rounds):
+                        if snapshot.has_result(round_obj.id, robot.id):
+                            initial_points[robot.id] = tuple(
+                                snapshot.result(round_obj.id, robot.id, field) or 0
+                                for field in ('round_group1_points', 'round_group2_points', 'round_group3_points')
+                            )
+                            break
+                byebot_played = self.get_byebot_played(robots, previous_rounds, snapshot)
+            matches = snapshot.matches(round_obj.id for round_obj in rounds)
+
+            round_results = self.build_round_results(robots, rounds, matches, request, initial_points, byebot_played)
+            if request is not None:
+                messages.success(request, f"Round results were recalculated.")
+
+            self.calculate_opponent_points(request, rounds, round_results, snapshot)
+            self.calculate_tiebreaks(request, rounds, round_results, snapshot)
+
+            # standings before the recalculation, only needed for the deltas of the live scoreboard
+            previous_standings = None
+            if live.has_listeners():
+                previous_standings = self.get_standings(rounds, snapshot)
+
+            if from_round is not None:
+                RoundResult.objects.filter(round__in=rounds).delete()
+            else:
+                RoundResult.objects.all().delete()
+            RoundResult.objects.bulk_create(round_results)
+            bump_tournament_version()
+            self.calculate_ranks_for_rounds(request, rounds)
+
+        if previous_standings is not None:
+            self.publish_standing_changes(robots, previous_standings, self.get_standings(rounds))
 
-        self.calculate_opponent_points(request)
-        self.calculate_ranks_for_rounds(request)
+        return len(round_results)
 
-        return result_cnt
+    def get_standings(self, rounds, snapshot=None):
+        """
+        Return {(round_id, robot_id): (rank, total points, opponent points)} of the given rounds
+        (stored in the database, or in the snapshot if given).
+        """
+        fields = ('total_robot_rank', 'total_robot_points', 'total_opponent_points')
+        if snapshot is not None:
+            return {
+                (round_obj.id, robot.id): tuple(snapshot.result(round_obj.id, robot.id, field) for field in fields)
+                for round_obj in rounds for robot in snapshot.robots if snapshot.has_result(round_obj.id, robot.id)
+            }
+        results = RoundResult.objects.filter(round__in=rounds).values_list('round_id', 'robot_id', *fields)
+        return {(round_id, robot_id): standing for round_id, robot_id, *standing in results}
+
+    def publish_standing_changes(self, robots, previous_standings, standings):
+        """Publish changed ranks and points to the live scoreboard (one 'ranks' event per round)."""
+        robot_names = {robot.id: robot.robot_name for robot in robots}
+        changes = {}
+        for (round_id, robot_id), standing in standings.items():
+            previous = previous_standings.get((round_id, robot_id))
+            if standing == previous:
+                continue
+            rank, total_robot_points, total_opponent_points = standing
+            changes.setdefault(round_id, []).append({
+                'robot': robot_id,
+                'robot_name': robot_names.get(robot_id),
+                'rank': rank,
+                'previous_rank': previous[0] if previous else None,
+                'total_robot_points': total_robot_points,
+                'total_opponent_points': total_opponent_points,
+            })
+
+        for round_id, round_changes in changes.items():
+            round_changes.sort(key=lambda change: change['rank'])
+            live.publish_on_commit('ranks', {'round': round_id, 'changes': round_changes})
+
+    def get_byebot_played(self, robots, rounds, snapshot):
+        """Return ids of robots whose (first) match against the ByeBot was counted in one of the given rounds."""
+        byebot_ids = {robot.id for robot in robots if robot.is_byebot == 1}
+        if not byebot_ids or not rounds:
+            return set()
+
+        robots_map = {robot.id: robot for robot in robots}
+        rounds_map = {round_obj.id: round_obj for round_obj in rounds}
+
+        byebot_played = set()
+        for _, round_id, robot1_id, robot2_id, _, _ in snapshot.match_rows(rounds_map):
+            if robot1_id not in byebot_ids and robot2_id not in byebot_ids:
+                continue
+            group_index = rounds_map[round_id].round_group_index
+            for robot_id in (robot1_id, robot2_id):
+                robot = robots_map.get(robot_id)
+                if robot and robot.is_byebot == 0 and self.is_qualified(robot, group_index):
+                    byebot_played.add(robot_id)
+        return byebot_played
@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-17 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_played_pairs(apps, schema_editor):
+    Match = apps.get_model('smtracker', 'Match')
+    PlayedPair = apps.get_model('smtracker', 'PlayedPair')
+
+    rounds = {}
+    for round_id, group_index, order_index, robot1_id, robot2_id in Match.objects.values_list(
+            'round_id', 'round__round_group_index', 'round__order_index', 'robot1_id', 'robot2_id'):
+        key = (group_index, min(robot1_id, robot2_id), max(robot1_id, robot2_id))
+        rounds.setdefault(key, {})[order_index] = round_id
+
+    PlayedPair.objects.bulk_create([
+        PlayedPair(round_id=round_id, round_group_index=group_index, round_order=order_index,
+                   robot_lo_id=robot_lo_id, robot_hi_id=robot_hi_id, first_round_order=min(orders))
+        for (group_index, robot_lo_id, robot_hi_id), orders in rounds.items()
+        for order_index, round_id in orders.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smtracker', '0020_match_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayedPair',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('round_group_index', models.IntegerField()),
+                ('round_order', models.IntegerField()),
+                ('first_round_order', models.IntegerField()),
+                ('robot_hi', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='smtracker.robot')),
+                ('robot_lo', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='smtracker.robot')),
+                ('round', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='played_pairs', to='smtracker.round')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['round_group_index', 'robot_hi'], name='smtracker_playedpair_hi_idx'), models.Index(fields=['round_group_index', 'round_order'], name='smtracker_playedpair_order_idx'), models.Index(fields=['robot_lo', 'robot_hi'], name='smtracker_playedpair_pair_idx'), models.Index(fields=['round'], name='smtracker_playedpair_round_idx')],
+                'constraints': [models.UniqueConstraint(fields=('round_group_index', 'robot_lo', 'robot_hi', 'round_order'), name='smtracker_playedpair_unique')],
+            },
+        ),
+        migrations.RunPython(build_played_pairs, migrations.RunPython.noop),
+    ]
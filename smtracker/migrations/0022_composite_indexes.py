@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-17 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smtracker', '0021_playedpair'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['round', 'robot1'], name='smtracker_match_robot1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['round', 'robot2'], name='smtracker_match_robot2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='round',
+            index=models.Index(fields=['round_group_index', 'order_index'], name='smtracker_round_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roundresult',
+            index=models.Index(fields=['round', 'total_robot_rank'], name='smtracker_roundresult_rank_idx'),
+        ),
+    ]
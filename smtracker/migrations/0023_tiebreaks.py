@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-17 00:45
+
+import smtracker.tiebreaks
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smtracker', '0022_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='round',
+            name='tiebreaks',
+            field=models.CharField(blank=True, default='', max_length=100, validators=[smtracker.tiebreaks.validate_tiebreaks]),
+        ),
+        migrations.AddField(
+            model_name='roundresult',
+            name='tiebreak_buchholz',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='buchholz'),
+        ),
+        migrations.AddField(
+            model_name='roundresult',
+            name='tiebreak_buchholz_cut1',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='buchholz cut-1'),
+        ),
+        migrations.AddField(
+            model_name='roundresult',
+            name='tiebreak_buchholz_median',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='median buchholz'),
+        ),
+        migrations.AddField(
+            model_name='roundresult',
+            name='tiebreak_head_to_head',
+            field=models.IntegerField(blank=True, null=True, verbose_name='head-to-head'),
+        ),
+        migrations.AddField(
+            model_name='roundresult',
+            name='tiebreak_sonneborn_berger',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='sonneborn-berger'),
+        ),
+        migrations.AddField(
+            model_name='roundresult',
+            name='tiebreak_wins',
+            field=models.IntegerField(blank=True, null=True, verbose_name='wins'),
+        ),
+    ]
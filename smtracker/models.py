@@ -1,5 +1,6 @@
 from django.db import models
 from django.utils import timezone
+from .tiebreaks import validate_tiebreaks
 
 class Robot(models.Model):
     id = models.AutoField(primary_key=True)
@@ -43,6 +44,13 @@ class Round(models.Model):
 
     round_start_time = models.DateTimeField(null=True, blank=True)
     number_of_tables = models.IntegerField(default=4)    # e.g. 3/4
+    tiebreaks = models.CharField(max_length=100, blank=True, default='', validators=[validate_tiebreaks])   # e.g. "buchholz_cut1,wins" (see smtracker.tiebreaks), empty = SMTRACKER_TIEBREAKS
+
+    class Meta:
+        indexes = [
+            # previous rounds of a round group (order_index < x)
+            models.Index(fields=['round_group_index', 'order_index'], name='smtracker_round_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.ident} ({self.name})"
@@ -64,9 +72,15 @@ class Match(models.Model):
     schedule_table = models.IntegerField(null=True, blank=True, verbose_name='table')   # where the match will be played, e.g. value 1 = "Table 1"
     result_robot1_points = models.IntegerField(null=True, blank=True, verbose_name='robot1_points')
     result_robot2_points = models.IntegerField(null=True, blank=True, verbose_name='robot2_points')
+    version = models.PositiveIntegerField(default=0)    # increased with every saved result (optimistic locking)
 
     class Meta:
         verbose_name_plural = 'Matches'
+        indexes = [
+            # matches of given rounds played by given robots (e.g. ByeBot matches)
+            models.Index(fields=['round', 'robot1'], name='smtracker_match_robot1_idx'),
+            models.Index(fields=['round', 'robot2'], name='smtracker_match_robot2_idx'),
+        ]
 
     def __str__(self):
         return f"Match {self.ident} - {self.robot1.robot_name} vs {self.robot2.robot_name}"
@@ -87,5 +101,47 @@ class RoundResult(models.Model):
 
     total_opponent_points = models.IntegerField(null=True, blank=True, verbose_name="opponents' total points")  # sum of all opponent points that played matches against current robot
 
+    # tiebreak values (see smtracker.tiebreaks), from the matches of the round group up to this round
+    tiebreak_buchholz = models.BigIntegerField(null=True, blank=True, verbose_name='buchholz')
+    tiebreak_buchholz_cut1 = models.BigIntegerField(null=True, blank=True, verbose_name='buchholz cut-1')
+    tiebreak_buchholz_median = models.BigIntegerField(null=True, blank=True, verbose_name='median buchholz')
+    tiebreak_sonneborn_berger = models.BigIntegerField(null=True, blank=True, verbose_name='sonneborn-berger')
+    tiebreak_head_to_head = models.IntegerField(null=True, blank=True, verbose_name='head-to-head')
+    tiebreak_wins = models.IntegerField(null=True, blank=True, verbose_name='wins')
+
+    class Meta:
+        indexes = [
+            # results of a round ordered by rank
+            models.Index(fields=['round', 'total_robot_rank'], name='smtracker_roundresult_rank_idx'),
+        ]
+
     def __str__(self):
         return f"RoundResult {self.robot.robot_name} - {self.round.ident}"
+
+class PlayedPair(models.Model):
+    """
+    Denormalized index of the pairs of robots that played each other: one row per pair and round in which
+    they played, maintained from the matches by smtracker.pairs (signals and manager hooks).
+    A pair was already played in the group before a round if first_round_order < order_index of the round.
+    """
+    id = models.AutoField(primary_key=True)
+    round = models.ForeignKey('Round', related_name='played_pairs', on_delete=models.CASCADE, db_index=False)
+    round_group_index = models.IntegerField()
+    round_order = models.IntegerField()          # order_index of the round
+    robot_lo = models.ForeignKey('Robot', related_name='+', on_delete=models.CASCADE, db_index=False)  # robot with the lower id
+    robot_hi = models.ForeignKey('Robot', related_name='+', on_delete=models.CASCADE, db_index=False)  # robot with the higher id
+    first_round_order = models.IntegerField()    # order_index of the first round of the group in which the pair played
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['round_group_index', 'robot_lo', 'robot_hi', 'round_order'], name='smtracker_playedpair_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['round_group_index', 'robot_hi'], name='smtracker_playedpair_hi_idx'),
+            models.Index(fields=['round_group_index', 'round_order'], name='smtracker_playedpair_order_idx'),
+            models.Index(fields=['robot_lo', 'robot_hi'], name='smtracker_playedpair_pair_idx'),
+            models.Index(fields=['round'], name='smtracker_playedpair_round_idx'),
+        ]
+
+    def __str__(self):
+        return f"PlayedPair {self.robot_lo_id} - {self.robot_hi_id} ({self.round_group_index}/{self.round_order})"
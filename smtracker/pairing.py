@@ -0,0 +1,201 @@
+from collections import deque
+
+class MatchingPairing:
+    """
+    Swiss pairing as a minimum-cost perfect matching on the graph of robots.
+
+    - Every two robots that have not played yet in the round group are connected by an edge, already played
+      pairs are forbidden edges.
+    - The cost of an edge is the difference of total points (and a small cost for the difference of ranks,
+      so robots next to each other in the ranking are preferred), the pairing preferences are bonuses:
+      same robot_type, different country, different city.
+
+    The matching is built in three steps:
+
+        1. Greedy: robots are paired from the top of the ranking, each with the cheapest available robot
+           within the next `window` robots (or the first available robot further down).
+        2. Repair: robots left without an opponent are paired with Edmonds' blossom algorithm (augmenting paths
+           over the forbidden-edges complement graph), so a pairing without duplicates is always found if one exists.
+        3. Improvement: pairs close in the ranking swap opponents while the total cost decreases (2-opt).
+    """
+
+    POINTS_DIFF_COST = 100
+    RANK_DIFF_COST = 1
+    SAME_ROBOT_TYPE_BONUS = 4
+    DIFFERENT_COUNTRY_BONUS = 2
+    DIFFERENT_CITY_BONUS = 1
+
+    def __init__(self, window=16, swap_depth=4, max_passes=10):
+        self.window = window
+        self.swap_depth = swap_depth
+        self.max_passes = max_passes
+
+    def cost(self, i, j):
+        """Cost of pairing robots with indexes i and j in the ranking (lower is better)."""
+        r1, r2 = self.robots[i], self.robots[j]
+        cost = self.POINTS_DIFF_COST * abs(self.points[i] - self.points[j]) + self.RANK_DIFF_COST * abs(i - j)
+        if r1.robot_type and r1.robot_type == r2.robot_type:
+            cost -= self.SAME_ROBOT_TYPE_BONUS
+        if r1.country != r2.country:
+            cost -= self.DIFFERENT_COUNTRY_BONUS
+        if r1.city != r2.city:
+            cost -= self.DIFFERENT_CITY_BONUS
+        return cost
+
+    def allowed(self, i, j):
+        return i != j and j not in self.played[i]
+
+    def pair(self, robots, points, played_pairs):
+        """
+        Pair the ranked robots (best first), points are their total points.
+
+        Returns a list of (robot1, robot2) tuples ordered by the ranking of robot1, robot2 is None for robots
+        without a valid opponent (only if no pairing without duplicates exists, or for an odd number of robots).
+        """
+        self.robots = robots
+        self.points = points
+        n = len(robots)
+
+        index = {robot.id: i for i, robot in enumerate(robots)}
+        self.played = [set() for _ in range(n)]
+        for a, b in played_pairs:
+            if a in index and b in index:
+                self.played[index[a]].add(index[b])
+                self.played[index[b]].add(index[a])
+
+        match = self.pair_greedy(n)
+        if match.count(-1) > n % 2:
+            self.augment(n, match)
+        self.improve(n, match)
+
+        pairs = []
+        for i in range(n):
+            if match[i] == -1:
+                pairs.append((robots[i], None))
+            elif i < match[i]:
+                pairs.append((robots[i], robots[match[i]]))
+        return pairs
+
+    def pair_greedy(self, n):
+        match = [-1] * n
+        for i in range(n):
+            if match[i] != -1:
+                continue
+            best = -1
+            best_cost = None
+            candidates = 0
+            for j in range(i + 1, n):
+                if match[j] != -1:
+                    continue
+                if candidates >= self.window and best != -1:
+                    break
+                candidates += 1
+                if not self.allowed(i, j):
+                    continue
+                cost = self.cost(i, j)
+                if best_cost is None or cost < best_cost:
+                    best, best_cost = j, cost
+            if best != -1:
+                match[i], match[best] = best, i
+        return match
+
+    def neighbours(self, v, n):
+        """Allowed opponents of v, nearest in the ranking first."""
+        for d in range(1, n):
+            if v - d >= 0 and self.allowed(v, v - d):
+                yield v - d
+            if v + d < n and self.allowed(v, v + d):
+                yield v + d
+            if v - d < 0 and v + d >= n:
+                break
+
+    def augment(self, n, match):
+        """Extend the matching along augmenting paths (Edmonds' blossom algorithm) until none is left."""
+        for root in range(n):
+            if match[root] == -1:
+                end, parent = self.find_augmenting_path(n, match, root)
+                # flip the matched/unmatched edges along the path
+                v = end
+                while v != -1:
+                    pv = parent[v]
+                    next_v = match[pv]
+                    match[v], match[pv] = pv, v
+                    v = next_v
+
+    def find_augmenting_path(self, n, match, root):
+        used = [False] * n
+        parent = [-1] * n
+        base = list(range(n))
+
+        def lca(a, b):
+            seen = [False] * n
+            while True:
+                a = base[a]
+                seen[a] = True
+                if match[a] == -1:
+                    break
+                a = parent[match[a]]
+            while True:
+                b = base[b]
+                if seen[b]:
+                    return b
+                b = parent[match[b]]
+
+        def mark_path(v, b, child, blossom):
+            while base[v] != b:
+                blossom[base[v]] = blossom[base[match[v]]] = True
+                parent[v] = child
+                child = match[v]
+                v = parent[match[v]]
+
+        used[root] = True
+        queue = deque([root])
+        while queue:
+            v = queue.popleft()
+            for to in self.neighbours(v, n):
+                if base[v] == base[to] or match[v] == to:
+                    continue
+                if to == root or (match[to] != -1 and parent[match[to]] != -1):
+                    # odd cycle found, contract the blossom
+                    current_base = lca(v, to)
+                    blossom = [False] * n
+                    mark_path(v, current_base, to, blossom)
+                    mark_path(to, current_base, v, blossom)
+                    for i in range(n):
+                        if blossom[base[i]]:
+                            base[i] = current_base
+                            if not used[i]:
+                                used[i] = True
+                                queue.append(i)
+                elif parent[to] == -1:
+                    parent[to] = v
+                    if match[to] == -1:
+                        return to, parent
+                    used[match[to]] = True
+                    queue.append(match[to])
+        return -1, parent
+
+    def improve(self, n, match):
+        """Swap opponents of pairs close in the ranking while the total cost decreases."""
+        for _ in range(self.max_passes):
+            pairs = [(i, match[i]) for i in range(n) if match[i] > i]
+            improved = False
+            for k in range(len(pairs)):
+                a, b = pairs[k]
+                if match[a] != b:
+                    continue
+                for l in range(k + 1, min(k + 1 + self.swap_depth, len(pairs))):
+                    c, d = pairs[l]
+                    if match[c] != d:
+                        continue
+                    current = self.cost(a, b) + self.cost(c, d)
+                    for x, y in ((c, d), (d, c)):
+                        if self.allowed(a, x) and self.allowed(b, y) and self.cost(a, x) + self.cost(b, y) < current:
+                            match[a], match[x] = x, a
+                            match[b], match[y] = y, b
+                            improved = True
+                            break
+                    if match[a] != b:
+                        break
+            if not improved:
+                break
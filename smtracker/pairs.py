@@ -0,0 +1,131 @@
+import threading
+from contextlib import contextmanager
+from django.db import connection
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import Match, Round, PlayedPair
+
+# Maintenance of the played pairs index (PlayedPair) from the matches.
+#
+# The rows are rebuilt with set-based SQL (one DELETE and one INSERT ... SELECT), per round group for the bulk
+# writes of the managers (inside bulk_update_played_pairs()) and per pair of robots for single match writes
+# (admin, fixtures), which are handled by the signals below.
+
+_local = threading.local()
+
+# Rows of the matches (one per pair and round), first_round_order is the first round of the pair in the group.
+INSERT_SQL = """
+INSERT INTO {played_pair} (round_id, round_group_index, round_order, robot_lo_id, robot_hi_id, first_round_order)
+SELECT round_id, round_group_index, order_index, robot_lo_id, robot_hi_id,
+       MIN(order_index) OVER (PARTITION BY round_group_index, robot_lo_id, robot_hi_id)
+FROM (
+    SELECT DISTINCT m.round_id, r.round_group_index, r.order_index,
+           CASE WHEN m.robot1_id < m.robot2_id THEN m.robot1_id ELSE m.robot2_id END AS robot_lo_id,
+           CASE WHEN m.robot1_id < m.robot2_id THEN m.robot2_id ELSE m.robot1_id END AS robot_hi_id
+    FROM {match} m JOIN {round} r ON r.id = m.round_id
+    WHERE {where}
+) pairs
+"""
+
+def execute_insert(where, params):
+    sql = INSERT_SQL.format(
+        played_pair=connection.ops.quote_name(PlayedPair._meta.db_table),
+        match=connection.ops.quote_name(Match._meta.db_table),
+        round=connection.ops.quote_name(Round._meta.db_table),
+        where=where,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+def rebuild_played_pairs(group_indexes=None):
+    """Rebuild the played pairs of the given round groups (all groups if None)."""
+    if group_indexes is None:
+        PlayedPair.objects.all().delete()
+        execute_insert('1 = 1', [])
+        return
+    group_indexes = sorted(set(group_indexes))
+    if not group_indexes:
+        return
+    PlayedPair.objects.filter(round_group_index__in=group_indexes).delete()
+    execute_insert(f"r.round_group_index IN ({', '.join(['%s'] * len(group_indexes))})", group_indexes)
+
+def refresh_pair(robot1_id, robot2_id):
+    """Rebuild the rows of one pair of robots (in all round groups)."""
+    robot_lo_id, robot_hi_id = min(robot1_id, robot2_id), max(robot1_id, robot2_id)
+    PlayedPair.objects.filter(robot_lo_id=robot_lo_id, robot_hi_id=robot_hi_id).delete()
+    execute_insert(
+        '((m.robot1_id = %s AND m.robot2_id = %s) OR (m.robot1_id = %s AND m.robot2_id = %s))',
+        [robot_lo_id, robot_hi_id, robot_hi_id, robot_lo_id],
+    )
+
+@contextmanager
+def bulk_update_played_pairs(group_indexes):
+    """
+    Block of bulk match writes in the given round groups: the per-match signal updates are skipped and
+    the groups are rebuilt at the end (call inside the transaction of the writes).
+    """
+    _local.suspended = getattr(_local, 'suspended', 0) + 1
+    try:
+        yield
+    finally:
+        _local.suspended -= 1
+    rebuild_played_pairs(group_indexes)
+
+def is_suspended():
+    return getattr(_local, 'suspended', 0) > 0
+
+def get_played_pairs(group_index, before_order):
+    """Set of (robot_lo_id, robot_hi_id) pairs that played in the group before the round with order_index before_order."""
+    return set(PlayedPair.objects.filter(round_group_index=group_index, round_order__lt=before_order).values_list('robot_lo_id', 'robot_hi_id'))
+
+def opponent_ids(robot_id, group_index, before_order):
+    """Ids of the opponents of the robot in the group before the round with order_index before_order."""
+    pairs = PlayedPair.objects.filter(round_group_index=group_index, round_order__lt=before_order).filter(
+        Q(robot_lo_id=robot_id) | Q(robot_hi_id=robot_id)
+    )
+    opponents = set()
+    for robot_lo_id, robot_hi_id in pairs.values_list('robot_lo_id', 'robot_hi_id'):
+        opponents.add(robot_hi_id if robot_lo_id == robot_id else robot_lo_id)
+    return opponents
+
+# Single match writes (admin, fixtures, tests), bulk writes of the managers use bulk_update_played_pairs().
+@receiver(pre_save, sender=Match)
+def match_saving(sender, instance, update_fields=None, **kwargs):
+    instance._previous_pair = None
+    if instance.pk is None or is_suspended():
+        return
+    if update_fields is not None and not {'robot1', 'robot2', 'round'} & set(update_fields):
+        return
+    instance._previous_pair = Match.objects.filter(pk=instance.pk).values_list('robot1_id', 'robot2_id', 'round_id').first()
+
+@receiver(post_save, sender=Match)
+def match_saved(sender, instance, created, **kwargs):
+    if is_suspended():
+        return
+    previous = getattr(instance, '_previous_pair', None)
+    if not created and previous is None:
+        return  # the robots and round did not change
+    if previous is not None:
+        if previous == (instance.robot1_id, instance.robot2_id, instance.round_id):
+            return
+        refresh_pair(previous[0], previous[1])
+    refresh_pair(instance.robot1_id, instance.robot2_id)
+
+@receiver(post_delete, sender=Match)
+def match_deleted(sender, instance, **kwargs):
+    if not is_suspended():
+        refresh_pair(instance.robot1_id, instance.robot2_id)
+
+@receiver(pre_save, sender=Round)
+def round_saving(sender, instance, **kwargs):
+    instance._previous_position = None
+    if instance.pk is not None and not is_suspended():
+        instance._previous_position = Round.objects.filter(pk=instance.pk).values_list('order_index', 'round_group_index').first()
+
+@receiver(post_save, sender=Round)
+def round_saved(sender, instance, **kwargs):
+    # a changed order or group of a round changes the rows of its pairs (and their first rounds)
+    previous = getattr(instance, '_previous_position', None)
+    if previous is not None and previous != (instance.order_index, instance.round_group_index):
+        rebuild_played_pairs({previous[1], instance.round_group_index})
@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from .models import Round
+
+logger = logging.getLogger(__name__)
+
+class RecalculationWorker:
+    """
+    Recalculate the round results on a background thread (in-process).
+
+    Every submitted result enqueues a recalculation starting with the round of the match. Requests arriving
+    while the worker waits (coalesce_secs) or recalculates are merged into one recalculation from the earliest
+    requested round. Every request gets a ticket number, the standings include the request once
+    completed >= ticket.
+
+    With SMTRACKER_BACKGROUND_RECALCULATION = False the recalculation runs synchronously in enqueue()
+    (used by the tests).
+    """
+
+    def __init__(self, coalesce_secs=0.5):
+        self.coalesce_secs = coalesce_secs
+        self.condition = threading.Condition()
+        self.thread = None
+        self.requested = 0       # last ticket
+        self.completed = 0       # requests up to this ticket are included in the standings
+        self.pending_round = None
+        self.running = False
+        self.last_error = None
+        self.updated_at = None
+
+    def enqueue(self, round_obj):
+        """Request a recalculation from round_obj on (call after the result is committed); returns the ticket."""
+        with self.condition:
+            self.requested += 1
+            ticket = self.requested
+            if self.pending_round is None or round_obj.order_index < self.pending_round.order_index:
+                self.pending_round = round_obj
+            self.condition.notify()
+
+        if not getattr(settings, 'SMTRACKER_BACKGROUND_RECALCULATION', True):
+            self.run_pending()
+            return ticket
+
+        if self.thread is None or not self.thread.is_alive():
+            with self.condition:
+                if self.thread is None or not self.thread.is_alive():
+                    self.thread = threading.Thread(target=self.run, name='smtracker-recalculation', daemon=True)
+                    self.thread.start()
+        return ticket
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending_round is not None)
+            time.sleep(self.coalesce_secs)
+            close_old_connections()
+            try:
+                self.run_pending()
+            finally:
+                close_old_connections()
+
+    def run_pending(self):
+        """Recalculate the round results from the earliest pending round (no-op if nothing is pending)."""
+        from .managers import MatchManager
+
+        with self.condition:
+            round_obj = self.pending_round
+            ticket = self.requested
+            self.pending_round = None
+            if round_obj is None:
+                return
+            self.running = True
+
+        try:
+            # the round could be changed or deleted in the meantime
+            round_obj = Round.objects.filter(id=round_obj.id).first()
+            MatchManager.get_instance().recalculate_round_results(from_round=round_obj)
+            error = None
+        except Exception as e:
+            logger.exception("Recalculation of the round results failed")
+            error = str(e)
+
+        with self.condition:
+            self.running = False
+            self.last_error = error
+            if error is None:
+                self.completed = max(self.completed, ticket)
+                self.updated_at = timezone.now()
+
+    def status(self, ticket=None):
+        """Freshness of the standings: fresh if every request (or the given ticket) is included."""
+        with self.condition:
+            return {
+                'fresh': self.completed >= (self.requested if ticket is None else ticket),
+                'requested': self.requested,
+                'completed': self.completed,
+                'running': self.running,
+                'error': self.last_error,
+                'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            }
+
+recalculation_worker = RecalculationWorker()
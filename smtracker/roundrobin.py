@@ -0,0 +1,37 @@
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def berger_table(size):
+    """
+    Round-robin schedule of a pool of `size` robots (circle method), computed once per pool size.
+
+    Returns a tuple of rounds, every round is a tuple of (index1, index2) pairs of positions in the pool.
+    Every two robots meet exactly once, position 0 is fixed and the others rotate; the fixed robot alternates
+    sides (robot1/robot2). With an odd size one robot sits out every round.
+    """
+    n = size + size % 2    # odd size: position `size` is a dummy, its opponent sits out
+    positions = list(range(n))
+    rounds = []
+    for round_number in range(n - 1):
+        pairs = []
+        for i in range(n // 2):
+            a, b = positions[i], positions[n - 1 - i]
+            if a >= size or b >= size:
+                continue
+            if i == 0 and round_number % 2 == 1:
+                a, b = b, a
+            pairs.append((a, b))
+        rounds.append(tuple(pairs))
+        positions = [positions[0], positions[-1]] + positions[1:-1]
+    return tuple(rounds)
+
+def snake_pools(robots, pool_count):
+    """
+    Split the seeded robots (best first) into pool_count pools in snake order (1-2-3-3-2-1-...),
+    so the pools are balanced and their sizes differ by at most one.
+    """
+    pools = [[] for _ in range(pool_count)]
+    for i, robot in enumerate(robots):
+        row, column = divmod(i, pool_count)
+        pools[column if row % 2 == 0 else pool_count - 1 - column].append(robot)
+    return pools
@@ -0,0 +1,81 @@
+import random
+
+class TableScheduler:
+    """
+    Schedule matches of a round on tables in time slots (one slot = one match on every table).
+
+    Constraints:
+        - A robot never plays on two tables in the same slot.
+        - A robot rests at least `rest_slots` slots between its matches (robots in `rest_exempt_ids`,
+          e.g. the ByeBot, only need to be free).
+        - Optional table preferences (robot_id -> table number) are used whenever the table is free in the slot.
+
+    Slots are filled one by one (list scheduling); matches of robots with the most remaining matches go first,
+    which keeps the round makespan (number of slots) close to the lower bound. Tables of a slot are assigned
+    in random order using a seeded RNG, so the same seed always gives the same schedule.
+    """
+
+    def __init__(self, table_count, rest_slots=1, table_preferences=None, seed=None):
+        self.table_count = table_count
+        self.rest_slots = rest_slots
+        self.table_preferences = table_preferences or {}
+        self.rng = random.Random(seed)
+
+    def schedule(self, matches, rest_exempt_ids=()):
+        """Return a list of (match, slot, table) tuples, slots start at 0 and tables at 1."""
+        remaining = {}
+        for match in matches:
+            for robot_id in {match.robot1_id, match.robot2_id}:
+                remaining[robot_id] = remaining.get(robot_id, 0) + 1
+
+        next_free_slot = {}
+        # (index, match, robot ids) - the ids are read once, the pending list is sorted in every slot
+        pending = [(i, match, (match.robot1_id, match.robot2_id)) for i, match in enumerate(matches)]
+        schedule = []
+        slot = 0
+
+        while pending:
+            pending.sort(key=lambda item: (-max(remaining[item[2][0]], remaining[item[2][1]]), item[0]))
+
+            selected = []
+            busy = set()
+            not_selected = []
+            for item in pending:
+                match = item[1]
+                robot_ids = set(item[2])
+                if (len(selected) < self.table_count and not robot_ids & busy
+                        and all(next_free_slot.get(robot_id, 0) <= slot for robot_id in robot_ids)):
+                    selected.append(match)
+                    busy |= robot_ids
+                else:
+                    not_selected.append(item)
+            pending = not_selected
+
+            for match, table in self.assign_tables(selected):
+                schedule.append((match, slot, table))
+                for robot_id in {match.robot1_id, match.robot2_id}:
+                    remaining[robot_id] -= 1
+                    rest = 0 if robot_id in rest_exempt_ids else self.rest_slots
+                    next_free_slot[robot_id] = slot + 1 + rest
+
+            slot += 1
+
+        return schedule
+
+    def assign_tables(self, matches):
+        """Assign tables to the matches of one slot: preferred tables first, the rest in random order."""
+        free_tables = list(range(1, self.table_count + 1))
+        assigned = []
+        others = []
+
+        for match in matches:
+            table = self.table_preferences.get(match.robot1_id) or self.table_preferences.get(match.robot2_id)
+            if table in free_tables:
+                free_tables.remove(table)
+                assigned.append((match, table))
+            else:
+                others.append(match)
+
+        self.rng.shuffle(free_tables)
+        assigned.extend(zip(others, free_tables))
+        return assigned
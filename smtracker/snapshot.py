@@ -0,0 +1,187 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from django.db import connections
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from .cache import get_tournament_version
+from .models import Robot, Round, Match, RoundResult
+from .tiebreaks import TIEBREAKS
+
+# Compact in-memory state of the whole tournament, shared by the operations of the managers.
+#
+# Built from four bulk queries (robots, rounds, matches, round results): robots are tuple records (no instance
+# dict), matches and round results are columns of 64-bit integer arrays ordered by round (NULL is stored as
+# NO_VALUE), so 2,000 robots with their matches and results take a few MB. A snapshot is never updated:
+# writes are made to the database and a new snapshot is loaded (see get_snapshot).
+
+NO_VALUE = -2 ** 63
+
+ROBOT_FIELDS = (
+    'id', 'registration_number', 'robot_name', 'city', 'country', 'weight', 'byebot_points', 'robot_type',
+    'round_group1_qualified', 'round_group2_qualified', 'round_group3_qualified', 'is_byebot',
+)
+
+MATCH_FIELDS = ('id', 'round_id', 'robot1_id', 'robot2_id', 'result_robot1_points', 'result_robot2_points')
+
+RESULT_FIELDS = (
+    'round_robot_points', 'round_group1_points', 'round_group2_points', 'round_group3_points',
+    'total_robot_points', 'total_robot_rank',
+) + tuple(field for field, _ in TIEBREAKS.values())
+
+# Robot fields used by the managers (read-only stand-in for a Robot instance)
+RobotRecord = namedtuple('RobotRecord', ROBOT_FIELDS)
+
+# Match fields used by the recalculation (read-only stand-in for a Match instance)
+MatchRecord = namedtuple('MatchRecord', MATCH_FIELDS)
+
+def is_qualified(robot, group_index):
+    """True if the robot takes part in rounds of the given round group (group 0 = all robots)."""
+    if group_index == 1:
+        return bool(robot.round_group1_qualified)
+    if group_index == 2:
+        return bool(robot.round_group2_qualified)
+    if group_index == 3:
+        return bool(robot.round_group3_qualified)
+    return True
+
+def integer_rows(queryset, fields, nullable):
+    """
+    Rows of integer fields straight from the database cursor (without the per-value conversions of the ORM),
+    NULL of the nullable fields is returned as NO_VALUE by the database.
+    """
+    queryset = queryset.annotate(**{f"{field}_value": Coalesce(field, Value(NO_VALUE)) for field in nullable})
+    queryset = queryset.values_list(*(f"{field}_value" if field in nullable else field for field in fields))
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+def integer_columns(rows, fields):
+    """Transpose the rows into one array per field."""
+    columns = list(zip(*rows)) or [()] * len(fields)
+    return {field: array('q', column) for field, column in zip(fields, columns)}
+
+def from_value(value):
+    return None if value == NO_VALUE else value
+
+class TournamentSnapshot:
+    __slots__ = (
+        'version', 'robots', 'robot_index', 'byebot_ids', 'rounds', 'matches_by_round', 'results_by_round', 'result_index',
+    )
+
+    def __init__(self, robots, rounds, matches, results, version=None):
+        self.version = version
+
+        # robots ordered by id, robot_index: robot id -> position
+        self.robots = list(map(RobotRecord._make, robots))
+        self.robot_index = {robot.id: i for i, robot in enumerate(self.robots)}
+        self.byebot_ids = frozenset(robot.id for robot in self.robots if robot.is_byebot == 1)
+
+        # rounds ordered by order_index
+        self.rounds = list(rounds)
+
+        # matches ordered by (round_id, id) and results ordered by round_id, one array per field;
+        # result_index: round id -> {robot id: position of its result}
+        self.matches_by_round = integer_columns(matches, MATCH_FIELDS)
+        self.results_by_round = integer_columns(results, ('round_id', 'robot_id') + RESULT_FIELDS)
+        round_ids, robot_ids = self.results_by_round['round_id'], self.results_by_round['robot_id']
+        self.result_index = {}
+        for round_obj in self.rounds:
+            start, end = bisect_left(round_ids, round_obj.id), bisect_right(round_ids, round_obj.id)
+            if start < end:
+                self.result_index[round_obj.id] = dict(zip(robot_ids[start:end], range(start, end)))
+
+    @classmethod
+    def load(cls, version=None):
+        """Load the snapshot with one query per table."""
+        return cls(
+            Robot.objects.order_by('id').values_list(*ROBOT_FIELDS),
+            Round.objects.order_by('order_index'),
+            integer_rows(Match.objects.order_by('round_id', 'id'), MATCH_FIELDS, ['result_robot1_points', 'result_robot2_points']),
+            integer_rows(RoundResult.objects.order_by('round_id'), ('round_id', 'robot_id') + RESULT_FIELDS, RESULT_FIELDS),
+            version,
+        )
+
+    # Robots
+
+    def robot(self, robot_id):
+        return self.robots[self.robot_index[robot_id]]
+
+    @property
+    def byebot(self):
+        """The ByeBot (lowest id if there are several), None if there is none."""
+        return self.robot(min(self.byebot_ids)) if self.byebot_ids else None
+
+    def qualified_robots(self, group_index):
+        """Robots qualified for the rounds of the round group (all robots for group 0), ByeBot excluded."""
+        return [robot for robot in self.robots if robot.is_byebot != 1 and is_qualified(robot, group_index)]
+
+    # Rounds
+
+    def previous_round(self, round_obj, **filters):
+        """Latest round before round_obj of the same round group (with the given field values)."""
+        previous = None
+        for other in self.rounds:
+            if other.order_index >= round_obj.order_index:
+                break
+            if other.round_group_index == round_obj.round_group_index and all(getattr(other, field) == value for field, value in filters.items()):
+                previous = other
+        return previous
+
+    def latest_result_round(self, order_index):
+        """Latest round with results before the round with order_index (any round group)."""
+        previous = None
+        for round_obj in self.rounds:
+            if round_obj.order_index >= order_index:
+                break
+            if round_obj.id in self.result_index:
+                previous = round_obj
+        return previous
+
+    # Matches
+
+    def match_rows(self, round_ids):
+        """(id, round_id, robot1_id, robot2_id, result_robot1_points, result_robot2_points) of the rounds, NULL as None."""
+        columns = [self.matches_by_round[field] for field in MATCH_FIELDS]
+        match_round_ids = self.matches_by_round['round_id']
+        for round_id in round_ids:
+            start, end = bisect_left(match_round_ids, round_id), bisect_right(match_round_ids, round_id)
+            for row in zip(*(column[start:end] for column in columns)):
+                yield row[:4] + (from_value(row[4]), from_value(row[5]))
+
+    def matches(self, round_ids):
+        return list(map(MatchRecord._make, self.match_rows(round_ids)))
+
+    # Round results
+
+    def has_results(self, round_id):
+        return round_id in self.result_index
+
+    def has_result(self, round_id, robot_id):
+        return robot_id in self.result_index.get(round_id, ())
+
+    def result(self, round_id, robot_id, field):
+        """Value of a round result field, None if the robot has no result in the round."""
+        position = self.result_index.get(round_id, {}).get(robot_id)
+        return None if position is None else from_value(self.results_by_round[field][position])
+
+    def nbytes(self):
+        """Approximate memory size of the snapshot (without the rounds)."""
+        size = sum(robot.__sizeof__() + sum(value.__sizeof__() for value in robot) for robot in self.robots)
+        size += self.robot_index.__sizeof__() + sum(index.__sizeof__() for index in self.result_index.values())
+        columns = list(self.matches_by_round.values()) + list(self.results_by_round.values())
+        return size + sum(column.itemsize * len(column) for column in columns)
+
+def get_snapshot(request=None):
+    """
+    Snapshot of the current tournament version, shared by the operations of one request (loaded again
+    if the version was bumped by a committed write in the meantime).
+    """
+    version = get_tournament_version()
+    snapshot = getattr(request, '_smtracker_snapshot', None)
+    if snapshot is None or snapshot.version != version:
+        snapshot = TournamentSnapshot.load(version)
+        if request is not None:
+            request._smtracker_snapshot = snapshot
+    return snapshot
@@ -1,8 +1,1238 @@
+import csv
 import datetime
+import io
+import json
+import random
+import re
+import unittest
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.crypto import get_random_string
 
 #from .models import Robot
 
+
+from .models import Robot, Round, RoundType, Match, MatchStatus, RoundResult, PlayedPair
+from .managers import KnockoutMatchManager, MatchManager, RoundRobinMatchManager, SwissMatchManager
+from .pairing import MatchingPairing
+from .scheduling import TableScheduler
+from .roundrobin import berger_table, snake_pools
+from .knockout import bracket_size, seed_order
+from .benchmarks import (
+    benchmark_tiebreaker_points, build_synthetic_tournament, legacy_calculate_tiebreaker_points, run_benchmarks,
+    synthetic_tied_robots,
+)
+from .instrumentation import instrument, recent_stats
+from . import live
+from .recalculation import RecalculationWorker
+from .importing import RobotImporter, read_json
+from .pairs import get_played_pairs, opponent_ids, rebuild_played_pairs
+from .tiebreaks import buchholz_median, validate_tiebreaks
+from .snapshot import TournamentSnapshot, get_snapshot
+from .cache import increment_tournament_version
+
+
+def create_robot(registration_number, **kwargs):
+    defaults = {
+        'robot_name': f"Robot {registration_number}",
+        'author_name': 'Author',
+        'city': 'City',
+        'country': 'SK',
+        'round_group1_qualified': 1,
+    }
+    defaults.update(kwargs)
+    return Robot.objects.create(registration_number=registration_number, **defaults)
+
+
+def create_request():
+    request = RequestFactory().get('/')
+    request.session = {}
+    request._messages = FallbackStorage(request)
+    return request
+
+
+def create_match(round_obj, ident, robot1, robot2, points1=None, points2=None):
+    return Match.objects.create(
+        round=round_obj, ident=ident, robot1=robot1, robot2=robot2,
+        result_robot1_points=points1, result_robot2_points=points2,
+        status=MatchStatus.FINISHED,
+    )
+
+
+class RecalculateRoundResultsTests(TestCase):
+
+    def setUp(self):
+        self.r1 = create_robot(1)
+        self.r2 = create_robot(2, round_group2_qualified=1)
+        self.r3 = create_robot(3, round_group2_qualified=1)
+        self.byebot = create_robot(99, robot_name='ByeBot', is_byebot=1, round_group2_qualified=1)
+
+        self.round1 = Round.objects.create(ident='R1', name='Round 1', order_index=1, round_group_index=1, round_type=RoundType.SWISS)
+        self.round2 = Round.objects.create(ident='R2', name='Round 2', order_index=2, round_group_index=1, round_type=RoundType.SWISS)
+        self.final = Round.objects.create(ident='F1', name='Final 1', order_index=3, round_group_index=2, round_type=RoundType.SWISS)
+
+        create_match(self.round1, 'R1-M99', self.r1, self.byebot, 6, 0)
+        create_match(self.round1, 'R1-M01', self.r2, self.r3, 4, 2)
+        create_match(self.round2, 'R2-M99', self.r1, self.byebot, 6, 0)   # second ByeBot match, points ignored
+        create_match(self.round2, 'R2-M01', self.r3, self.r2, 5, 1)
+        create_match(self.final, 'F1-M01', self.r2, self.r3, 6, 0)
+
+    def result(self, robot, round_obj):
+        return RoundResult.objects.get(robot=robot, round=round_obj)
+
+    def test_cumulative_points(self):
+        result_cnt = MatchManager.get_instance().recalculate_round_results()
+
+        # r1: 2 rounds, r2 + r3 + ByeBot: 3 rounds each
+        self.assertEqual(result_cnt, 11)
+        self.assertEqual(RoundResult.objects.count(), 11)
+
+        self.assertEqual(self.result(self.r1, self.round2).round_robot_points, 0)
+        self.assertEqual(self.result(self.r1, self.round2).total_robot_points, 6)
+        self.assertEqual(self.result(self.r2, self.round2).round_group1_points, 5)
+        self.assertEqual(self.result(self.r2, self.final).round_group2_points, 6)
+        self.assertEqual(self.result(self.r2, self.final).total_robot_points, 6005)
+        self.assertEqual(self.result(self.r3, self.final).total_robot_points, 7)
+        self.assertFalse(RoundResult.objects.filter(robot=self.r1, round=self.final).exists())
+
+    def test_byebot_never_scores(self):
+        MatchManager.get_instance().recalculate_round_results()
+
+        for result in RoundResult.objects.filter(robot=self.byebot):
+            self.assertEqual(result.round_robot_points, -1)
+            self.assertEqual(result.total_robot_points, -1)
+
+    def test_recalculation_replaces_results(self):
+        MatchManager.get_instance().recalculate_round_results()
+        MatchManager.get_instance().recalculate_round_results()
+
+        self.assertEqual(RoundResult.objects.count(), 11)
+
+    def test_incremental_recalculation(self):
+        match_manager = MatchManager.get_instance()
+        match_manager.recalculate_round_results()
+        round1_ids = set(RoundResult.objects.filter(round=self.round1).values_list('id', flat=True))
+
+        Match.objects.filter(ident='R2-M01').update(result_robot1_points=2, result_robot2_points=4)
+        result_cnt = match_manager.recalculate_round_results(from_round=self.round2)
+
+        # only round 2 and the later final are rebuilt
+        self.assertEqual(result_cnt, 7)
+        self.assertEqual(set(RoundResult.objects.filter(round=self.round1).values_list('id', flat=True)), round1_ids)
+        self.assertEqual(self.result(self.r1, self.round2).total_robot_points, 6)
+        self.assertEqual(self.result(self.r2, self.round2).round_group1_points, 8)
+        self.assertEqual(self.result(self.r2, self.final).total_robot_points, 6008)
+        self.assertEqual(self.result(self.r3, self.final).total_robot_points, 4)
+
+        incremental = list(RoundResult.objects.order_by('round__order_index', 'robot_id').values_list(
+            'robot_id', 'round_id', 'total_robot_points', 'total_opponent_points', 'total_robot_rank'))
+        match_manager.recalculate_round_results()
+        full = list(RoundResult.objects.order_by('round__order_index', 'robot_id').values_list(
+            'robot_id', 'round_id', 'total_robot_points', 'total_opponent_points', 'total_robot_rank'))
+        self.assertEqual(incremental, full)
+
+    def test_opponent_points(self):
+        match_manager = MatchManager.get_instance()
+        match_manager.recalculate_round_results()
+
+        # ByeBot is never counted as an opponent, only opponents from the same round group are counted
+        self.assertEqual(self.result(self.r1, self.round2).total_opponent_points, 0)
+        self.assertEqual(self.result(self.r2, self.round1).total_opponent_points, 2)
+        self.assertEqual(self.result(self.r2, self.round2).total_opponent_points, 7)
+        self.assertEqual(self.result(self.byebot, self.round2).total_opponent_points, 6)
+        self.assertEqual(self.result(self.r3, self.final).total_opponent_points, 6005)
+
+        # standalone recalculation writes the same values
+        RoundResult.objects.update(total_opponent_points=None)
+        self.assertEqual(match_manager.calculate_opponent_points(), 11)
+        self.assertEqual(self.result(self.r2, self.round2).total_opponent_points, 7)
+        self.assertEqual(self.result(self.r3, self.final).total_opponent_points, 6005)
+
+    def test_ranks_with_ties(self):
+        match_manager = MatchManager.get_instance()
+        match_manager.recalculate_round_results()
+        round2_ranks = list(RoundResult.objects.filter(round=self.round2).order_by('robot_id').values_list('total_robot_rank', flat=True))
+
+        RoundResult.objects.filter(round=self.round1, robot__is_byebot=0).update(total_robot_points=6, total_opponent_points=0)
+        self.assertEqual(match_manager.calculate_ranks_for_rounds(rounds=[self.round1]), 4)
+
+        # same rank for tied robots, then skip
+        ranks = dict(RoundResult.objects.filter(round=self.round1).values_list('robot_id', 'total_robot_rank'))
+        self.assertEqual(ranks, {self.r1.id: 1, self.r2.id: 1, self.r3.id: 1, self.byebot.id: 4})
+        self.assertEqual(list(RoundResult.objects.filter(round=self.round2).order_by('robot_id').values_list('total_robot_rank', flat=True)), round2_ranks)
+        self.assertEqual(round2_ranks, [2, 3, 1, 4])
+
+
+class TiebreakTests(TestCase):
+
+    def setUp(self):
+        self.a, self.b, self.c, self.d = [create_robot(i) for i in range(1, 5)]
+        self.round1 = Round.objects.create(ident='R1', name='Round 1', order_index=1, round_group_index=1, round_type=RoundType.SWISS)
+        self.round2 = Round.objects.create(ident='R2', name='Round 2', order_index=2, round_group_index=1, round_type=RoundType.SWISS)
+
+        # after round 2: a 7, b 7, c 5, d 5 points, 12 opponent points each
+        create_match(self.round1, 'R1-M01', self.a, self.b, 2, 4)
+        create_match(self.round1, 'R1-M02', self.c, self.d, 2, 4)
+        create_match(self.round2, 'R2-M01', self.a, self.d, 5, 1)
+        create_match(self.round2, 'R2-M02', self.b, self.c, 3, 3)
+
+    def values(self, field):
+        results = RoundResult.objects.filter(round=self.round2)
+        return [getattr(results.get(robot=robot), field) for robot in (self.a, self.b, self.c, self.d)]
+
+    def ranks(self, tiebreaks):
+        Round.objects.filter(pk=self.round2.pk).update(tiebreaks=tiebreaks)
+        MatchManager.get_instance().recalculate_round_results()
+        return self.values('total_robot_rank')
+
+    def test_values(self):
+        MatchManager.get_instance().recalculate_round_results()
+
+        self.assertEqual(self.values('tiebreak_buchholz'), [12, 12, 12, 12])
+        self.assertEqual(self.values('tiebreak_buchholz_cut1'), [7, 7, 7, 7])
+        self.assertEqual(self.values('tiebreak_buchholz_median'), [0, 0, 0, 0])
+        self.assertEqual(self.values('tiebreak_sonneborn_berger'), [39, 43, 31, 27])
+        self.assertEqual(self.values('tiebreak_wins'), [1, 1, 0, 1])
+        # among the robots tied on total points
+        self.assertEqual(self.values('tiebreak_head_to_head'), [2, 4, 2, 4])
+        self.assertEqual(buchholz_median([(1, 0, 0), (2, 0, 0), (3, 0, 0)], {1: 5, 2: 7, 3: 9}), 7)
+
+        # standalone recalculation writes the same values
+        RoundResult.objects.update(tiebreak_sonneborn_berger=None, tiebreak_head_to_head=None)
+        self.assertEqual(MatchManager.get_instance().calculate_tiebreaks(), 8)
+        self.assertEqual(self.values('tiebreak_sonneborn_berger'), [39, 43, 31, 27])
+        self.assertEqual(self.values('tiebreak_head_to_head'), [2, 4, 2, 4])
+
+    def test_ranks_by_chain(self):
+        self.assertEqual(self.ranks(''), [1, 1, 3, 3])
+        self.assertEqual(self.ranks('head_to_head'), [2, 1, 4, 3])
+        self.assertEqual(self.ranks('wins'), [1, 1, 4, 3])
+        self.assertEqual(self.ranks('opponent_points,sonneborn_berger'), [2, 1, 3, 4])
+
+        # head-to-head only among the robots tied on the preceding tiebreaks too
+        self.ranks('sonneborn_berger,head_to_head')
+        self.assertEqual(self.values('tiebreak_head_to_head'), [0, 0, 0, 0])
+
+    @override_settings(SMTRACKER_TIEBREAKS=['wins', 'head_to_head'])
+    def test_default_chain(self):
+        self.assertEqual(self.ranks(''), [2, 1, 4, 3])
+
+    def test_validation(self):
+        validate_tiebreaks('buchholz_cut1, wins')
+        with self.assertRaises(ValidationError):
+            validate_tiebreaks('buchholz,median')
+
+
+class TiebreakerPointsTests(SimpleTestCase):
+
+    def test_matches_legacy_implementation(self):
+        # property: same scores as the previous implementation for random tied groups, played pairs and depths
+        manager = SwissMatchManager.get_instance()
+        rnd = random.Random(0)
+        for case in range(300):
+            count = rnd.randrange(0, 40)
+            robots, played_pairs = synthetic_tied_robots(count, seed=case, played_per_robot=rnd.randrange(0, 8))
+            for robot in robots:
+                # few distinct values, so the priorities and the sort ties matter
+                robot.country = rnd.choice(['SK', 'CZ'])
+                robot.city = rnd.choice(['A', 'B'])
+                robot.robot_type = rnd.choice([None, '', 'A', 'B'])
+                robot.weight = rnd.choice([None, 999, 1000])
+            max_depth = rnd.randrange(1, 9)
+            with self.subTest(case=case, count=count, max_depth=max_depth):
+                self.assertEqual(
+                    manager.calculate_tiebreaker_points(robots, played_pairs, max_depth),
+                    legacy_calculate_tiebreaker_points(robots, played_pairs, max_depth),
+                )
+
+    def test_benchmark(self):
+        stats = benchmark_tiebreaker_points(sizes=(50, 100), repeat=1)
+        self.assertEqual([row['robots'] for row in stats], [50, 100])
+        self.assertTrue(all(row['equal'] for row in stats))
+
+
+class MatchingPairingTests(SimpleTestCase):
+
+    def robots(self, count, **kwargs):
+        return [Robot(id=i + 1, robot_name=f"Robot {i + 1}", city='City', country='SK', **kwargs) for i in range(count)]
+
+    def test_avoids_duplicates_when_greedy_fails(self):
+        robots = self.robots(4)
+        # greedy pairing would pair 1-2 and then be left with the already played 3-4
+        pairs = MatchingPairing().pair(robots, [6, 6, 4, 4], {(3, 4)})
+
+        self.assertEqual(len(pairs), 2)
+        self.assertNotIn(None, [r2 for _, r2 in pairs])
+        self.assertNotIn({3, 4}, [{r1.id, r2.id} for r1, r2 in pairs])
+
+    def test_prefers_same_points(self):
+        robots = self.robots(6)
+        pairs = MatchingPairing().pair(robots, [12, 12, 6, 6, 0, 0], set())
+
+        self.assertEqual([(r1.id, r2.id) for r1, r2 in pairs], [(1, 2), (3, 4), (5, 6)])
+
+    def test_no_valid_pairing(self):
+        robots = self.robots(4)
+        pairs = MatchingPairing().pair(robots, [0, 0, 0, 0], {(1, 2), (1, 3), (1, 4)})
+
+        self.assertEqual(sum(r2 is None for _, r2 in pairs), 2)
+
+    def test_large_field(self):
+        robots = self.robots(1200)
+        played_pairs = {(i, i + 1) for i in range(1, 1200)}
+        pairs = MatchingPairing().pair(robots, [0] * 1200, played_pairs)
+
+        self.assertEqual(len(pairs), 600)
+        self.assertFalse(any((min(r1.id, r2.id), max(r1.id, r2.id)) in played_pairs for r1, r2 in pairs))
+
+
+class SwissMatchManagerTests(TestCase):
+
+    def setUp(self):
+        self.robots = [create_robot(i, weight=900 + i) for i in range(1, 6)]
+        self.byebot = create_robot(99, robot_name='ByeBot', is_byebot=1)
+        self.round1 = Round.objects.create(ident='R1', name='Round 1', order_index=1, round_group_index=1, round_type=RoundType.SWISS)
+
+    def test_dry_run(self):
+        matches = SwissMatchManager.get_instance().generate_for_round(self.round1, create_request(), dry_run=True)
+
+        self.assertEqual(len(matches), 3)
+        self.assertEqual(matches[0].ident, 'R1-M99')
+        self.assertEqual(matches[0].robot2, self.byebot)
+        self.assertFalse(Match.objects.exists())
+
+    def test_dry_run_without_request(self):
+        for pairing in ('greedy', 'matching'):
+            with self.subTest(pairing=pairing):
+                matches = SwissMatchManager.get_instance().generate_for_round(self.round1, pairing=pairing, dry_run=True)
+
+                self.assertEqual(len(matches), 3)
+                self.assertFalse(Match.objects.exists())
+
+    def test_generate(self):
+        for pairing in ('greedy', 'matching'):
+            with self.subTest(pairing=pairing):
+                matches = SwissMatchManager.get_instance().generate_for_round(self.round1, create_request(), pairing=pairing)
+
+                self.assertEqual(len(matches), 3)
+                self.assertEqual(Match.objects.filter(round=self.round1).count(), 3)
+                robot_ids = [robot_id for match in matches for robot_id in (match.robot1_id, match.robot2_id)]
+                self.assertCountEqual(robot_ids, [robot.id for robot in self.robots] + [self.byebot.id])
+
+                MatchManager.get_instance().delete_for_round(self.round1)
+
+    def test_generate_is_atomic(self):
+        # a match with a conflicting ident makes the whole bulk insert fail
+        create_match(Round.objects.create(ident='R0', name='Round 0', order_index=0), 'R1-M02', self.robots[0], self.robots[1])
+
+        with self.assertRaises(IntegrityError):
+            SwissMatchManager.get_instance().generate_for_round(self.round1, create_request())
+        self.assertFalse(Match.objects.filter(round=self.round1).exists())
+
+
+class RoundRobinTests(SimpleTestCase):
+
+    def test_berger_table(self):
+        for size in range(2, 12):
+            with self.subTest(size=size):
+                rounds = berger_table(size)
+                self.assertEqual(len(rounds), size - 1 + size % 2)
+                pairs = [tuple(sorted(pair)) for pool_round in rounds for pair in pool_round]
+                self.assertEqual(sorted(pairs), [(i, j) for i in range(size) for j in range(i + 1, size)])
+                for pool_round in rounds:
+                    positions = [position for pair in pool_round for position in pair]
+                    self.assertEqual(len(positions), len(set(positions)))
+
+    def test_snake_pools(self):
+        self.assertEqual(snake_pools(list(range(1, 11)), 3), [[1, 6, 7], [2, 5, 8], [3, 4, 9, 10]])
+
+
+class RoundRobinMatchManagerTests(TestCase):
+
+    def setUp(self):
+        self.robots = [create_robot(i) for i in range(1, 11)]
+        create_robot(99, robot_name='ByeBot', is_byebot=1)
+        self.round0 = Round.objects.create(ident='R0', name='Round 0', order_index=0, round_group_index=1, round_type=RoundType.SWISS)
+        self.round1 = Round.objects.create(ident='RR1', name='Pools', order_index=1, round_group_index=1, round_type=RoundType.ROUND_ROBIN,
+                                           round_start_time=timezone.now(), number_of_tables=3)
+
+    def test_generate(self):
+        # seeded by the latest ranks: robot 10 is the best, robot 1 the worst
+        for rank, robot in enumerate(reversed(self.robots), start=1):
+            RoundResult.objects.create(robot=robot, round=self.round0, total_robot_rank=rank)
+
+        with self.assertNumQueries(12):
+            matches = MatchManager.get_instance().generate_for_round(self.round1, create_request())
+
+        # pools of 4, 3 and 3 robots (snake order of the seeds) -> 6 + 3 + 3 matches
+        self.assertEqual(len(matches), 12)
+        pools = {}
+        for match in Match.objects.filter(round=self.round1):
+            self.assertIsNotNone(match.schedule_time)
+            self.assertIsNotNone(match.schedule_table)
+            for robot_id in (match.robot1_id, match.robot2_id):
+                pools.setdefault(robot_id, set()).update((match.robot1_id, match.robot2_id))
+        numbers = {robot.id: robot.registration_number for robot in self.robots}
+        self.assertEqual(
+            sorted({tuple(sorted(numbers[robot_id] for robot_id in pool)) for pool in pools.values()}),
+            [(1, 2, 7, 8), (3, 6, 9), (4, 5, 10)]
+        )
+
+    def test_dry_run(self):
+        matches = RoundRobinMatchManager.get_instance().generate_for_round(self.round1, create_request(), pool_size=5, dry_run=True)
+
+        self.assertEqual(len(matches), 20)
+        self.assertEqual(matches[0].ident, 'RR1-M01')
+        self.assertFalse(Match.objects.exists())
+
+
+class KnockoutMatchManagerTests(TestCase):
+
+    def setUp(self):
+        # robot 1 is the best seed
+        self.robots = [create_robot(i, round_group2_qualified=1) for i in range(1, 7)]
+        self.byebot = create_robot(99, robot_name='ByeBot', is_byebot=1)
+        round0 = Round.objects.create(ident='R0', name='Round 0', order_index=0, round_group_index=1, round_type=RoundType.SWISS)
+        for rank, robot in enumerate(self.robots, start=1):
+            RoundResult.objects.create(robot=robot, round=round0, total_robot_rank=rank)
+        self.rounds = [
+            Round.objects.create(ident=ident, name=ident, order_index=k, round_group_index=2, round_type=RoundType.KNOCKOUT)
+            for k, ident in enumerate(['QF', 'SF', 'F'], start=1)
+        ]
+
+    def pairs(self, round_obj):
+        numbers = {robot.id: robot.registration_number for robot in self.robots + [self.byebot]}
+        return [(numbers[match.robot1_id], numbers[match.robot2_id]) for match in Match.objects.filter(round=round_obj).order_by('ident')]
+
+    def finish(self, ident, points1, points2):
+        match = Match.objects.select_related('round').get(ident=ident)
+        self.assertTrue(MatchManager.get_instance().save_match_result(match, MatchStatus.FINISHED, points1, points2))
+
+    def test_bracket_helpers(self):
+        self.assertEqual(bracket_size(6), 8)
+        self.assertEqual(bracket_size(8), 8)
+        self.assertEqual(seed_order(8), [1, 8, 4, 5, 2, 7, 3, 6])
+
+    def test_bracket_and_advancement(self):
+        quarterfinal, semifinal, final = self.rounds
+        MatchManager.get_instance().generate_for_round(quarterfinal, create_request())
+        # 6 robots in a bracket of 8: the two best seeds get a bye
+        self.assertEqual(self.pairs(quarterfinal), [(1, 99), (4, 5), (2, 99), (3, 6)])
+
+        # nothing is decided in both halves yet
+        self.assertEqual(KnockoutMatchManager.get_instance().generate_for_round(semifinal, create_request()), [])
+
+        # saving a result advances the winner once the sibling match is decided
+        self.finish('QF-M02', 2, 4)
+        self.assertEqual(self.pairs(semifinal), [(1, 5)])
+
+        # a corrected result changes the robot of the next match (not played yet)
+        match = Match.objects.select_related('round').get(ident='QF-M02')
+        self.assertTrue(MatchManager.get_instance().save_match_result(match, MatchStatus.FINISHED, 4, 2))
+        self.assertEqual(self.pairs(semifinal), [(1, 4)])
+
+        # generating the round creates the matches decided in the meantime
+        Match.objects.filter(ident='QF-M04').update(status=MatchStatus.FINISHED, result_robot1_points=6, result_robot2_points=0)
+        matches = KnockoutMatchManager.get_instance().generate_for_round(semifinal, create_request())
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(self.pairs(semifinal), [(1, 4), (2, 3)])
+
+        self.finish('SF-M01', 5, 1)
+        self.assertEqual(self.pairs(final), [])
+        # the advance reads only the next round, the sibling match and the next match
+        with self.assertNumQueries(11):
+            self.finish('SF-M02', 1, 5)
+        self.assertEqual(self.pairs(final), [(1, 3)])
+
+        # the final feeds no further round
+        self.finish('F-M01', 6, 0)
+        self.assertEqual(Match.objects.count(), 7)
+
+    @override_settings(SMTRACKER_BACKGROUND_RECALCULATION=False)
+    def test_draw_is_rejected(self):
+        MatchManager.get_instance().generate_for_round(self.rounds[0], create_request())
+        match = Match.objects.get(ident='QF-M02')
+
+        response = self.client.post(reverse('smtracker:match_results', args=[self.rounds[0].id]), {
+            'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 1,
+            'form-0-id': match.id, 'form-0-version': match.version, 'form-0-status': MatchStatus.FINISHED,
+            'form-0-result_robot1_points': 3, 'form-0-result_robot2_points': 3,
+        })
+        self.assertContains(response, 'QF-M02 needs a decisive result')
+
+        url = reverse('smtracker:match_result_api', args=[match.id])
+        response = self.client.post(url, {'result_robot1_points': 3, 'result_robot2_points': 3}, content_type='application/json',
+                                    HTTP_IF_MATCH=self.client.get(url)['ETag'])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('decisive result', str(response.json()['errors']))
+
+        match.refresh_from_db()
+        self.assertEqual((match.version, match.result_robot1_points), (0, None))
+
+
+class RoundListViewTests(TestCase):
+
+    def create_tournament(self, robot_count, round_count):
+        robots = [create_robot(i) for i in range(1, robot_count + 1)]
+        for k in range(1, round_count + 1):
+            round_obj = Round.objects.create(ident=f"R{k}", name=f"Round {k}", order_index=k, round_group_index=1, round_type=RoundType.SWISS)
+            for i in range(0, robot_count - 1, 2):
+                # the same pairs in every round -> duplicates from round 2
+                create_match(round_obj, f"R{k}-M{i:02d}", robots[i], robots[i + 1])
+
+    def test_query_count(self):
+        for robot_count, round_count in ((4, 2), (20, 6)):
+            with self.subTest(robot_count=robot_count, round_count=round_count):
+                Round.objects.all().delete()
+                Robot.objects.all().delete()
+                self.create_tournament(robot_count, round_count)
+
+                with self.assertNumQueries(3):
+                    response = self.client.get(reverse('smtracker:round_list'))
+
+                rounds = response.context['rounds']
+                self.assertEqual(len(rounds), round_count)
+                self.assertEqual(rounds[0].robots_count, robot_count)
+                self.assertEqual(rounds[0].matches_count, robot_count // 2)
+                self.assertEqual(rounds[0].duplicate_matches_count, 0)
+                self.assertEqual(rounds[-1].duplicate_matches_count, robot_count // 2)
+                self.assertEqual(rounds[-1].scheduled_matches_count, 0)
+
+
+class PlayedPairTests(TestCase):
+
+    def setUp(self):
+        self.robots = [create_robot(i) for i in range(1, 5)]
+        self.rounds = [
+            Round.objects.create(ident=f"R{k}", name=f"Round {k}", order_index=k, round_group_index=1, round_type=RoundType.SWISS)
+            for k in range(1, 4)
+        ]
+
+    def rows(self):
+        return set(PlayedPair.objects.values_list('round_order', 'robot_lo_id', 'robot_hi_id', 'first_round_order'))
+
+    def assertRebuildUnchanged(self):
+        rows = self.rows()
+        rebuild_played_pairs()
+        self.assertEqual(self.rows(), rows)
+
+    def test_single_match_writes(self):
+        r1, r2, r3, r4 = self.robots
+        create_match(self.rounds[0], 'R1-M01', r2, r1)
+        match = create_match(self.rounds[1], 'R2-M01', r1, r2)
+        create_match(self.rounds[1], 'R2-M02', r3, r4)
+        self.assertEqual(self.rows(), {(1, r1.id, r2.id, 1), (2, r1.id, r2.id, 1), (2, r3.id, r4.id, 2)})
+        self.assertRebuildUnchanged()
+
+        match.robot2 = r3
+        match.save()
+        self.assertEqual(self.rows(), {(1, r1.id, r2.id, 1), (2, r1.id, r3.id, 2), (2, r3.id, r4.id, 2)})
+
+        Match.objects.get(ident='R1-M01').delete()
+        self.assertEqual(self.rows(), {(2, r1.id, r3.id, 2), (2, r3.id, r4.id, 2)})
+
+        self.rounds[1].round_group_index = 2
+        self.rounds[1].save()
+        self.assertEqual(set(PlayedPair.objects.values_list('round_group_index', flat=True)), {2})
+        self.assertRebuildUnchanged()
+
+    def test_lookups(self):
+        r1, r2, r3, r4 = self.robots
+        create_match(self.rounds[0], 'R1-M01', r1, r2)
+        create_match(self.rounds[0], 'R1-M02', r3, r4)
+        create_match(self.rounds[1], 'R2-M01', r3, r1)
+
+        self.assertEqual(get_played_pairs(1, 2), {(r1.id, r2.id), (r3.id, r4.id)})
+        self.assertEqual(get_played_pairs(1, 3), {(r1.id, r2.id), (r3.id, r4.id), (r1.id, r3.id)})
+        self.assertEqual(get_played_pairs(2, 3), set())
+        with self.assertNumQueries(1):
+            self.assertEqual(opponent_ids(r1.id, 1, 3), {r2.id, r3.id})
+
+    def test_manager_writes(self):
+        r1, r2, r3, r4 = self.robots
+        create_match(self.rounds[0], 'R1-M01', r1, r2)
+        create_match(self.rounds[0], 'R1-M02', r3, r4)
+        MatchManager.get_instance().recalculate_round_results()
+
+        matches = SwissMatchManager.get_instance().generate_for_round(self.rounds[1], create_request())
+        self.assertEqual(PlayedPair.objects.filter(round=self.rounds[1]).count(), len(matches))
+        self.assertEqual(PlayedPair.objects.filter(round=self.rounds[1], first_round_order__lt=2).count(), 0)
+        self.assertRebuildUnchanged()
+
+        MatchManager.get_instance().delete_for_round(self.rounds[1])
+        self.assertFalse(PlayedPair.objects.filter(round=self.rounds[1]).exists())
+        self.assertEqual(PlayedPair.objects.count(), 2)
+
+        self.rounds[0].delete()
+        self.assertFalse(PlayedPair.objects.exists())
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN output of SQLite")
+class QueryPlanTests(TestCase):
+    """
+    The hot queries use the composite indexes instead of full scans (synthetic 2,000-robot tournament).
+    The tournament snapshot reads whole tables by design, it is loaded before the captured operations.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        build_synthetic_tournament(2000, round_count=4, open_round_count=1)
+        MatchManager.get_instance().recalculate_round_results()
+        cls.rounds = list(Round.objects.order_by('order_index'))
+
+    def setUp(self):
+        cache.clear()
+
+    def query_plans(self, func):
+        """Run func and return the query plan lines of its SELECT queries."""
+        with CaptureQueriesContext(connection) as context:
+            func()
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if query['sql'].startswith('SELECT'):
+                    cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                    plans.extend(row[-1] for row in cursor.fetchall())
+        return plans
+
+    def assertIndexesUsed(self, plans, indexes):
+        report = '\n'.join(plans)
+        full_scans = [line for line in plans if re.match(r'SCAN (TABLE )?smtracker_(match|roundresult|playedpair)\b', line)]
+        self.assertEqual(full_scans, [], report)
+        for index in indexes:
+            self.assertTrue(any(index in line for line in plans), f"{index} not used:\n{report}")
+
+    def test_generator(self):
+        snapshot = TournamentSnapshot.load()
+        plans = self.query_plans(
+            lambda: SwissMatchManager.get_instance().generate_for_round(self.rounds[4], create_request(), dry_run=True, snapshot=snapshot)
+        )
+        self.assertIndexesUsed(plans, ['smtracker_playedpair_order_idx'])
+
+    def test_recalculation(self):
+        snapshot = TournamentSnapshot.load()
+        plans = self.query_plans(lambda: MatchManager.get_instance().recalculate_round_results(from_round=self.rounds[3], snapshot=snapshot))
+        # everything is read from the snapshot
+        self.assertEqual(plans, [])
+
+    def test_snapshot_size(self):
+        with self.assertNumQueries(4):
+            snapshot = TournamentSnapshot.load()
+        self.assertEqual(len(snapshot.robots), 2001)
+        self.assertLess(snapshot.nbytes(), 5 * 1024 * 1024)
+
+    def test_results_views(self):
+        round_id = self.rounds[3].id
+        plans = self.query_plans(lambda: self.client.get(reverse('smtracker:round_results', args=[round_id])))
+        self.assertIndexesUsed(plans, ['smtracker_roundresult_rank_idx'])
+
+        for name in ('match_results', 'scheduled_matches'):
+            plans = self.query_plans(lambda: self.client.get(reverse(f'smtracker:{name}', args=[round_id])))
+            self.assertIndexesUsed(plans, ['smtracker_match_robot'])
+
+
+class TournamentSnapshotTests(TestCase):
+
+    def setUp(self):
+        self.r1 = create_robot(1)
+        self.r2 = create_robot(2, round_group2_qualified=1)
+        self.byebot = create_robot(99, robot_name='ByeBot', is_byebot=1)
+        self.round1 = Round.objects.create(ident='R1', name='Round 1', order_index=1, round_group_index=1, round_type=RoundType.SWISS)
+        self.round2 = Round.objects.create(ident='R2', name='Round 2', order_index=2, round_group_index=1, round_type=RoundType.SWISS)
+        self.final = Round.objects.create(ident='F1', name='Final 1', order_index=3, round_group_index=2, round_type=RoundType.SWISS)
+        create_match(self.round1, 'R1-M01', self.r1, self.r2, 4, 2)
+        create_match(self.round2, 'R2-M01', self.r2, self.r1)    # not played yet
+        MatchManager.get_instance().recalculate_round_results()
+
+    def test_load(self):
+        with self.assertNumQueries(4):
+            snapshot = TournamentSnapshot.load()
+
+        self.assertEqual(snapshot.byebot.id, self.byebot.id)
+        self.assertEqual([robot.id for robot in snapshot.qualified_robots(1)], [self.r1.id, self.r2.id])
+        self.assertEqual([robot.id for robot in snapshot.qualified_robots(2)], [self.r2.id])
+        self.assertEqual(snapshot.previous_round(self.round2), self.round1)
+        self.assertIsNone(snapshot.previous_round(self.final))
+        self.assertEqual(snapshot.latest_result_round(self.final.order_index), self.round2)
+
+        match = snapshot.matches([self.round2.id])[0]
+        self.assertEqual((match.robot1_id, match.robot2_id, match.result_robot1_points, match.result_robot2_points), (self.r2.id, self.r1.id, None, None))
+        self.assertEqual(len(snapshot.matches([self.round1.id, self.round2.id, self.final.id])), 2)
+
+        for result in RoundResult.objects.all():
+            self.assertTrue(snapshot.has_result(result.round_id, result.robot_id))
+            self.assertEqual(snapshot.result(result.round_id, result.robot_id, 'total_robot_points'), result.total_robot_points)
+            self.assertEqual(snapshot.result(result.round_id, result.robot_id, 'total_robot_rank'), result.total_robot_rank)
+        self.assertFalse(snapshot.has_result(self.final.id, self.r1.id))
+        self.assertIsNone(snapshot.result(self.final.id, self.r1.id, 'total_robot_points'))
+
+    def test_cached_per_request(self):
+        request = create_request()
+        snapshot = get_snapshot(request)
+        with self.assertNumQueries(0):
+            self.assertIs(get_snapshot(request), snapshot)
+
+        # loaded again after a (committed) change
+        increment_tournament_version()
+        with self.assertNumQueries(4):
+            self.assertIsNot(get_snapshot(request), snapshot)
+
+
+class ScheduleMatchesTests(TestCase):
+
+    def setUp(self):
+        self.robots = [create_robot(i) for i in range(1, 7)]
+        self.start_time = timezone.now().replace(microsecond=0)
+        self.round1 = Round.objects.create(ident='R1', name='Round 1', order_index=1, round_group_index=1,
+                                           round_start_time=self.start_time, number_of_tables=2)
+        r = self.robots
+        # robot 1 plays three matches
+        for ident, robot1, robot2 in (('M1', r[0], r[1]), ('M2', r[0], r[2]), ('M3', r[0], r[3]), ('M4', r[4], r[5])):
+            create_match(self.round1, ident, robot1, robot2)
+
+    def test_schedule(self):
+        matches = MatchManager.get_instance().schedule_matches(self.round1, seed=1)
+
+        self.assertEqual(len(matches), 4)
+        times = sorted(Match.objects.filter(robot1=self.robots[0]).values_list('schedule_time', flat=True))
+        # robot 1 rests one match between its matches
+        self.assertEqual(times, [self.start_time + datetime.timedelta(minutes=m) for m in (0, 8, 16)])
+        self.assertEqual(Match.objects.filter(round=self.round1, schedule_table__in=[1, 2]).count(), 4)
+
+    def test_byebot_matches_take_no_slot(self):
+        byebot = create_robot(99, robot_name='ByeBot', is_byebot=1)
+        create_match(self.round1, 'M99', self.robots[4], byebot)
+
+        MatchManager.get_instance().schedule_matches(self.round1, seed=1)
+
+        byebot_match = Match.objects.get(ident='M99')
+        self.assertIsNone(byebot_match.schedule_table)
+        self.assertIsNone(byebot_match.schedule_time)
+        # the played matches need the same slots as without the ByeBot match
+        times = Match.objects.exclude(ident='M99').values_list('schedule_time', flat=True)
+        self.assertEqual(max(times), self.start_time + datetime.timedelta(minutes=16))
+        self.assertEqual(Match.objects.filter(robot1=self.robots[4], schedule_time__isnull=False).count(), 1)
+
+        response = self.client.get(reverse('smtracker:round_list'))
+        self.assertEqual(response.context['rounds'][0].scheduled_matches_count, 5)
+
+    def test_schedule_is_reproducible(self):
+        match_manager = MatchManager.get_instance()
+        match_manager.schedule_matches(self.round1, seed=7)
+        first = list(Match.objects.order_by('ident').values_list('schedule_time', 'schedule_table'))
+        match_manager.schedule_matches(self.round1, seed=7)
+
+        self.assertEqual(list(Match.objects.order_by('ident').values_list('schedule_time', 'schedule_table')), first)
+
+
+class TableSchedulerTests(SimpleTestCase):
+
+    def test_constraints(self):
+        rnd = random.Random(0)
+        matches = [Match(ident=f"M{i}", robot1_id=a, robot2_id=b) for i, (a, b) in enumerate(rnd.sample(range(60), 2) for _ in range(500))]
+
+        schedule = TableScheduler(8, rest_slots=1, table_preferences={1: 3}, seed=0).schedule(matches)
+
+        self.assertEqual(len(schedule), 500)
+        self.assertEqual(len({(slot, table) for _, slot, table in schedule}), 500)
+        robot_slots = {}
+        for match, slot, table in schedule:
+            if 1 in (match.robot1_id, match.robot2_id):
+                self.assertEqual(table, 3)
+            for robot_id in (match.robot1_id, match.robot2_id):
+                robot_slots.setdefault(robot_id, []).append(slot)
+        for slots in robot_slots.values():
+            slots.sort()
+            self.assertTrue(all(b - a >= 2 for a, b in zip(slots, slots[1:])))
+
+
+class BenchmarkTests(TestCase):
+
+    def test_run_benchmarks(self):
+        create_robot(1)
+        stats = run_benchmarks(sizes=(8,), round_count=2, repeat=1)
+
+        self.assertEqual({row['robots'] for row in stats}, {8})
+        self.assertIn('generate_for_round (matching)', [row['operation'] for row in stats])
+        self.assertTrue(all(row['wall_secs'] >= 0 and row['queries'] >= 0 for row in stats))
+        # the cached pages are measured both rendered and from the cache
+        queries = {row['operation']: row['queries'] for row in stats}
+        self.assertGreater(queries['views.round_results'], 0)
+        self.assertEqual(queries['views.round_results (cached)'], 0)
+        # the database is left unchanged
+        self.assertEqual(list(Robot.objects.values_list('registration_number', flat=True)), [1])
+
+
+
+class InstrumentationTests(TestCase):
+
+    def setUp(self):
+        create_robot(1)
+        Round.objects.create(ident='R1', name='Round 1', order_index=1, round_group_index=1)
+
+    def test_instrument_manager_methods(self):
+        with instrument('recalculation') as stats:
+            MatchManager.get_instance().recalculate_round_results()
+
+        self.assertGreater(stats.query_count, 0)
+        self.assertIn('MatchManager.recalculate_round_results', stats.phases)
+        self.assertIn('MatchManager.calculate_ranks_for_rounds', stats.phases)
+        self.assertLessEqual(len(stats.slowest()), 5)
+
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse('smtracker:round_list'))
+
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(SMTRACKER_INSTRUMENTATION=True)
+    def test_middleware(self):
+        response = self.client.get(reverse('smtracker:round_list'))
+
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('render;dur=', response['Server-Timing'])
+        self.assertEqual(recent_stats()[0].label, f"GET {reverse('smtracker:round_list')}")
+        self.assertEqual(recent_stats()[0].query_count, 3)
+
+        User.objects.create_user('staff', password='staff', is_staff=True)
+        self.client.login(username='staff', password='staff')
+        response = self.client.get(reverse('smtracker:instrumentation'))
+
+        self.assertContains(response, f"GET {reverse('smtracker:round_list')}")
+
+
+
+class PageCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.r1 = create_robot(1, robot_name='Alpha')
+        self.r2 = create_robot(2, robot_name='Beta')
+        self.round1 = Round.objects.create(ident='R1', name='Round 1', order_index=1, round_group_index=1)
+        self.match = create_match(self.round1, 'R1-M01', self.r1, self.r2, 6, 0)
+        MatchManager.get_instance().recalculate_round_results()
+
+    def test_round_results(self):
+        url = reverse('smtracker:round_results', args=[self.round1.id])
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, 'Alpha')
+
+        # any write of a tournament model invalidates the cached pages
+        with self.captureOnCommitCallbacks(execute=True):
+            Robot.objects.filter(id=self.r1.id).update(robot_name='Gamma')
+            self.r1.refresh_from_db()
+            self.r1.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Gamma')
+
+    def test_scheduled_matches(self):
+        url = reverse('smtracker:scheduled_matches', args=[self.round1.id])
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        Round.objects.filter(id=self.round1.id).update(round_start_time=datetime.datetime(2025, 4, 26, 10, 50, tzinfo=datetime.timezone.utc))
+        self.round1.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            MatchManager.get_instance().schedule_matches(self.round1)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertContains(response, '2025-04-26 10:50')
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        create_robot(1)
+        self.round1 = Round.objects.create(ident='R1', name='Round 1', order_index=1, round_group_index=1)
+
+    def test_not_modified(self):
+        for url in (reverse('smtracker:robot_list'), reverse('smtracker:round_list'),
+                    reverse('smtracker:round_results', args=[self.round1.id]),
+                    reverse('smtracker:scheduled_matches', args=[self.round1.id])):
+            with self.subTest(url=url):
+                # the first response sets the CSRF cookie
+                self.client.get(url)
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                # the rounds list contains a form, its ETag depends on the CSRF secret (no Last-Modified)
+                self.assertEqual(response.has_header('Last-Modified'), url != reverse('smtracker:round_list'))
+
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_modified(self):
+        url = reverse('smtracker:robot_list')
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_robot(2)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_rotated_csrf_secret(self):
+        client = Client(enforce_csrf_checks=True)
+        url = reverse('smtracker:round_list')
+        client.get(url)
+        etag = client.get(url)['ETag']
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # e.g. after login: the page with the old token must not be revalidated
+        client.cookies[settings.CSRF_COOKIE_NAME] = get_random_string(32)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()).group(1)
+        response = client.post(url, {'csrfmiddlewaretoken': token, 'action': 'generate'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_pending_messages(self):
+        url = reverse('smtracker:round_list')
+        etag = self.client.get(url)['ETag']
+        self.client.cookies['messages'] = 'pending'
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class LiveScoreboardTests(TestCase):
+
+    def setUp(self):
+        self.r1 = create_robot(1, robot_name='Alpha')
+        self.r2 = create_robot(2, robot_name='Beta')
+        self.round1 = Round.objects.create(ident='R1', name='Round 1', order_index=1, round_group_index=1)
+        self.match = create_match(self.round1, 'R1-M01', self.r1, self.r2, 6, 0)
+        MatchManager.get_instance().recalculate_round_results()
+
+    def open_stream(self):
+        response = self.client.get(reverse('smtracker:live_events'))
+        self.addCleanup(response.close)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = iter(response.streaming_content)
+        self.assertEqual(next(stream), b'retry: 3000\n\n')
+        return stream
+
+    def test_rank_changes(self):
+        stream = self.open_stream()
+        self.assertTrue(live.has_listeners())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Match.objects.filter(id=self.match.id).update(result_robot1_points=0, result_robot2_points=6)
+            MatchManager.get_instance().recalculate_round_results(from_round=self.round1)
+
+        event = next(stream).decode()
+        self.assertIn('event: ranks', event)
+        self.assertIn('"robot_name": "Beta", "rank": 1, "previous_rank": 2', event)
+
+    def test_match_result(self):
+        stream = self.open_stream()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.match.result_robot1_points = 3
+            self.match.save()
+
+        event = next(stream).decode()
+        self.assertIn('event: result', event)
+        self.assertIn('"ident": "R1-M01"', event)
+
+    def test_no_deltas_without_listeners(self):
+        self.assertFalse(live.has_listeners())
+        last_event_id = live.last_event_id()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.match.save()
+            MatchManager.get_instance().recalculate_round_results()
+
+        self.assertEqual(live.last_event_id(), last_event_id)
+
+    def test_reconnect(self):
+        live.publish('result', {'round': self.round1.id})
+        response = self.client.get(reverse('smtracker:live_events'), HTTP_LAST_EVENT_ID=str(live.last_event_id() - 1))
+        self.addCleanup(response.close)
+        stream = iter(response.streaming_content)
+        next(stream)
+
+        self.assertIn(f'id: {live.last_event_id()}', next(stream).decode())
+
+    def test_scoreboard_page(self):
+        response = self.client.get(reverse('smtracker:live_scoreboard', args=[self.round1.id]))
+
+        self.assertContains(response, 'Alpha')
+        self.assertContains(response, reverse('smtracker:live_events'))
+
+
+@override_settings(SMTRACKER_BACKGROUND_RECALCULATION=False)
+class MatchResultApiTests(TestCase):
+
+    def setUp(self):
+        self.r1 = create_robot(1)
+        self.r2 = create_robot(2)
+        self.round1 = Round.objects.create(ident='R1', name='Round 1', order_index=1, round_group_index=1)
+        self.match = Match.objects.create(round=self.round1, ident='R1-M01', robot1=self.r1, robot2=self.r2)
+        self.url = reverse('smtracker:match_result_api', args=[self.match.id])
+
+    def post(self, data, etag):
+        return self.client.post(self.url, data, content_type='application/json', HTTP_IF_MATCH=etag)
+
+    def test_submit_result(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.post({'result_robot1_points': 6, 'result_robot2_points': 0}, etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.match.refresh_from_db()
+        self.assertEqual((self.match.status, self.match.result_robot1_points), (MatchStatus.FINISHED, 6))
+        self.assertEqual(RoundResult.objects.get(round=self.round1, robot=self.r1).total_robot_rank, 1)
+
+        status = self.client.get(reverse('smtracker:standings_status'), {'ticket': response.json()['ticket']}).json()
+        self.assertTrue(status['fresh'])
+
+    def test_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        response = client.get(self.url)
+        token = response.cookies[settings.CSRF_COOKIE_NAME].value
+        data = json.dumps({'result_robot1_points': 6, 'result_robot2_points': 0})
+
+        response = client.post(self.url, data, content_type='application/json', HTTP_IF_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 403)
+
+        response = client.post(self.url, data, content_type='application/json', HTTP_IF_MATCH=client.get(self.url)['ETag'],
+                               HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 200)
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.result_robot1_points, 6)
+
+    def test_conflict(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.post({'result_robot1_points': 6, 'result_robot2_points': 0}, etag).status_code, 200)
+
+        # second judge submits with the outdated ETag
+        response = self.post({'result_robot1_points': 0, 'result_robot2_points': 6}, etag)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['match']['result_robot1_points'], 6)
+
+    def test_match_results_formset_conflict(self):
+        url = reverse('smtracker:match_results', args=[self.round1.id])
+        data = {
+            'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 1,
+            'form-0-id': self.match.id, 'form-0-version': 0, 'form-0-status': MatchStatus.FINISHED,
+            'form-0-result_robot1_points': 6, 'form-0-result_robot2_points': 0,
+        }
+        self.client.post(url, data)
+        self.match.refresh_from_db()
+        self.assertEqual((self.match.version, self.match.result_robot1_points), (1, 6))
+
+        # second judge submits the page loaded before the first save
+        response = self.client.post(url, {**data, 'form-0-result_robot1_points': 0, 'form-0-result_robot2_points': 6}, follow=True)
+
+        self.assertContains(response, 'R1-M01 was changed in the meantime')
+        self.match.refresh_from_db()
+        self.assertEqual((self.match.version, self.match.result_robot1_points), (1, 6))
+
+    def test_admin_edit(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='admin'))
+        url = reverse('admin:smtracker_match_change', args=[self.match.id])
+        self.assertNotContains(self.client.get(url), 'name="version"')
+        etag = self.client.get(self.url)['ETag']
+
+        self.client.post(url, {
+            'ident': 'R1-M01', 'status': MatchStatus.FINISHED, 'round': self.round1.id, 'robot1': self.r1.id, 'robot2': self.r2.id,
+            'schedule_time_0': '', 'schedule_time_1': '', 'schedule_table': '',
+            'result_robot1_points': 4, 'result_robot2_points': 2, 'version': 7,
+        })
+
+        # the posted version is ignored, the edit invalidates the ETag
+        self.match.refresh_from_db()
+        self.assertEqual((self.match.version, self.match.result_robot1_points), (1, 4))
+        self.assertEqual(self.post({'result_robot1_points': 6, 'result_robot2_points': 0}, etag).status_code, 409)
+
+    def test_invalid(self):
+        etag = self.client.get(self.url)['ETag']
+
+        self.assertEqual(self.client.post(self.url, {'result_robot1_points': 6}, content_type='application/json').status_code, 428)
+        self.assertEqual(self.post({'result_robot1_points': 'six'}, etag).status_code, 400)
+        self.assertEqual(self.client.post(self.url, 'not json', content_type='application/json', HTTP_IF_MATCH=etag).status_code, 400)
+
+
+class RecalculationWorkerTests(TestCase):
+
+    def setUp(self):
+        self.round1 = Round.objects.create(ident='R1', name='Round 1', order_index=1, round_group_index=1)
+        self.round2 = Round.objects.create(ident='R2', name='Round 2', order_index=2, round_group_index=1)
+
+    def test_coalesce(self):
+        worker = RecalculationWorker()
+        # the worker thread is not started, requests stay pending
+        worker.thread = type('Thread', (), {'is_alive': lambda self: True})()
+        worker.enqueue(self.round2)
+        ticket = worker.enqueue(self.round1)
+        self.assertFalse(worker.status(ticket)['fresh'])
+        self.assertEqual(worker.pending_round, self.round1)
+
+        worker.run_pending()
+
+        self.assertTrue(worker.status(ticket)['fresh'])
+        self.assertIsNone(worker.pending_round)
+
+
+class RobotImportTests(TestCase):
+
+    CSV = (
+        "registration_number,robot_name,author_name,city,country,weight,robot_type,note\n"
+        "1,Alpha 2,Author,City,SK,950,A,x\n"
+        "2,Beta,Author,City,CZ,,,x\n"
+        "3,Gamma,Author,City,HU,heavy,,x\n"
+        "2,Beta again,Author,City,CZ,,,x\n"
+        ",No number,Author,City,SK,,,x\n"
+    )
+
+    def setUp(self):
+        create_robot(1, robot_name='Alpha', weight=900)
+
+    def test_import_csv(self):
+        report = RobotImporter(batch_size=2).import_file(io.StringIO(self.CSV), 'csv')
+
+        self.assertEqual((report['created'], report['updated'], report['invalid']), (1, 1, 3))
+        self.assertEqual([error['row'] for error in report['errors']], [3, 4, 5])
+        self.assertIn('weight', report['errors'][0]['errors'])
+        self.assertEqual(report['ignored_columns'], ['note'])
+
+        alpha = Robot.objects.get(registration_number=1)
+        self.assertEqual((alpha.robot_name, alpha.weight, alpha.round_group1_qualified), ('Alpha 2', 950, 1))
+        beta = Robot.objects.get(registration_number=2)
+        self.assertEqual((beta.robot_name, beta.weight, beta.round_group1_qualified, beta.is_byebot), ('Beta', None, 0, 0))
+
+        # importing the same file again changes nothing
+        report = RobotImporter().import_file(io.StringIO(self.CSV), 'csv')
+        self.assertEqual((report['created'], report['updated'], report['unchanged']), (0, 0, 2))
+
+    def test_dry_run(self):
+        report = RobotImporter(dry_run=True).import_file(io.StringIO(self.CSV), 'csv')
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(Robot.objects.count(), 1)
+        self.assertEqual(Robot.objects.get().robot_name, 'Alpha')
+
+    def test_read_json(self):
+        data = '[{"registration_number": 1, "robot_name": "A \\"1\\""},\n {"registration_number": 2}]'
+
+        self.assertEqual(list(read_json(io.StringIO(data), chunk_size=7)),
+                         [{'registration_number': 1, 'robot_name': 'A "1"'}, {'registration_number': 2}])
+        self.assertEqual(len(list(read_json(io.StringIO('{"a": 1}\n{"a": 2}\n')))), 2)
+        with self.assertRaises(ValueError):
+            list(read_json(io.StringIO('[{"a": 1}, {"a": ')))
+
+    def test_upload_view(self):
+        upload = SimpleUploadedFile('robots.json', b'[{"registration_number": 5, "robot_name": "Delta", '
+                                                   b'"author_name": "Author", "city": "City", "country": "SK"}]')
+
+        response = self.client.post(reverse('smtracker:robot_import'), {'file': upload, 'file_format': 'json'})
+
+        self.assertContains(response, '1 robots created')
+        self.assertTrue(Robot.objects.filter(registration_number=5, robot_name='Delta').exists())
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        self.r1 = create_robot(1, robot_name='Alpha')
+        self.r2 = create_robot(2, robot_name='Beta')
+        self.round1 = Round.objects.create(ident='R1', name='Round 1', order_index=1, round_group_index=1)
+        self.round2 = Round.objects.create(ident='R2', name='Round 2', order_index=2, round_group_index=1)
+        create_match(self.round1, 'R1-M01', self.r1, self.r2, 6, 0)
+        create_match(self.round2, 'R2-M01', self.r2, self.r1, 4, 2)
+        MatchManager.get_instance().recalculate_round_results()
+
+    def test_export_csv(self):
+        response = self.client.get(reverse('smtracker:export', args=['matches', 'csv']))
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('smtracker-matches.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([(row['match'], row['robot1_robot_name'], row['result_robot1_points']) for row in rows],
+                         [('R1-M01', 'Alpha', '6'), ('R2-M01', 'Beta', '4')])
+
+    def test_export_round_json(self):
+        response = self.client.get(reverse('smtracker:round_export', args=[self.round2.id, 'round_results', 'json']))
+
+        results = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([(result['round'], result['rank'], result['robot_name']) for result in results],
+                         [('R2', 1, 'Alpha'), ('R2', 2, 'Beta')])
+        self.assertEqual(self.client.get(reverse('smtracker:export', args=['rounds', 'csv'])).status_code, 404)
+
+    def test_export_command(self):
+        out = io.StringIO()
+        call_command('export', 'robots', stdout=out)
+
+        # the robots export can be imported again
+        report = RobotImporter().import_file(io.StringIO(out.getvalue()), 'csv')
+        self.assertEqual((report['unchanged'], report['invalid']), (2, 0))
+
+
+class RobotRegistrationEditTests(TestCase):
+
+    def setUp(self):
+        self.robots = [create_robot(i, weight=900, round_group1_qualified=i % 2) for i in range(1, 61)]
+        self.url = reverse('smtracker:robot_registration_edit')
+
+    def post_data(self, robots, changes):
+        data = {'form-TOTAL_FORMS': len(robots), 'form-INITIAL_FORMS': len(robots)}
+        for i, robot in enumerate(robots):
+            values = {'id': robot.id, 'weight': robot.weight, 'byebot_points': '', 'robot_type': '', 'robot_kit_type': '',
+                      'round_group1_qualified': robot.round_group1_qualified}
+            values.update(changes.get(robot.registration_number, {}))
+            data.update({f'form-{i}-{field}': value for field, value in values.items()})
+        return data
+
+    def test_pagination_and_filter(self):
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['formset'].forms), 50)
+        self.assertContains(response, 'page=2')
+
+        response = self.client.get(self.url, {'registration_from': 10, 'registration_to': 20, 'qualified': '1'})
+        self.assertEqual([form.instance.registration_number for form in response.context['formset'].forms],
+                         [11, 13, 15, 17, 19])
+
+    def test_save_changed_only(self):
+        robots = self.robots[:50]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url + '?page=1', self.post_data(robots, {3: {'weight': 950}}))
+        statements = [query['sql'].split()[0] for query in queries]
+
+        # the posted robots are loaded with one query, the changed robot is written with one UPDATE
+        self.assertEqual(statements, ['SELECT', 'UPDATE'])
+        self.assertRedirects(response, self.url + '?page=1')
+        self.assertEqual(Robot.objects.get(registration_number=3).weight, 950)
+        self.assertEqual(Robot.objects.filter(weight=900).count(), 59)
+
+    def test_invalid_id(self):
+        data = self.post_data(self.robots[:2], {2: {'weight': 950}})
+        data['form-0-id'] = 'abc'
+
+        response = self.client.post(self.url, data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['formset'].errors[0])
+        self.assertEqual(Robot.objects.filter(weight=900).count(), 60)
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+# Tiebreak policies: robots with equal total points are ranked (and ordered for the Swiss pairing) by the
+# tiebreak chain of the round (Round.tiebreaks, default: SMTRACKER_TIEBREAKS), all values descending.
+#
+# The values are computed for every round result in the recalculation (MatchManager.calculate_tiebreaks)
+# from the matches of the round group up to and including the round, ByeBot matches excluded.
+# A robot's record is a list of (opponent_id, own points, opponent's points) of its matches, `points` are
+# the total points of the robots in the round.
+
+def buchholz(record, points):
+    """Sum of the total points of the opponents (of every match)."""
+    return sum(points.get(opponent_id, 0) for opponent_id, _, _ in record)
+
+def buchholz_cut1(record, points):
+    """Buchholz without the weakest opponent."""
+    values = sorted(points.get(opponent_id, 0) for opponent_id, _, _ in record)
+    return sum(values[1:])
+
+def buchholz_median(record, points):
+    """Buchholz without the weakest and the strongest opponent."""
+    values = sorted(points.get(opponent_id, 0) for opponent_id, _, _ in record)
+    return sum(values[1:-1])
+
+def sonneborn_berger(record, points):
+    """Total points of the opponents weighted by the points scored against them."""
+    return sum(points.get(opponent_id, 0) * own_points for opponent_id, own_points, _ in record)
+
+def wins(record, points):
+    """Number of won matches."""
+    return sum(1 for _, own_points, opponent_points in record if own_points > opponent_points)
+
+# name -> (RoundResult field, function computing the value from the record; None = computed separately)
+# head_to_head: points scored in the matches against the robots tied on total points and on the tiebreaks
+# preceding it in the chain.
+TIEBREAKS = {
+    'opponent_points': ('total_opponent_points', None),
+    'buchholz': ('tiebreak_buchholz', buchholz),
+    'buchholz_cut1': ('tiebreak_buchholz_cut1', buchholz_cut1),
+    'buchholz_median': ('tiebreak_buchholz_median', buchholz_median),
+    'sonneborn_berger': ('tiebreak_sonneborn_berger', sonneborn_berger),
+    'head_to_head': ('tiebreak_head_to_head', None),
+    'wins': ('tiebreak_wins', wins),
+}
+
+DEFAULT_TIEBREAKS = ['opponent_points']
+
+def parse_tiebreaks(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+def validate_tiebreaks(value):
+    unknown = [name for name in parse_tiebreaks(value) if name not in TIEBREAKS]
+    if unknown:
+        raise ValidationError(f"Unknown tiebreaks: {', '.join(unknown)} (available: {', '.join(TIEBREAKS)})")
+
+def get_tiebreaks(round_obj):
+    """Tiebreak chain (policy names) of the round."""
+    names = parse_tiebreaks(round_obj.tiebreaks or '') or list(getattr(settings, 'SMTRACKER_TIEBREAKS', DEFAULT_TIEBREAKS))
+    unknown = [name for name in names if name not in TIEBREAKS]
+    if unknown:
+        raise ValueError(f"Unknown tiebreaks: {', '.join(unknown)}")
+    return names
+
+def get_tiebreak_fields(round_obj):
+    """RoundResult fields of the tiebreak chain of the round."""
+    return [TIEBREAKS[name][0] for name in get_tiebreaks(round_obj)]
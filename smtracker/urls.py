@@ -7,8 +7,16 @@ urlpatterns = [
     path('', views.default_page, name='default_page'),
     path('robots/', views.robot_list, name='robot_list'),
     path('robots/edit/', views.robot_registration_edit, name='robot_registration_edit'),
+    path('robots/import/', views.robot_import, name='robot_import'),
     path('rounds/', views.round_list, name='round_list'),
     path('rounds/<int:round_id>/results/', views.match_results, name='match_results'),
     path('rounds/<int:round_id>/scheduled/', views.scheduled_matches, name='scheduled_matches'),
     path('rounds/<int:round_id>/round_results/', views.round_results, name='round_results'),
+    path('rounds/<int:round_id>/export/<slug:name>.<slug:file_format>', views.export, name='round_export'),
+    path('export/<slug:name>.<slug:file_format>', views.export, name='export'),
+    path('rounds/<int:round_id>/live/', views.live_scoreboard, name='live_scoreboard'),
+    path('live/events/', views.live_events, name='live_events'),
+    path('api/matches/<int:match_id>/', views.match_result_api, name='match_result_api'),
+    path('api/standings/status/', views.standings_status, name='standings_status'),
+    path('instrumentation/', views.instrumentation, name='instrumentation'),
 ]
@@ -5,30 +5,39 @@ from django.utils import timezone
 from django.views import generic
 from django.contrib import messages
 from django.forms import modelformset_factory
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.views.decorators.http import condition
+from .cache import cached, get_tournament_version, tournament_etag, tournament_form_etag, tournament_last_modified
 
 def default_page(request):
     return render(request, 'base_generic.html')
 
 from .models import Robot
 
+@condition(etag_func=tournament_etag, last_modified_func=tournament_last_modified)
 def robot_list(request):
     robots = Robot.objects.all()
     return render(request, 'robot_list.html', {'robots': robots})
 
-from .models import Round
+from .models import Round, PlayedPair
 from .managers import MatchManager
+from .snapshot import get_snapshot
 
+@condition(etag_func=tournament_form_etag)
 def round_list(request):
     if request.method == 'POST':
         action = request.POST.get('action')
         selected_ids = request.POST.getlist('selected_rounds')
         match_manager = MatchManager.get_instance()
+        # robots, rounds and results are not changed by the actions, all rounds share one snapshot
+        snapshot = get_snapshot(request)
 
         for round_id in selected_ids:
             round_obj = Round.objects.get(id=round_id)
             if action == 'generate':
                 try:
-                    matches = match_manager.generate_for_round(round_obj, request)
+                    matches = match_manager.generate_for_round(round_obj, request, snapshot=snapshot)
                     messages.success(request, f"Matches for round {round_obj.ident} were generated.")
                 except ValueError as e:
                     messages.error(request, f"Error generating matches for round {round_obj.ident}: {str(e)}")
@@ -42,58 +51,50 @@ def round_list(request):
 
             elif action == 'schedule':
                 try:
-                    match_manager.schedule_matches(round_obj, request)
+                    match_manager.schedule_matches(round_obj, request, snapshot=snapshot)
                     messages.success(request, f"Matches for round {round_obj.ident} were scheduled.")
                 except ValueError as e:
                     messages.error(request, f"Error scheduling matches for round {round_obj.ident}: {str(e)}")
 
         return redirect('smtracker:round_list')
 
-    rounds = Round.objects.all().order_by('order_index')
+    # Number of matches and of scheduled matches (both table and start time set) per round,
+    # matches against the ByeBot are not played on a table and count as scheduled
+    rounds = list(Round.objects.annotate(
+        matches_count=Count('matches'),
+        scheduled_matches_count=Count('matches', filter=(
+            Q(matches__schedule_table__isnull=False, matches__schedule_time__isnull=False) & ~Q(matches__schedule_table=0)
+            | Q(matches__robot1__is_byebot=1) | Q(matches__robot2__is_byebot=1)
+        )),
+    ).order_by('order_index'))
+
+    # Count of robots that are qualified for each round group
+    qualified_counts = Robot.objects.aggregate(
+        group1=Count('id', filter=Q(round_group1_qualified=1)),
+        group2=Count('id', filter=Q(round_group2_qualified=1)),
+        group3=Count('id', filter=Q(round_group3_qualified=1)),
+    )
+
+    # Duplicate matches: pairs of the round that already played in an earlier round of the group
+    duplicate_counts = dict(
+        PlayedPair.objects.filter(round_order__gt=F('first_round_order'))
+        .values_list('round_id').annotate(count=Count('id')).order_by()
+    )
+
     for round_obj in rounds:
-        # Add a property to each round object to store the number of matches
-        round_obj.matches_count = Match.objects.filter(round=round_obj).count()
-
-        # Calculate the count of robots that are qualified for the round
-        robots_count = 0
-        if round_obj.round_group_index == 1:
-            robots_count = Robot.objects.filter(round_group1_qualified=1).count()
-        elif round_obj.round_group_index == 2:
-            robots_count = Robot.objects.filter(round_group2_qualified=1).count()
-        elif round_obj.round_group_index == 3:
-            robots_count = Robot.objects.filter(round_group3_qualified=1).count()
-
-        round_obj.robots_count = robots_count
-
-        # Duplicate match detection
-        current_matches = Match.objects.filter(round=round_obj)
-        current_pairs = set((min(m.robot1_id, m.robot2_id), max(m.robot1_id, m.robot2_id)) for m in current_matches)
-    
-        previous_matches = Match.objects.filter(
-            round__order_index__lt=round_obj.order_index,
-            round__round_group_index=round_obj.round_group_index
-        )
-        previous_pairs = set((min(m.robot1_id, m.robot2_id), max(m.robot1_id, m.robot2_id)) for m in previous_matches)
-    
-        duplicate_count = len(current_pairs & previous_pairs)
-        round_obj.duplicate_matches_count = duplicate_count
-
-        # Number of scheduled matches (both table and start time set)
-        round_obj.scheduled_matches_count = Match.objects.filter(
-            round=round_obj,
-            schedule_table__isnull=False,
-            schedule_time__isnull=False
-        ).exclude(schedule_table=0).count()
-    
+        round_obj.robots_count = qualified_counts.get(f"group{round_obj.round_group_index}", 0)
+        round_obj.duplicate_matches_count = duplicate_counts.get(round_obj.id, 0)
+
     return render(request, 'round_list.html', {'rounds': rounds})
     
-from .models import Match
+from .models import Match, MatchStatus
 from .forms import MatchResultForm  # MatchResultFormSet
+from .recalculation import recalculation_worker
 
 def match_results(request, round_id):
     # Fetch the round and its matches
     round_obj = Round.objects.get(id=round_id)
-    matches = Match.objects.filter(round=round_obj).order_by('schedule_table', 'schedule_time', 'ident')
+    matches = Match.objects.filter(round=round_obj).select_related('round', 'robot1', 'robot2').order_by('schedule_table', 'schedule_time', 'ident')
 
     # Create a formset for match results
     MatchResultFormSet = modelformset_factory(Match, form=MatchResultForm, extra=0)
@@ -102,10 +103,15 @@ def match_results(request, round_id):
         match_manager = MatchManager.get_instance()
         formset = MatchResultFormSet(request.POST, queryset=matches)
         if formset.is_valid():
-            # Save the results
+            # Save the changed results, every match with its own short update (optimistic locking, see Match.version)
             try:
-                formset.save()
-                match_manager.recalculate_round_results(request)
+                for form in formset.forms:
+                    match = form.instance
+                    if form.has_changed() and not match_manager.save_match_result(
+                            match, match.status, match.result_robot1_points, match.result_robot2_points):
+                        messages.error(request, f"Match {match.ident} was changed in the meantime, its result was not saved.")
+                # one writer of the standings (see RecalculationWorker), like the results from the API
+                recalculation_worker.enqueue(round_obj)
                 messages.success(request, "Match results have been saved.")
             except ValueError as e:
                 messages.error(request, f"Error saving match results: {str(e)}")
@@ -113,6 +119,9 @@ def match_results(request, round_id):
             return redirect('smtracker:round_list')  # Redirect to the rounds list
         else:
             messages.error(request, "Form set is invalid!")
+            for form in formset.forms:
+                for error in form.non_field_errors():
+                    messages.error(request, error)
             print(formset.errors)
             print(formset.non_form_errors())
 
@@ -123,40 +132,211 @@ def match_results(request, round_id):
 
 
 
+@condition(etag_func=tournament_etag, last_modified_func=tournament_last_modified)
 def scheduled_matches(request, round_id):
-    round_obj = get_object_or_404(Round, id=round_id)
+    round_obj = cached(f"round:{round_id}", lambda: get_object_or_404(Round, id=round_id))
 
-    matches = Match.objects.filter(round=round_obj).order_by(
+    # evaluated only if the rendered table is not cached for the current tournament version
+    matches = Match.objects.filter(round=round_obj).select_related('robot1', 'robot2').order_by(
         'schedule_table', 'schedule_time', 'ident'
     )
 
-    return render(request, 'scheduled_matches.html', {'round': round_obj, 'matches': matches})
+    return render(request, 'scheduled_matches.html', {'round': round_obj, 'matches': matches, 'version': get_tournament_version()})
 
 
 from .models import RoundResult
 
+@condition(etag_func=tournament_etag, last_modified_func=tournament_last_modified)
 def round_results(request, round_id):
+    round_obj = cached(f"round:{round_id}", lambda: get_object_or_404(Round, id=round_id))
+
+    # evaluated only if the rendered table is not cached for the current tournament version
+    results = RoundResult.objects.filter(round=round_obj).select_related('robot').order_by('total_robot_rank')
+
+    return render(request, 'round_results.html', {'round': round_obj, 'results': results, 'version': get_tournament_version()})
+
+
+from django.http import StreamingHttpResponse
+from . import live
+
+def live_scoreboard(request, round_id):
     round_obj = get_object_or_404(Round, id=round_id)
+    results = RoundResult.objects.filter(round=round_obj).select_related('robot').order_by('total_robot_rank')
+    matches = Match.objects.filter(round=round_obj).select_related('robot1', 'robot2').order_by('schedule_time', 'schedule_table', 'ident')
 
-    results = RoundResult.objects.filter(round=round_obj).order_by('total_robot_rank')
+    return render(request, 'live_scoreboard.html', {'round': round_obj, 'results': results, 'matches': matches, 'last_event_id': live.last_event_id()})
 
-    return render(request, 'round_results.html', {'round': round_obj, 'results': results})
+def live_events(request):
+    # Server-Sent Events stream of the live scoreboard, reconnecting clients continue after Last-Event-ID
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id)
+    except (TypeError, ValueError):
+        last_event_id = live.last_event_id()
 
+    response = StreamingHttpResponse(live.stream(last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'    # no buffering in nginx
+    return response
 
-from .forms import RobotRegistrationForm
+
+from django.core.paginator import Paginator
+from .forms import RobotFilterForm, RobotRegistrationForm, RobotRegistrationFormSet
+from .cache import bump_tournament_version
+
+ROBOTS_PER_PAGE = 50
 
 def robot_registration_edit(request):
-    # fetch queryset
-    robots = Robot.objects.all().order_by('registration_number')
+    RobotFormSet = modelformset_factory(Robot, form=RobotRegistrationForm, formset=RobotRegistrationFormSet, extra=0)
 
-    RobotFormSet = modelformset_factory(Robot, form=RobotRegistrationForm, extra=0)
-    
     if request.method == 'POST':
-        formset = RobotFormSet(request.POST, queryset=robots)
+        # the posted robots, even if the page has changed since it was rendered (invalid ids are reported by the formset)
+        robot_ids = [value for key, value in request.POST.items() if key.startswith('form-') and key.endswith('-id') and value.isdigit()]
+        formset = RobotFormSet(request.POST, queryset=Robot.objects.filter(id__in=robot_ids).order_by('registration_number'))
         if formset.is_valid():
-            formset.save()
-            return redirect('smtracker:robot_registration_edit')
-    else:
-        formset = RobotFormSet(queryset=robots)
+            # only the changed robots and fields are written, with one bulk_update
+            changed_forms = [form for form in formset.forms if form.has_changed()]
+            if changed_forms:
+                fields = sorted({field for form in changed_forms for field in form.changed_data})
+                Robot.objects.bulk_update([form.instance for form in changed_forms], fields)
+                bump_tournament_version()
+            messages.success(request, f"{len(changed_forms)} robots were saved.")
+            return redirect(request.get_full_path())
+
+    # fetch queryset: one page of the (filtered) robots
+    filter_form = RobotFilterForm(request.GET)
+    robots = Robot.objects.all().order_by('registration_number')
+    if filter_form.is_valid():
+        robots = filter_form.filter(robots)
+    page = Paginator(robots, ROBOTS_PER_PAGE).get_page(request.GET.get('page'))
+
+    if request.method != 'POST':
+        formset = RobotFormSet(queryset=page.object_list)
 
-    return render(request, 'robot_registration_formset.html', {'formset': formset})
+    return render(request, 'robot_registration_formset.html', {'formset': formset, 'filter_form': filter_form, 'page': page})
+
+
+import io
+from .forms import RobotImportForm
+from .importing import RobotImporter
+
+def robot_import(request):
+    report = None
+    if request.method == 'POST':
+        form = RobotImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            # the uploaded file is read row by row (large uploads are kept in a temporary file by Django)
+            upload = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                report = RobotImporter(dry_run=form.cleaned_data['dry_run']).import_file(upload, form.cleaned_data['file_format'])
+            except (UnicodeDecodeError, ValueError) as e:
+                messages.error(request, f"Import failed, nothing was saved: {str(e)}")
+            else:
+                messages.success(request, f"{'Dry run: ' if report['dry_run'] else ''}{report['created']} robots created, "
+                                          f"{report['updated']} updated, {report['unchanged']} unchanged, {report['invalid']} invalid rows.")
+    else:
+        form = RobotImportForm()
+
+    return render(request, 'robot_import.html', {'form': form, 'report': report})
+
+
+from django.http import Http404
+from .exporting import EXPORTS, FORMATS, stream_export
+
+def export(request, name, file_format, round_id=None):
+    # Streamed dump of robots, matches or round results (whole event or one round) as CSV or JSON
+    if name not in EXPORTS or file_format not in FORMATS:
+        raise Http404("Unknown export.")
+    round_obj = get_object_or_404(Round, id=round_id) if round_id is not None else None
+
+    filename = f"smtracker-{name}{f'-{round_obj.ident}' if round_obj else ''}.{file_format}"
+    response = StreamingHttpResponse(stream_export(name, file_format, round_obj), content_type=FORMATS[file_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+import json
+from django.http import JsonResponse
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import require_GET, require_http_methods
+
+def match_etag(match):
+    """ETag of the match result (its version), used for optimistic locking in the result API."""
+    return f'"{match.version}"'
+
+def match_json(match):
+    return {
+        'id': match.id,
+        'ident': match.ident,
+        'round': match.round_id,
+        'robot1': match.robot1.robot_name,
+        'robot2': match.robot2.robot_name,
+        'status': match.status,
+        'result_robot1_points': match.result_robot1_points,
+        'result_robot2_points': match.result_robot2_points,
+        'version': match.version,
+        'etag': match_etag(match),
+    }
+
+@require_http_methods(['GET', 'POST'])
+@ensure_csrf_cookie
+def match_result_api(request, match_id):
+    """
+    GET: the match with its ETag (and the CSRF cookie).
+    POST: JSON {"status", "result_robot1_points", "result_robot2_points"} with the ETag of the last GET
+    in the If-Match header (or as "etag") and the value of the CSRF cookie in the X-CSRFToken header,
+    the standings are recalculated in the background.
+    """
+    match = get_object_or_404(Match.objects.select_related('round', 'robot1', 'robot2'), id=match_id)
+    if request.method == 'GET':
+        response = JsonResponse(match_json(match))
+        response['ETag'] = match_etag(match)
+        return response
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': "Invalid JSON."}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': "Invalid JSON."}, status=400)
+
+    etag = request.headers.get('If-Match') or data.get('etag')
+    if not etag:
+        return JsonResponse({'error': "The ETag of the match is required (If-Match header)."}, status=428)
+    if etag != match_etag(match):
+        return JsonResponse({'error': "The match was changed in the meantime.", 'match': match_json(match)}, status=409)
+
+    # validated on a new instance, the loaded match is needed unchanged for the concurrency check
+    form = MatchResultForm({'status': MatchStatus.FINISHED, **data, 'version': match.version},
+                           instance=Match(ident=match.ident, round=match.round, robot1=match.robot1, robot2=match.robot2))
+    if not form.is_valid():
+        return JsonResponse({'error': "Invalid match result.", 'errors': form.errors}, status=400)
+
+    result = form.cleaned_data
+    if not MatchManager.get_instance().save_match_result(
+            match, result['status'], result['result_robot1_points'], result['result_robot2_points']):
+        match.refresh_from_db()
+        return JsonResponse({'error': "The match was changed in the meantime.", 'match': match_json(match)}, status=409)
+
+    ticket = recalculation_worker.enqueue(match.round)
+    response = JsonResponse({'match': match_json(match), 'ticket': ticket})
+    response['ETag'] = match_etag(match)
+    return response
+
+@require_GET
+def standings_status(request):
+    """Freshness of the standings, with ?ticket= (returned by the result API) for a submitted result."""
+    try:
+        ticket = int(request.GET['ticket']) if 'ticket' in request.GET else None
+    except ValueError:
+        return JsonResponse({'error': "Invalid ticket."}, status=400)
+    return JsonResponse(recalculation_worker.status(ticket))
+
+
+from django.contrib.admin.views.decorators import staff_member_required
+from .instrumentation import recent_stats
+
+@staff_member_required
+def instrumentation(request):
+    enabled = getattr(settings, 'SMTRACKER_INSTRUMENTATION', False)
+    return render(request, 'admin/smtracker/instrumentation.html', {'title': 'Request instrumentation', 'enabled': enabled, 'stats': recent_stats()})